@@ -3,12 +3,18 @@ from __future__ import annotations
 from typing import Optional
 
 from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
 from sqlalchemy.dialects.mysql import INTEGER as MySQLInteger
 
-from ..deps import SessionDep, require_manager, require_user
+from ..deps import ReadSessionDep, SessionDep, require_manager, require_user
+from ..limits.middleware import limited
+from ..media.archive import archive_entries, content_disposition, stream_zip
+from ..media.routes import _ensure_can_view
 from ..models import Album, Media, User
+from ..timing import timed
 from ..utils.api import AppError, success
 
 router = APIRouter(prefix="/albums", tags=["albums"])
@@ -57,8 +63,8 @@ def _validate_visibility(value: str) -> str:
 
 
 @router.get("")
-def list_albums(
-    session: SessionDep,
+async def list_albums(
+    session: ReadSessionDep,
     current_user: User = Depends(require_user),
     visibility: Optional[str] = Query(default=None),
 ):
@@ -126,23 +132,25 @@ def list_albums(
         query = query.where((album_table.c.visibility != "private") | (album_table.c.owner_id == current_user.id))
 
     query = query.order_by(album_table.c.created_at.desc())
-    rows = session.execute(query).all()
-    payload = [
-        {
-            "id": row.id,
-            "title": row.title,
-            "visibility": row.visibility,
-            "created_at": row.created_at,
-            "owner_id": row.owner_id,
-            "cover_media_id": row.cover_media_id,
-            "media_count": row.media_count,
-            "first_media_id": row.first_media_id,
-            "first_media_preview_path": row.first_media_preview_path,
-            "first_media_storage_path": row.first_media_storage_path,
-            "first_media_type": row.first_media_type,
-        }
-        for row in rows
-    ]
+    with timed("query"):
+        rows = (await session.execute(query)).all()
+    with timed("build"):
+        payload = [
+            {
+                "id": row.id,
+                "title": row.title,
+                "visibility": row.visibility,
+                "created_at": row.created_at,
+                "owner_id": row.owner_id,
+                "cover_media_id": row.cover_media_id,
+                "media_count": row.media_count,
+                "first_media_id": row.first_media_id,
+                "first_media_preview_path": row.first_media_preview_path,
+                "first_media_storage_path": row.first_media_storage_path,
+                "first_media_type": row.first_media_type,
+            }
+            for row in rows
+        ]
     return success(payload)
 
 
@@ -206,6 +214,38 @@ def update_album(
     )
 
 
+@router.get("/{album_id}/archive")
+@limited("stream")
+def download_album_archive(album_id: int, session: SessionDep, current_user: User = Depends(require_user)):
+    album = session.get(Album, album_id)
+    if not album:
+        raise AppError(status_code=404, code=40400, message="ALBUM_NOT_FOUND")
+    if album.visibility == "private" and current_user.role != "developer" and album.owner_id != current_user.id:
+        raise AppError(status_code=403, code=40301, message="NO_PERMISSION")
+    name_base = func.substring_index(Media.filename, ".", 1)
+    name_numeric = func.cast(name_base, MySQLInteger(unsigned=True))
+    media_items = session.execute(
+        select(Media)
+        .options(selectinload(Media.album))
+        .where(Media.album_id == album.id)
+        .order_by(Media.created_at.asc(), name_numeric.asc(), name_base.asc())
+    ).scalars().all()
+    visible = []
+    for media in media_items:
+        try:
+            _ensure_can_view(media, current_user)
+        except AppError:
+            continue
+        visible.append(media)
+    if media_items and not visible:
+        raise AppError(status_code=403, code=40301, message="NO_PERMISSION")
+    return StreamingResponse(
+        stream_zip(archive_entries(visible)),
+        media_type="application/zip",
+        headers={"Content-Disposition": content_disposition(album.title or f"album-{album.id}")},
+    )
+
+
 @router.delete("/{album_id}")
 def delete_album(album_id: int, session: SessionDep, current_user: User = Depends(require_manager)):
     album = session.get(Album, album_id)
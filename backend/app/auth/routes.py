@@ -7,20 +7,20 @@ from typing import Literal
 from pydantic import BaseModel, Field
 from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session, selectinload
 
 from ..config import settings
 from ..deps import (
     ACCESS_TOKEN_COOKIE,
+    AsyncSessionDep,
     SessionDep,
     create_access_token,
-    hash_password,
     require_developer,
     require_user,
-    verify_password,
 )
 from ..models import AccessRequest, User
+from ..passwords import hash_password, verify_password
 from ..utils.api import AppError, success
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -63,10 +63,26 @@ def _generate_guest_email(session: Session, username: str) -> str:
 
 
 @router.post("/login")
-def login(body: LoginRequest, session: SessionDep) -> JSONResponse:
-    user = session.query(User).filter(User.username == body.username).first()
-    if not user or not verify_password(body.password, user.password_hash):
+async def login(body: LoginRequest, session: AsyncSessionDep) -> JSONResponse:
+    user = (await session.execute(select(User).where(User.username == body.username))).scalars().first()
+    if not user:
+        raise AppError(status_code=401, code=40100, message="INVALID_CREDENTIALS")
+    # give the connection back while the hash is checked; the detached user
+    # keeps its loaded columns for the token and the response
+    session.expunge(user)
+    await session.rollback()
+    verified, new_hash = await verify_password(body.password, user.password_hash)
+    if not verified:
         raise AppError(status_code=401, code=40100, message="INVALID_CREDENTIALS")
+    if new_hash:
+        # guarded on the hash that was verified, so a password changed in the
+        # meantime is never overwritten
+        await session.execute(
+            update(User)
+            .where(User.id == user.id, User.password_hash == user.password_hash)
+            .values(password_hash=new_hash)
+        )
+        await session.commit()
 
     token = create_access_token(user=user)
     response = JSONResponse(success({"user": _user_payload(user)}))
@@ -107,34 +123,41 @@ class RoleUpdateBody(BaseModel):
 
 
 @router.post("/access-requests")
-def create_access_request(body: AccessRequestBody, session: SessionDep):
+async def create_access_request(body: AccessRequestBody, session: AsyncSessionDep):
     username = body.username.strip()
     if not username:
         raise AppError(status_code=422, code=42200, message="USERNAME_REQUIRED")
 
-    existing_user = session.query(User).filter(User.username == username).first()
+    existing_user = (await session.execute(select(User.id).where(User.username == username))).first()
     if existing_user:
         raise AppError(status_code=409, code=40910, message="USER_ALREADY_EXISTS")
 
     pending = (
-        session.query(AccessRequest)
-        .filter(AccessRequest.username == username, AccessRequest.status == "pending")
-        .first()
-    )
+        await session.execute(
+            select(AccessRequest).where(AccessRequest.username == username, AccessRequest.status == "pending")
+        )
+    ).scalars().first()
     message = body.message.strip() if body.message else None
-    password_hash = hash_password(body.password)
+    # give the connection back while the hash is computed
+    await session.rollback()
+    password_hash = await hash_password(body.password)
 
     if pending:
         pending.password_hash = password_hash
         pending.message = message
-        session.commit()
-        session.refresh(pending)
-        return success({"request": _access_request_payload(pending), "status": "pending"})
-
-    request = AccessRequest(username=username, password_hash=password_hash, message=message, status="pending")
-    session.add(request)
-    session.commit()
-    session.refresh(request)
+    else:
+        pending = AccessRequest(username=username, password_hash=password_hash, message=message, status="pending")
+        session.add(pending)
+    await session.commit()
+
+    request = (
+        await session.execute(
+            select(AccessRequest)
+            .options(selectinload(AccessRequest.processed_by))
+            .where(AccessRequest.id == pending.id)
+            .execution_options(populate_existing=True)
+        )
+    ).scalar_one()
     return success({"request": _access_request_payload(request), "status": "pending"})
 
 
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import argparse
+import logging
+
+
+def _migrate(args: argparse.Namespace) -> None:
+    from .db import engine
+    from .migrations.runner import migrate
+
+    applied = migrate(engine)
+    if not applied:
+        print("schema is up to date")
+    for item in applied:
+        print(f"applied {item.version:04d} {item.name}")
+
+
+def _migrate_status(args: argparse.Namespace) -> None:
+    from .db import engine
+    from .migrations.runner import MIGRATIONS, current_version, latest_version
+
+    latest_version()
+    with engine.connect() as connection:
+        version = current_version(connection)
+    for item in MIGRATIONS:
+        print(f"{'applied' if item.version <= version else 'pending'} {item.version:04d} {item.name}")
+
+
+def _backfill(args: argparse.Namespace) -> None:
+    from .media.tasks import backfill
+
+    enqueued = backfill(args.kind, batch_size=args.batch_size, rerun=args.rerun)
+    print(f"queued {enqueued} {args.kind} tasks; the job leader will process them")
+
+
+def _duplicates(args: argparse.Namespace) -> None:
+    import json
+
+    from .db import SessionLocal
+    from .media.similar import similarity_index
+
+    with SessionLocal() as session:
+        similarity_index.refresh(session)
+    clusters = [cluster for cluster in similarity_index.clusters(args.distance) if len(cluster) >= args.min_size]
+    print(json.dumps({"distance": args.distance, "hashes": len(similarity_index), "clusters": clusters}, indent=2))
+
+
+def _gc(args: argparse.Namespace) -> None:
+    import json
+    from dataclasses import asdict
+
+    from .media.gc import collect_garbage
+
+    report = collect_garbage(dry_run=not args.delete, grace_seconds=args.grace)
+    print(json.dumps(asdict(report), indent=2))
+
+
+def _relayout(args: argparse.Namespace) -> None:
+    import json
+    from dataclasses import asdict
+
+    from .media.storage import relayout
+
+    report = relayout(batch_size=args.batch_size, dry_run=args.dry_run)
+    print(json.dumps(asdict(report), indent=2))
+
+
+def _import(args: argparse.Namespace) -> None:
+    import json
+    from dataclasses import asdict
+    from pathlib import Path
+
+    from .media.importer import import_tree
+
+    root = Path(args.directory)
+    if not root.is_dir():
+        raise SystemExit(f"{root} is not a directory")
+    report = import_tree(
+        root,
+        owner=args.owner,
+        album_id=args.album,
+        link=args.link,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        dry_run=args.dry_run,
+    )
+    print(json.dumps(asdict(report), indent=2))
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser("migrate", help="apply pending schema migrations")
+    migrate_parser.set_defaults(handler=_migrate)
+    status_parser = commands.add_parser("migrate-status", help="list applied and pending migrations")
+    status_parser.set_defaults(handler=_migrate_status)
+    backfill_parser = commands.add_parser("backfill", help="queue media tasks for rows that never had one")
+    backfill_parser.add_argument("kind", choices=["metadata", "preview", "probe", "faststart", "hls", "storyboard", "waveform", "display"])
+    backfill_parser.add_argument("--batch-size", type=int, default=1000)
+    backfill_parser.add_argument("--rerun", action="store_true", help="also requeue finished or failed tasks")
+    backfill_parser.set_defaults(handler=_backfill)
+    duplicates_parser = commands.add_parser("duplicates", help="print clusters of perceptually similar images")
+    duplicates_parser.add_argument("--distance", type=int, default=4, choices=range(12), metavar="0-11")
+    duplicates_parser.add_argument("--min-size", type=int, default=2)
+    duplicates_parser.set_defaults(handler=_duplicates)
+    gc_parser = commands.add_parser("gc", help="find files under MEDIA_ROOT that no media row references")
+    gc_parser.add_argument("--delete", action="store_true", help="remove them instead of only reporting")
+    gc_parser.add_argument("--grace", type=int, help="skip files modified within this many seconds")
+    gc_parser.set_defaults(handler=_gc)
+    relayout_parser = commands.add_parser("relayout", help="move stored files to content-addressed ab/cd/<sha256> paths")
+    relayout_parser.add_argument("--batch-size", type=int, default=1000)
+    relayout_parser.add_argument("--dry-run", action="store_true", help="only report what would move")
+    relayout_parser.set_defaults(handler=_relayout)
+    import_parser = commands.add_parser("import", help="import every media file under a directory")
+    import_parser.add_argument("directory")
+    import_parser.add_argument("--owner", required=True, help="username that will own the imported media")
+    import_parser.add_argument("--album", type=int, help="album id to put the media in")
+    import_parser.add_argument("--link", action="store_true", help="hard-link instead of copying when on the same filesystem")
+    import_parser.add_argument("--workers", type=int, help="hashing processes, defaults to the CPU count")
+    import_parser.add_argument("--batch-size", type=int, default=2000)
+    import_parser.add_argument("--dry-run", action="store_true", help="only report what would be imported")
+    import_parser.set_defaults(handler=_import)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,87 @@
 from functools import lru_cache
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     PORT: int = 8000
     DB_URL: str
+    DB_ASYNC_URL: Optional[str] = None
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_DISCONNECT_HANDLING: Literal["pessimistic", "optimistic"] = "pessimistic"
+    DB_READ_URLS: str = ""
+    DB_REPLICA_HEALTH_INTERVAL: int = 10
+    DB_REPLICA_RETRY_SECONDS: int = 30
+    DB_READ_YOUR_WRITES_SECONDS: int = 5
+    DB_AUTO_MIGRATE: bool = True
     JWT_SECRET: str
     JWT_EXPIRE_HOURS: int = 24
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 1
+    PASSWORD_HASH_MAX_PENDING: int = 8
+    METADATA_WORKERS: int = 1
     CORS_ORIGINS: str = "http://localhost:5173"
     MEDIA_ROOT: str = "./media-data"
     MAX_UPLOAD_MB: int = 200
+    MEDIA_LAYOUT: Literal["dated", "sha256"] = "dated"
+    MEDIA_FASTSTART_ENABLED: bool = False
+    DISPLAY_FORMATS: str = "avif,webp,jpeg"
+    DISPLAY_MAX_EDGE: int = 2560
+    DISPLAY_QUALITY: int = 82
+    HLS_ENABLED: bool = False
+    HLS_MIN_DURATION_SEC: int = 600
+    HLS_RENDITIONS: str = "360,720"
+    HLS_SEGMENT_SECONDS: int = 6
+    HLS_PRESET: str = "veryfast"
+    STORYBOARD_ENABLED: bool = True
+    STORYBOARD_INTERVAL_SEC: int = 10
+    STORYBOARD_COLUMNS: int = 10
+    STORYBOARD_ROWS: int = 10
+    STORYBOARD_THUMB_WIDTH: int = 160
+    WAVEFORM_PIXELS_PER_SECOND: int = 20
+    ARCHIVE_MAX_ITEMS: int = 5000
+    HOME_CACHE_TTL_SECONDS: int = 60
+    LIMITS_ENABLED: bool = True
+    LIMITS_BACKEND: Literal["memory", "redis"] = "memory"
+    LIMITS_REDIS_URL: Optional[str] = None
+    LIMIT_STREAM_CONCURRENCY: int = 64
+    LIMIT_STREAM_PER_USER: int = 8
+    LIMIT_STREAM_RATE: float = 20.0
+    LIMIT_STREAM_BURST: int = 60
+    LIMIT_UPLOAD_CONCURRENCY: int = 8
+    LIMIT_UPLOAD_PER_USER: int = 2
+    LIMIT_UPLOAD_RATE: float = 1.0
+    LIMIT_UPLOAD_BURST: int = 30
+    METRICS_ENABLED: bool = False
+    METRICS_TOKEN: Optional[str] = None
+    SERVER_TIMING_ENABLED: bool = False
+    PROFILING_ENABLED: bool = False
+    JOBS_ENABLED: bool = True
+    JOB_LEADER_RETRY_SECONDS: int = 15
+    JOB_POLL_SECONDS: int = 5
+    JOB_WORKERS: int = 2
+    JOB_RECONCILE_INTERVAL: int = 600
+    SCRUB_ENABLED: bool = True
+    SCRUB_INTERVAL: int = 60
+    SCRUB_SLICE_SECONDS: int = 240
+    SCRUB_MB_PER_SECOND: float = 8.0
+    SCRUB_RECHECK_DAYS: int = 30
+    GC_ENABLED: bool = False
+    GC_INTERVAL: int = 86400
+    GC_GRACE_SECONDS: int = 86400
+    GC_DELETE_BATCH: int = 100
+    GC_DELETE_PAUSE_SECONDS: float = 1.0
 
     model_config = SettingsConfigDict(env_file=".env.dev", extra="ignore")
 
     def cors_origins_list(self) -> list[str]:
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",") if origin.strip()]
 
+    def read_urls_list(self) -> list[str]:
+        return [url.strip() for url in self.DB_READ_URLS.split(",") if url.strip()]
+
 @lru_cache(maxsize=1)
 def get_settings() -> Settings:
     return Settings()
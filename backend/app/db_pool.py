@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import URL
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from .config import settings
+
+_WAIT_WINDOW = 1024
+
+
+class PoolStats:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._recent_waits: deque[float] = deque(maxlen=_WAIT_WINDOW)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self._recent_waits.append(seconds)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool: Pool) -> dict[str, Any]:
+        with self._lock:
+            recent = sorted(self._recent_waits)
+            checkouts = self.checkouts
+            payload = {
+                "name": self.name,
+                "checkouts": checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "wait_ms_avg": round(self.wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+                "wait_ms_max": round(self.wait_max * 1000, 3),
+                "wait_ms_p95": round(recent[math.ceil(len(recent) * 0.95) - 1] * 1000, 3) if recent else 0.0,
+            }
+        if isinstance(pool, QueuePool):
+            payload.update(
+                {
+                    "size": pool.size(),
+                    "checked_out": pool.checkedout(),
+                    "checked_in": pool.checkedin(),
+                    "overflow": max(pool.overflow(), 0),
+                    "max_overflow": pool._max_overflow,
+                }
+            )
+        return payload
+
+
+class _InstrumentedPoolMixin:
+    stats: PoolStats
+
+    def connect(self):
+        # wait time covers queueing for a free slot plus the pre-ping, if enabled
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.stats.record_timeout()
+            raise
+        self.stats.record_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # the new pool inherits our event listeners through its dispatch
+        pool = super().recreate()
+        pool.stats = self.stats
+        _registry[self.stats.name] = (self.stats, pool)
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+_registry: dict[str, tuple[PoolStats, Pool]] = {}
+
+
+def attach_pool_stats(pool: Pool, name: str) -> None:
+    if not isinstance(pool, _InstrumentedPoolMixin):
+        return
+    stats = PoolStats(name)
+    pool.stats = stats
+    _registry[stats.name] = (stats, pool)
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_connection, connection_record) -> None:
+        stats.connects += 1
+
+    @event.listens_for(pool, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception) -> None:
+        stats.invalidations += 1
+
+
+def engine_options(url: URL, *, is_async: bool = False) -> dict[str, Any]:
+    options: dict[str, Any] = {
+        # pessimistic: ping on every checkout; optimistic: rely on pool_recycle and
+        # SQLAlchemy invalidating the pool when a statement hits a dropped connection
+        "pool_pre_ping": settings.DB_DISCONNECT_HANDLING == "pessimistic",
+    }
+    if url.get_backend_name() == "sqlite":
+        return options
+    options.update(
+        {
+            "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+        }
+    )
+    return options
+
+
+def pool_stats() -> list[dict[str, Any]]:
+    return [stats.snapshot(pool) for stats, pool in _registry.values()]
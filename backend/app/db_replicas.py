@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, AsyncGenerator, Optional
+
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+from .config import settings
+from .db import async_engine, to_async_url
+from .db_pool import attach_pool_stats, engine_options
+
+logger = logging.getLogger(__name__)
+
+READ_PRIMARY_COOKIE = "db_read_primary"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class Replica:
+    def __init__(self, name: str, url: str) -> None:
+        self.name = name
+        async_url = to_async_url(url)
+        self.engine: AsyncEngine = create_async_engine(async_url, **engine_options(make_url(async_url), is_async=True))
+        attach_pool_stats(self.engine.sync_engine.pool, name)
+        self.down_until = 0.0
+        event.listen(self.engine.sync_engine, "handle_error", self._on_error)
+
+    @property
+    def healthy(self) -> bool:
+        return self.down_until <= time.monotonic()
+
+    def mark_down(self) -> None:
+        if self.healthy:
+            logger.warning("read replica %s marked down for %ss", self.name, settings.DB_REPLICA_RETRY_SECONDS)
+        self.down_until = time.monotonic() + settings.DB_REPLICA_RETRY_SECONDS
+
+    def mark_up(self) -> None:
+        self.down_until = 0.0
+
+    def _on_error(self, context) -> None:
+        if context.is_disconnect or context.connection is None:
+            self.mark_down()
+
+    async def ping(self) -> bool:
+        try:
+            async with self.engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+        except Exception:  # noqa: BLE001
+            self.mark_down()
+            return False
+        self.mark_up()
+        return True
+
+
+class ReplicaSet:
+    def __init__(self, urls: list[str]) -> None:
+        self.replicas = [Replica(f"replica-{index}", url) for index, url in enumerate(urls)]
+        self._cursor = itertools.count()
+        self._monitor: Optional[asyncio.Task] = None
+
+    def pick(self) -> Optional[Replica]:
+        if not self.replicas:
+            return None
+        start = next(self._cursor)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if replica.healthy:
+                return replica
+        return None
+
+    async def _monitor_loop(self) -> None:
+        while True:
+            await asyncio.gather(*(replica.ping() for replica in self.replicas))
+            await asyncio.sleep(settings.DB_REPLICA_HEALTH_INTERVAL)
+
+    def start(self) -> None:
+        if self.replicas and self._monitor is None:
+            self._monitor = asyncio.create_task(self._monitor_loop())
+
+    async def stop(self) -> None:
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def status(self) -> list[dict[str, Any]]:
+        return [{"name": replica.name, "healthy": replica.healthy} for replica in self.replicas]
+
+
+replicas = ReplicaSet(settings.read_urls_list())
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica: Optional[Replica] = self.info.get("replica")
+        if replica is None or self._flushing or isinstance(clause, UpdateBase):
+            return async_engine.sync_engine
+        return replica.engine.sync_engine
+
+
+ReadSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+def pinned_to_primary(request: Request) -> bool:
+    return READ_PRIMARY_COOKIE in request.cookies
+
+
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    replica = None if pinned_to_primary(request) else replicas.pick()
+    async with ReadSessionLocal(info={"replica": replica}) as session:
+        if replica is not None:
+            try:
+                await session.connection()
+            except DBAPIError:
+                replica.mark_down()
+                await session.rollback()
+                session.info["replica"] = None
+        yield session
@@ -5,11 +5,12 @@ from typing import Annotated
 
 from fastapi import Depends, Request
 from jose import JWTError, jwt
-from passlib.hash import bcrypt
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from .config import settings
-from .db import get_session
+from .db import get_async_session, get_session
+from .db_replicas import get_read_session
 from .models import User
 from .utils.api import AppError
 
@@ -17,14 +18,8 @@ ACCESS_TOKEN_COOKIE = "access_token"
 ALGORITHM = "HS256"
 
 SessionDep = Annotated[Session, Depends(get_session)]
-
-
-def hash_password(password: str) -> str:
-    return bcrypt.hash(password)
-
-
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.verify(password, hashed)
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
 
 
 def create_access_token(*, user: User) -> str:
@@ -47,31 +42,34 @@ def get_token_from_cookie(request: Request) -> str:
     return token
 
 
-def get_current_user(
-    session: SessionDep,
+async def get_current_user(
+    session: AsyncSessionDep,
     token: str = Depends(get_token_from_cookie),
 ) -> User:
     payload = _decode_token(token)
     user_id = payload.get("sub")
     if not user_id:
         raise AppError(status_code=401, code=40100, message="INVALID_TOKEN")
-    user = session.get(User, int(user_id))
+    user = await session.get(User, int(user_id))
     if not user:
         raise AppError(status_code=401, code=40100, message="USER_NOT_FOUND")
+    # hand the connection back to the pool before the route runs; the user is
+    # returned detached so sync routes can attach it to their own session
+    await session.close()
     return user
 
 
-def require_user(current_user: Annotated[User, Depends(get_current_user)]) -> User:
+async def require_user(current_user: Annotated[User, Depends(get_current_user)]) -> User:
     return current_user
 
 
-def require_manager(current_user: Annotated[User, Depends(get_current_user)]) -> User:
+async def require_manager(current_user: Annotated[User, Depends(get_current_user)]) -> User:
     if current_user.role not in ("developer", "manager"):
         raise AppError(status_code=403, code=40301, message="NO_PERMISSION")
     return current_user
 
 
-def require_developer(current_user: Annotated[User, Depends(get_current_user)]) -> User:
+async def require_developer(current_user: Annotated[User, Depends(get_current_user)]) -> User:
     if current_user.role != "developer":
         raise AppError(status_code=403, code=40301, message="NO_PERMISSION")
     return current_user
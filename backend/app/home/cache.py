@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import threading
+import time
+from itertools import chain
+from typing import Any, Hashable, Optional
+
+from sqlalchemy import event, update
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from ..config import settings
+from ..models import Album, CacheVersion, HomeSection, HomeSectionAlbum, Media
+
+HOME_CACHE_NAME = "home"
+_WATCHED_MODELS = (Album, Media, HomeSection, HomeSectionAlbum)
+_DIRTY_FLAG = "home_cache_dirty"
+
+
+# Entries remember the version they were built against: a commit touching
+# sections, albums or media bumps the version, and a payload built while an
+# invalidation happened is dropped instead of stored. Commits in other worker
+# processes reach this one through the shared row in cache_versions.
+class HomePayloadCache:
+    def __init__(self, ttl_seconds: int) -> None:
+        self._ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._version = 0
+        self._shared_version = 0
+        self._entries: dict[Hashable, tuple[int, float, Any]] = {}
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        version, expires_at, payload = entry
+        if version != self._version or expires_at < time.monotonic():
+            return None
+        return payload
+
+    def set(self, key: Hashable, payload: Any, *, version: int) -> None:
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[key] = (version, time.monotonic() + self._ttl, payload)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+    def observe(self, shared_version: int) -> None:
+        # only moves forward: a lagging replica reporting an older version
+        # must not flush entries built from newer data
+        with self._lock:
+            if shared_version <= self._shared_version:
+                return
+            self._shared_version = shared_version
+            self._version += 1
+            self._entries.clear()
+
+
+home_cache = HomePayloadCache(ttl_seconds=settings.HOME_CACHE_TTL_SECONDS)
+
+
+def _mark_dirty(session: Session) -> None:
+    if session.info.get(_DIRTY_FLAG):
+        return
+    session.info[_DIRTY_FLAG] = True
+    # once per transaction and inside it, so the bump becomes visible to other
+    # processes together with the change and disappears with a rollback
+    table = CacheVersion.__table__
+    session.execute(
+        update(table).where(table.c.name == HOME_CACHE_NAME).values(version=table.c.version + 1)
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session: Session, flush_context) -> None:
+    if any(isinstance(obj, _WATCHED_MODELS) for obj in chain(session.new, session.dirty, session.deleted)):
+        _mark_dirty(session)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_statements(state: ORMExecuteState) -> None:
+    if not (state.is_update or state.is_delete or state.is_insert):
+        return
+    mapper = state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, _WATCHED_MODELS):
+        _mark_dirty(state.session)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    if session.info.pop(_DIRTY_FLAG, False):
+        home_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _reset_on_rollback(session: Session) -> None:
+    session.info.pop(_DIRTY_FLAG, None)
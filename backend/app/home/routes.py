@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func, or_, select, union
+from sqlalchemy.dialects.mysql import INTEGER as MySQLInteger
+from sqlalchemy.orm import Session, aliased, selectinload
+
+from ..deps import ReadSessionDep, require_user
+from ..media.routes import _media_order_columns, _media_summary
+from ..models import Album, CacheVersion, HomeSection, HomeSectionAlbum, Media, User
+from ..utils.api import success
+from .cache import HOME_CACHE_NAME, home_cache
+
+router = APIRouter(prefix="/home", tags=["home"])
+
+# Gallery renders section previews four cards per row.
+PREVIEW_COLUMNS = 4
+
+
+def _shared_version(session: Session) -> int:
+    version = session.execute(
+        select(CacheVersion.version).where(CacheVersion.name == HOME_CACHE_NAME)
+    ).scalar_one_or_none()
+    return version or 0
+
+
+def _personalized_user_ids(session: Session) -> frozenset[int]:
+    # users whose home differs from the shared view: owners of a private
+    # section album, and owners of media inside one, which list_media shows
+    # to them regardless of the album's owner
+    cache_key = ("personalized-users",)
+    version = home_cache.version
+    cached = home_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    private_albums = (
+        select(Album.id)
+        .join(HomeSectionAlbum, HomeSectionAlbum.album_id == Album.id)
+        .where(Album.visibility == "private")
+    )
+    user_ids = frozenset(
+        session.execute(
+            union(
+                select(Album.owner_id).where(Album.id.in_(private_albums)),
+                select(Media.owner_id).where(Media.album_id.in_(private_albums)),
+            )
+        ).scalars()
+    )
+    home_cache.set(cache_key, user_ids, version=version)
+    return user_ids
+
+
+def _visibility_class(session: Session, user: User) -> str:
+    if user.role == "developer":
+        return "all"
+    if user.id in _personalized_user_ids(session):
+        return f"owner:{user.id}"
+    return "shared"
+
+
+def _viewer_id(visibility_class: str) -> Optional[int]:
+    return int(visibility_class.split(":", 1)[1]) if visibility_class.startswith("owner:") else None
+
+
+def _album_is_visible(album: Album, visibility_class: str) -> bool:
+    if visibility_class == "all" or album.visibility != "private":
+        return True
+    return _viewer_id(visibility_class) == album.owner_id
+
+
+def _album_stats(session: Session, album_ids: list[int]) -> dict[int, dict]:
+    if not album_ids:
+        return {}
+    name_base = func.substring_index(Media.filename, ".", 1)
+    name_numeric = func.cast(name_base, MySQLInteger(unsigned=True))
+    ranked = (
+        select(
+            Media.album_id,
+            Media.id,
+            Media.preview_path,
+            Media.storage_path,
+            Media.type,
+            func.row_number()
+            .over(
+                partition_by=Media.album_id,
+                order_by=(Media.created_at.asc(), name_numeric.asc(), name_base.asc()),
+            )
+            .label("position"),
+            func.count().over(partition_by=Media.album_id).label("media_count"),
+        )
+        .where(Media.album_id.in_(album_ids))
+        .subquery()
+    )
+    rows = session.execute(select(ranked).where(ranked.c.position == 1)).all()
+    return {
+        row.album_id: {
+            "media_count": row.media_count,
+            "first_media_id": row.id,
+            "first_media_preview_path": row.preview_path,
+            "first_media_storage_path": row.storage_path,
+            "first_media_type": row.type,
+        }
+        for row in rows
+    }
+
+
+def _section_previews(
+    session: Session,
+    album_ids: list[int],
+    media_type: Optional[str],
+    visibility_class: str,
+) -> tuple[dict[int, list[dict]], dict[int, int]]:
+    if not album_ids:
+        return {}, {}
+    ranked_query = (
+        select(
+            Media,
+            HomeSectionAlbum.section_id.label("section_id"),
+            (HomeSection.preview_rows * PREVIEW_COLUMNS).label("preview_limit"),
+            func.row_number()
+            .over(partition_by=HomeSectionAlbum.section_id, order_by=_media_order_columns("created_at"))
+            .label("position"),
+            func.count().over(partition_by=HomeSectionAlbum.section_id).label("section_total"),
+        )
+        .join(HomeSectionAlbum, HomeSectionAlbum.album_id == Media.album_id)
+        .join(HomeSection, HomeSection.id == HomeSectionAlbum.section_id)
+        .where(HomeSectionAlbum.album_id.in_(album_ids))
+    )
+    if media_type:
+        ranked_query = ranked_query.where(Media.type == media_type)
+    if visibility_class != "all":
+        # the same rule list_media applies: section albums are all non-null
+        # here, so a medium shows when its album is not private or it is the
+        # viewer's own
+        ranked_query = ranked_query.join(Album, Album.id == Media.album_id).where(
+            or_(Album.visibility != "private", Media.owner_id == _viewer_id(visibility_class))
+        )
+    ranked = ranked_query.subquery()
+    ranked_media = aliased(Media, ranked)
+
+    rows = session.execute(
+        select(ranked_media, ranked.c.section_id, ranked.c.section_total)
+        .where(ranked.c.position <= ranked.c.preview_limit)
+        .order_by(ranked.c.section_id, ranked.c.position)
+    ).all()
+
+    items: dict[int, list[dict]] = {}
+    totals: dict[int, int] = {}
+    for media, section_id, section_total in rows:
+        items.setdefault(section_id, []).append(_media_summary(media))
+        totals[section_id] = section_total
+    return items, totals
+
+
+def _build_home_payload(session: Session, visibility_class: str, media_type: Optional[str]) -> dict:
+    sections = session.execute(
+        select(HomeSection)
+        .options(selectinload(HomeSection.albums).selectinload(HomeSectionAlbum.album))
+        .order_by(HomeSection.order_index.asc(), HomeSection.id.asc())
+    ).scalars().all()
+
+    section_album_ids: set[int] = set()
+    visible_albums: dict[int, Album] = {}
+    for section in sections:
+        for assignment in section.albums:
+            album = assignment.album
+            if album is None:
+                continue
+            section_album_ids.add(album.id)
+            if _album_is_visible(album, visibility_class):
+                visible_albums[album.id] = album
+
+    # album cards follow list_albums; previews follow list_media, which also
+    # shows the viewer's own media inside someone else's private album
+    stats = _album_stats(session, sorted(visible_albums))
+    preview_items, preview_totals = _section_previews(session, sorted(section_album_ids), media_type, visibility_class)
+
+    payload = []
+    for section in sections:
+        albums_payload = []
+        for assignment in section.albums:
+            album = visible_albums.get(assignment.album_id)
+            if album is None:
+                continue
+            albums_payload.append(
+                {
+                    "id": album.id,
+                    "title": album.title,
+                    "visibility": album.visibility,
+                    "owner_id": album.owner_id,
+                    "cover_media_id": album.cover_media_id,
+                    "media_count": 0,
+                    "first_media_id": None,
+                    "first_media_preview_path": None,
+                    "first_media_storage_path": None,
+                    "first_media_type": None,
+                    **stats.get(album.id, {}),
+                }
+            )
+        payload.append(
+            {
+                "id": section.id,
+                "key": section.key,
+                "title": section.title,
+                "preview_rows": section.preview_rows,
+                "order_index": section.order_index,
+                "album_ids": [album["id"] for album in albums_payload],
+                "albums": albums_payload,
+                "media": {
+                    "items": preview_items.get(section.id, []),
+                    "total": preview_totals.get(section.id, 0),
+                },
+            }
+        )
+    return {"sections": payload}
+
+
+@router.get("")
+async def get_home(
+    session: ReadSessionDep,
+    current_user: User = Depends(require_user),
+    media_type: Optional[str] = Query(default=None, alias="type", pattern="^(image|video|audio)$"),
+):
+    home_cache.observe(await session.run_sync(_shared_version))
+    visibility_class = await session.run_sync(_visibility_class, current_user)
+    cache_key = (visibility_class, media_type)
+    version = home_cache.version
+    payload = home_cache.get(cache_key)
+    if payload is None:
+        payload = await session.run_sync(_build_home_payload, visibility_class, media_type)
+        home_cache.set(cache_key, payload, version=version)
+    return success(payload)
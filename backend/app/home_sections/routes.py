@@ -8,7 +8,7 @@ from pydantic import BaseModel, Field
 from sqlalchemy import Select, func, select
 from sqlalchemy.orm import Session, selectinload
 
-from ..deps import SessionDep, require_developer, require_user
+from ..deps import ReadSessionDep, SessionDep, require_developer, require_user
 from ..models import Album, HomeSection, HomeSectionAlbum, User
 from ..utils.api import AppError, success
 
@@ -105,11 +105,13 @@ def _section_to_schema(section: HomeSection) -> dict:
 
 
 @router.get("")
-def list_sections(session: SessionDep, current_user: User = Depends(require_user)):
-    sections = session.execute(
-        select(HomeSection)
-        .options(selectinload(HomeSection.albums).selectinload(HomeSectionAlbum.album))
-        .order_by(HomeSection.order_index.asc(), HomeSection.id.asc())
+async def list_sections(session: ReadSessionDep, current_user: User = Depends(require_user)):
+    sections = (
+        await session.execute(
+            select(HomeSection)
+            .options(selectinload(HomeSection.albums).selectinload(HomeSectionAlbum.album))
+            .order_by(HomeSection.order_index.asc(), HomeSection.id.asc())
+        )
     ).scalars().all()
     return success([_section_to_schema(section) for section in sections])
 
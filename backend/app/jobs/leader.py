@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLock:
+    def __init__(self, engine: Engine, name: str) -> None:
+        self.engine = engine
+        self.name = name
+        self._connection: Optional[Connection] = None
+
+    @property
+    def advisory(self) -> bool:
+        return self.engine.dialect.name == "mysql"
+
+    def try_acquire(self) -> bool:
+        if not self.advisory:
+            # no advisory locks outside MySQL; assume a single process
+            return True
+        try:
+            connection = self.engine.connect()
+            acquired = connection.execute(text("SELECT GET_LOCK(:name, 0)"), {"name": self.name}).scalar()
+            connection.commit()
+        except DBAPIError:
+            logger.warning("leader election query failed", exc_info=True)
+            return False
+        if acquired != 1:
+            connection.close()
+            return False
+        self._connection = connection
+        return True
+
+    def still_held(self) -> bool:
+        if not self.advisory:
+            return True
+        if self._connection is None:
+            return False
+        try:
+            holder = self._connection.execute(
+                text("SELECT IS_USED_LOCK(:name) = CONNECTION_ID()"), {"name": self.name}
+            ).scalar()
+            self._connection.commit()
+        except DBAPIError:
+            logger.warning("lost leader connection", exc_info=True)
+            self._drop()
+            return False
+        if holder != 1:
+            self._drop()
+            return False
+        return True
+
+    def release(self) -> None:
+        if self._connection is None:
+            return
+        try:
+            self._connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": self.name})
+            self._connection.commit()
+        except DBAPIError:
+            pass
+        self._drop()
+
+    def _drop(self) -> None:
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except DBAPIError:
+                pass
+            self._connection = None
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from ..models import Media, MediaTask
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+
+TaskHandler = Callable[[Session, Media], None]
+TASK_HANDLERS: dict[str, TaskHandler] = {}
+
+
+@dataclass(frozen=True, slots=True)
+class PeriodicJob:
+    name: str
+    every: int
+    run: Callable[[], None]
+
+
+PERIODIC_JOBS: list[PeriodicJob] = []
+
+
+def task_handler(kind: str):
+    def register(func: TaskHandler) -> TaskHandler:
+        TASK_HANDLERS[kind] = func
+        return func
+
+    return register
+
+
+def periodic(name: str, *, every: int):
+    def register(func: Callable[[], None]) -> Callable[[], None]:
+        PERIODIC_JOBS.append(PeriodicJob(name, every, func))
+        return func
+
+    return register
+
+
+def enqueue_media_task(session: Session, media_id: int, kind: str) -> None:
+    task = session.execute(
+        select(MediaTask).where(MediaTask.media_id == media_id, MediaTask.kind == kind)
+    ).scalar_one_or_none()
+    if task is None:
+        session.add(MediaTask(media_id=media_id, kind=kind, status="pending", attempts=0))
+    elif task.status != "running":
+        task.status = "pending"
+        task.attempts = 0
+        task.error = None
+
+
+def claim_tasks(session: Session, limit: int) -> list[int]:
+    # only the elected leader claims, so a plain read-then-update is race free
+    ids = session.execute(
+        select(MediaTask.id).where(MediaTask.status == "pending").order_by(MediaTask.id).limit(limit)
+    ).scalars().all()
+    if ids:
+        session.execute(
+            update(MediaTask)
+            .where(MediaTask.id.in_(ids))
+            .values(status="running", attempts=MediaTask.attempts + 1)
+        )
+        session.commit()
+    return list(ids)
+
+
+def requeue_running(session: Session) -> int:
+    result = session.execute(update(MediaTask).where(MediaTask.status == "running").values(status="pending"))
+    session.commit()
+    return result.rowcount
+
+
+def queue_depth(session: Session) -> int:
+    return session.execute(
+        select(func.count(MediaTask.id)).where(MediaTask.status.in_(("pending", "running")))
+    ).scalar_one()
+
+
+def queue_counts(session: Session) -> dict[str, dict[str, int]]:
+    rows = session.execute(
+        select(MediaTask.kind, MediaTask.status, func.count(MediaTask.id)).group_by(MediaTask.kind, MediaTask.status)
+    ).all()
+    counts: dict[str, dict[str, int]] = {}
+    for kind, status, count in rows:
+        counts.setdefault(kind, {})[status] = count
+    return counts
+
+
+def run_task(session: Session, task_id: int) -> None:
+    task = session.get(MediaTask, task_id)
+    if task is None:
+        return
+    handler = TASK_HANDLERS.get(task.kind)
+    media = session.get(Media, task.media_id)
+    error: Optional[str] = None
+    if handler is None:
+        error = f"no handler for task kind {task.kind}"
+    elif media is not None:
+        try:
+            handler(session, media)
+        except Exception as exc:  # noqa: BLE001
+            session.rollback()
+            logger.exception("media task %s (%s) failed for media %s", task.id, task.kind, task.media_id)
+            error = str(exc) or exc.__class__.__name__
+            task = session.get(MediaTask, task_id)
+            if task is None:
+                return
+
+    if error is None:
+        task.status = "done"
+        task.error = None
+    else:
+        task.status = "failed" if task.attempts >= MAX_ATTEMPTS else "pending"
+        task.error = error[:2000]
+    session.commit()
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Any, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from ..config import settings
+from ..db import SessionLocal, engine
+from ..metrics import observe_task_queue_depth
+from .leader import LeaderLock
+from .queue import PERIODIC_JOBS, claim_tasks, queue_counts, queue_depth, requeue_running, run_task
+
+logger = logging.getLogger(__name__)
+
+LEADER_LOCK_NAME = "suzuhara_job_leader"
+
+
+def _load_duties() -> None:
+    from ..media import tasks  # noqa: F401 registers media task handlers and periodic jobs
+
+
+def _with_session(func, *args):
+    with SessionLocal() as session:
+        return func(session, *args)
+
+
+class JobRunner:
+    def __init__(self) -> None:
+        self.lock = LeaderLock(engine, LEADER_LOCK_NAME)
+        self.is_leader = False
+        self._election: Optional[asyncio.Task] = None
+        self._duties: list[asyncio.Task] = []
+        self._wake = asyncio.Event()
+
+    def start(self) -> None:
+        if not settings.JOBS_ENABLED or self._election is not None:
+            return
+        _load_duties()
+        self._election = asyncio.create_task(self._election_loop())
+
+    async def stop(self) -> None:
+        if self._election is not None:
+            self._election.cancel()
+            self._election = None
+        await self._step_down()
+
+    def wake(self) -> None:
+        # lets this process start queued work right away when it is the leader
+        self._wake.set()
+
+    async def _election_loop(self) -> None:
+        while True:
+            try:
+                if not self.is_leader:
+                    if await run_in_threadpool(self.lock.try_acquire):
+                        await self._become_leader()
+                elif not await run_in_threadpool(self.lock.still_held):
+                    logger.warning("lost job leadership in pid %s", os.getpid())
+                    await self._step_down()
+            except Exception:  # noqa: BLE001
+                logger.exception("job leader election failed")
+            await asyncio.sleep(settings.JOB_LEADER_RETRY_SECONDS)
+
+    async def _become_leader(self) -> None:
+        logger.info("pid %s is now the background job leader", os.getpid())
+        self.is_leader = True
+        requeued = await run_in_threadpool(_with_session, requeue_running)
+        if requeued:
+            logger.info("requeued %s media tasks left running by a previous leader", requeued)
+        self._duties = [asyncio.create_task(self._task_loop())]
+        self._duties += [asyncio.create_task(self._periodic_loop(job)) for job in PERIODIC_JOBS]
+
+    async def _step_down(self) -> None:
+        for duty in self._duties:
+            duty.cancel()
+        await asyncio.gather(*self._duties, return_exceptions=True)
+        self._duties = []
+        if self.is_leader:
+            self.is_leader = False
+            await run_in_threadpool(self.lock.release)
+
+    async def _task_loop(self) -> None:
+        while True:
+            try:
+                task_ids = await run_in_threadpool(_with_session, claim_tasks, settings.JOB_WORKERS)
+                if task_ids:
+                    await asyncio.gather(*(run_in_threadpool(_with_session, run_task, task_id) for task_id in task_ids))
+                observe_task_queue_depth(await run_in_threadpool(_with_session, queue_depth))
+            except Exception:  # noqa: BLE001
+                logger.exception("media task loop failed")
+                task_ids = []
+            if task_ids:
+                continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _periodic_loop(self, job) -> None:
+        while True:
+            try:
+                await run_in_threadpool(job.run)
+            except Exception:  # noqa: BLE001
+                logger.exception("periodic job %s failed", job.name)
+            await asyncio.sleep(job.every)
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "enabled": settings.JOBS_ENABLED,
+            "pid": os.getpid(),
+            "leader": self.is_leader,
+            "periodic": [{"name": job.name, "every": job.every} for job in PERIODIC_JOBS],
+            "tasks": _with_session(queue_counts),
+        }
+
+
+runner = JobRunner()
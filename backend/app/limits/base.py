@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+
+
+class LimiterBackend(ABC):
+    @abstractmethod
+    async def acquire(self, key: str, limit: int) -> bool: ...
+    @abstractmethod
+    async def release(self, key: str) -> None: ...
+    # returns 0 when a token was taken, else seconds until one is available
+    @abstractmethod
+    async def take(self, key: str, rate: float, burst: int) -> float: ...
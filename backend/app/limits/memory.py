@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import time
+
+from .base import LimiterBackend
+
+# how often full buckets are dropped; a full bucket is the same as no bucket,
+# so memory tracks the clients seen recently rather than every client ever
+SWEEP_SECONDS = 60.0
+
+
+# state lives in this worker only; every coroutine runs on the event loop
+# thread, so plain dicts need no locking
+class MemoryLimiter(LimiterBackend):
+    def __init__(self) -> None:
+        self.in_use: dict[str, int] = {}
+        # key -> (tokens, updated, time the bucket is full again)
+        self.buckets: dict[str, tuple[float, float, float]] = {}
+        self.swept_at = time.monotonic()
+
+    async def acquire(self, key: str, limit: int) -> bool:
+        current = self.in_use.get(key, 0)
+        if current >= limit:
+            return False
+        self.in_use[key] = current + 1
+        return True
+
+    async def release(self, key: str) -> None:
+        current = self.in_use.get(key, 0) - 1
+        if current > 0:
+            self.in_use[key] = current
+        else:
+            self.in_use.pop(key, None)
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        if now - self.swept_at >= SWEEP_SECONDS:
+            self.buckets = {name: bucket for name, bucket in self.buckets.items() if bucket[2] > now}
+            self.swept_at = now
+        tokens, updated, _ = self.buckets.get(key, (float(burst), now, now))
+        tokens = min(float(burst), tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self.buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+        return wait
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import dataclass
+from re import Pattern
+from typing import Callable, Optional
+
+from fastapi import FastAPI
+from jose import JWTError, jwt
+from starlette.requests import Request
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..config import settings
+from ..deps import ACCESS_TOKEN_COOKIE, ALGORITHM
+from ..metrics import observe_limit_shed
+from .base import LimiterBackend
+
+LIMIT_RULE_ATTR = "limit_rule"
+
+
+@dataclass(frozen=True, slots=True)
+class LimitRule:
+    name: str
+    max_concurrent: int
+    max_per_user: int
+    rate: float
+    burst: int
+
+
+def _rules() -> dict[str, LimitRule]:
+    return {
+        "stream": LimitRule(
+            "stream",
+            settings.LIMIT_STREAM_CONCURRENCY,
+            settings.LIMIT_STREAM_PER_USER,
+            settings.LIMIT_STREAM_RATE,
+            settings.LIMIT_STREAM_BURST,
+        ),
+        "upload": LimitRule(
+            "upload",
+            settings.LIMIT_UPLOAD_CONCURRENCY,
+            settings.LIMIT_UPLOAD_PER_USER,
+            settings.LIMIT_UPLOAD_RATE,
+            settings.LIMIT_UPLOAD_BURST,
+        ),
+    }
+
+
+def limited(rule: str) -> Callable:
+    def mark(endpoint: Callable) -> Callable:
+        setattr(endpoint, LIMIT_RULE_ATTR, rule)
+        return endpoint
+
+    return mark
+
+
+def _backend() -> LimiterBackend:
+    if settings.LIMITS_BACKEND == "redis":
+        from .redis import RedisLimiter
+
+        return RedisLimiter()
+    from .memory import MemoryLimiter
+
+    return MemoryLimiter()
+
+
+class Shed(Exception):
+    def __init__(self, status_code: int, code: int, message: str, retry_after: float, reason: str) -> None:
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason
+
+
+class LimiterMiddleware:
+    # runs inside the request-id middleware and outside routing, so uploads are
+    # shed before their body is read and stream permits are held until the
+    # last chunk has been sent
+    def __init__(self, app: ASGIApp, backend: LimiterBackend, rules: dict[str, LimitRule], router) -> None:
+        self.app = app
+        self.backend = backend
+        self.rules = rules
+        self.router = router
+        self._table: Optional[list[tuple[Pattern[str], frozenset[str], LimitRule]]] = None
+
+    def _build_table(self) -> list[tuple[Pattern[str], frozenset[str], LimitRule]]:
+        # only the handful of limited routes, in router order; built on the
+        # first request since routers are still being included at install time
+        table = []
+        for route in self.router.routes:
+            name = getattr(getattr(route, "endpoint", None), LIMIT_RULE_ATTR, None)
+            if name in self.rules:
+                table.append((route.path_regex, frozenset(route.methods or ()), self.rules[name]))
+        return table
+
+    def _match_rule(self, scope: Scope) -> Optional[LimitRule]:
+        if self._table is None:
+            self._table = self._build_table()
+        path, method = scope["path"], scope["method"]
+        for pattern, methods, rule in self._table:
+            if method in methods and pattern.match(path):
+                return rule
+        return None
+
+    def _client_key(self, scope: Scope) -> str:
+        request = Request(scope)
+        token = request.cookies.get(ACCESS_TOKEN_COOKIE)
+        if token:
+            try:
+                subject = jwt.decode(token, settings.JWT_SECRET, algorithms=[ALGORITHM]).get("sub")
+            except JWTError:
+                subject = None
+            if subject:
+                return f"user:{subject}"
+        return f"ip:{request.client.host if request.client else 'unknown'}"
+
+    async def _admit(self, rule: LimitRule, client: str) -> list[str]:
+        held: list[str] = []
+        if rule.rate > 0:
+            wait = await self.backend.take(f"{rule.name}:{client}", rule.rate, rule.burst)
+            if wait > 0:
+                raise Shed(429, 42900, "TOO_MANY_REQUESTS", wait, "rate")
+        try:
+            if rule.max_per_user > 0:
+                key = f"{rule.name}:{client}"
+                if not await self.backend.acquire(key, rule.max_per_user):
+                    raise Shed(429, 42900, "TOO_MANY_REQUESTS", 1, "per_user")
+                held.append(key)
+            if rule.max_concurrent > 0:
+                key = f"{rule.name}:*"
+                if not await self.backend.acquire(key, rule.max_concurrent):
+                    raise Shed(503, 50300, "SERVER_BUSY", 1, "concurrency")
+                held.append(key)
+        except Shed:
+            for key in held:
+                await self.backend.release(key)
+            raise
+        return held
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        rule = self._match_rule(scope) if scope["type"] == "http" else None
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            held = await self._admit(rule, self._client_key(scope))
+        except Shed as shed:
+            observe_limit_shed(rule.name, shed.reason)
+            body = json.dumps(
+                {"code": shed.code, "message": shed.message, "request_id": scope.get("state", {}).get("request_id")}
+            ).encode()
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": shed.status_code,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode()),
+                        (b"retry-after", str(shed.retry_after).encode()),
+                    ],
+                }
+            )
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            for key in held:
+                await self.backend.release(key)
+
+
+def install_limits(app: FastAPI) -> None:
+    if not settings.LIMITS_ENABLED:
+        return
+    app.add_middleware(LimiterMiddleware, backend=_backend(), rules=_rules(), router=app.router)
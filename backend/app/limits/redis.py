@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import time
+
+import redis.asyncio as redis
+
+from ..config import settings
+from .base import LimiterBackend
+
+# a crashed worker can never hold a slot for longer than this
+SLOT_TTL_SECONDS = 3600
+
+TAKE_SCRIPT = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens') or ARGV[2])
+local updated = tonumber(redis.call('HGET', KEYS[1], 'updated') or ARGV[3])
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisLimiter(LimiterBackend):
+    def __init__(self) -> None:
+        self.client = redis.from_url(settings.LIMITS_REDIS_URL)
+        self.take_script = self.client.register_script(TAKE_SCRIPT)
+
+    async def acquire(self, key: str, limit: int) -> bool:
+        key = f"limits:slots:{key}"
+        async with self.client.pipeline(transaction=True) as pipe:
+            current, _ = await pipe.incr(key).expire(key, SLOT_TTL_SECONDS).execute()
+        if current > limit:
+            await self.client.decr(key)
+            return False
+        return True
+
+    async def release(self, key: str) -> None:
+        await self.client.decr(f"limits:slots:{key}")
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        wait = await self.take_script(keys=[f"limits:bucket:{key}"], args=[rate, burst, time.time()])
+        return float(wait)
@@ -11,23 +11,37 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 from .albums.routes import router as albums_router
 from .auth.routes import router as auth_router
 from .config import settings
-from .db import init_db
+from .db import async_engine, engine, init_db
+from .db_replicas import READ_PRIMARY_COOKIE, SAFE_METHODS, replicas
+from .media.metadata import metadata_pool
 from .media.routes import router as media_router
+from .metrics import install_metrics
+from .passwords import password_pool
+from .home.routes import router as home_router
+from .jobs.runner import runner
+from .limits.middleware import install_limits
 from .home_sections.routes import router as home_sections_router
 from .tags.routes import router as tags_router
 from .social.routes import router as social_router
+from .system.routes import router as system_router
+from .timing import install_server_timing
 from .utils.api import AppError, success
 
 app = FastAPI(title="Suzuhara Media API", version="0.1.0")
 
+install_limits(app)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins_list(),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+install_server_timing(app)
+
 
 @app.middleware("http")
 async def add_request_id(request: Request, call_next):
@@ -37,6 +51,21 @@ async def add_request_id(request: Request, call_next):
     return response
 
 
+@app.middleware("http")
+async def pin_reads_after_write(request: Request, call_next):
+    response = await call_next(request)
+    # keep this client's reads on the primary long enough to see its own writes
+    if replicas.replicas and request.method not in SAFE_METHODS and response.status_code < 400:
+        response.set_cookie(
+            READ_PRIMARY_COOKIE,
+            "1",
+            max_age=settings.DB_READ_YOUR_WRITES_SECONDS,
+            httponly=True,
+            samesite="lax",
+        )
+    return response
+
+
 @app.exception_handler(AppError)
 async def handle_app_error(request: Request, exc: AppError):
     return JSONResponse(
@@ -46,6 +75,7 @@ async def handle_app_error(request: Request, exc: AppError):
             "message": exc.message,
             "request_id": request.state.request_id,
         },
+        headers=exc.headers,
     )
 
 
@@ -80,14 +110,34 @@ async def healthcheck():
     return success({"status": "ok"})
 
 
+install_metrics(app)
+
 app.include_router(auth_router)
 app.include_router(albums_router)
 app.include_router(media_router)
 app.include_router(tags_router)
 app.include_router(social_router)
 app.include_router(home_sections_router)
+app.include_router(home_router)
+app.include_router(system_router)
 
 
 @app.on_event("startup")
 def on_startup() -> None:
     init_db()
+
+
+@app.on_event("startup")
+async def start_background_tasks() -> None:
+    replicas.start()
+    runner.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    await runner.stop()
+    password_pool.shutdown()
+    metadata_pool.shutdown()
+    await replicas.stop()
+    await async_engine.dispose()
+    engine.dispose()
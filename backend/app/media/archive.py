@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import time
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path, PurePath
+from typing import Iterable, Iterator, Optional
+from urllib.parse import quote
+
+from ..config import settings
+from ..metrics import observe_bytes_streamed
+from ..models import Media
+
+READ_SIZE = 1024 * 512
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+
+@dataclass(frozen=True, slots=True)
+class ArchiveEntry:
+    name: str
+    path: Path
+    size: int
+    date_time: tuple[int, int, int, int, int, int]
+
+
+class _Sink:
+    # an unseekable target: zipfile then writes sizes and CRCs in data
+    # descriptors after each member, so nothing is ever rewound or buffered
+    # beyond the chunk just written
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> Iterator[bytes]:
+        chunks, self._chunks = self._chunks, []
+        yield from chunks
+
+
+def _unique_name(filename: str, used: set[str]) -> str:
+    name = PurePath(filename.replace("\\", "/")).name or "file"
+    stem, suffix = PurePath(name).stem, PurePath(name).suffix
+    candidate, counter = name, 2
+    while candidate.lower() in used:
+        candidate = f"{stem} ({counter}){suffix}"
+        counter += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+def _date_time(value: Optional[datetime]) -> tuple[int, int, int, int, int, int]:
+    if value is None or value.year < 1980:
+        return ZIP_EPOCH
+    return value.timetuple()[:6]
+
+
+def archive_entries(media_items: Iterable[Media]) -> list[ArchiveEntry]:
+    # resolved up front: the response streams after the request's session is
+    # gone, so the generator only ever touches plain paths
+    root = Path(settings.MEDIA_ROOT)
+    used: set[str] = set()
+    entries = []
+    for media in media_items:
+        path = root / media.storage_path
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            continue
+        entries.append(
+            ArchiveEntry(_unique_name(media.filename, used), path, size, _date_time(media.taken_at or media.created_at))
+        )
+    return entries
+
+
+def stream_zip(entries: list[ArchiveEntry]) -> Iterator[bytes]:
+    # members are stored, not deflated: photos and videos are already
+    # compressed, and stored members stream at disk speed
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for entry in entries:
+            try:
+                source = entry.path.open("rb")
+            except FileNotFoundError:
+                continue
+            info = zipfile.ZipInfo(entry.name, date_time=entry.date_time)
+            info.file_size = entry.size
+            with source, archive.open(info, "w", force_zip64=entry.size >= zipfile.ZIP64_LIMIT) as target:
+                while chunk := source.read(READ_SIZE):
+                    target.write(chunk)
+                    observe_bytes_streamed("archive", len(chunk))
+                    yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
+
+
+def content_disposition(title: str) -> str:
+    fallback = f"archive-{int(time.time())}.zip"
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(f'{title}.zip')}"
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+from ..config import settings
+
+# Generated outputs that span several files (HLS renditions, storyboards) live
+# in MEDIA_ROOT/<kind>/<media id>-<token>/. Each run writes a fresh directory,
+# the row is repointed at it once complete, and the previous one is removed.
+
+
+def new_output_dir(kind: str, media_id: int) -> Path:
+    rel_dir = Path(kind) / f"{media_id}-{uuid4().hex[:12]}"
+    (Path(settings.MEDIA_ROOT) / rel_dir).mkdir(parents=True, exist_ok=True)
+    return rel_dir
+
+
+def remove_output(rel_file: Optional[str]) -> None:
+    if rel_file:
+        shutil.rmtree(Path(settings.MEDIA_ROOT) / Path(rel_file).parent, ignore_errors=True)
+
+
+def remove_stale_outputs(kind: str, media_id: int, keep: Optional[str]) -> None:
+    # output left behind by a run that was interrupted
+    keep_dir = Path(keep).parent.name if keep else None
+    for path in (Path(settings.MEDIA_ROOT) / kind).glob(f"{media_id}-*"):
+        if path.is_dir() and path.name != keep_dir:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def resolve_output_asset(rel_file: str, asset: str, suffixes) -> Optional[Path]:
+    base = (Path(settings.MEDIA_ROOT) / rel_file).parent.resolve()
+    path = (base / asset).resolve()
+    if not path.is_relative_to(base) or path.suffix not in suffixes or not path.is_file():
+        return None
+    return path
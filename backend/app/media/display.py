@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image, ImageOps, features
+
+from ..config import settings
+from .derived import new_output_dir, remove_output
+from .metadata import open_image
+
+DISPLAY_DIR = "display"
+# originals browsers either cannot render or that are far too large to send
+DISPLAY_SOURCE_EXTENSIONS = {".heic", ".heif", ".tif", ".tiff", ".bmp"}
+
+# format name -> (Pillow format, file suffix, mime type), in preference order
+DISPLAY_FORMATS = {
+    "avif": ("AVIF", ".avif", "image/avif"),
+    "webp": ("WEBP", ".webp", "image/webp"),
+    "jpeg": ("JPEG", ".jpg", "image/jpeg"),
+}
+
+
+def needs_display_copy(storage_path: str) -> bool:
+    return Path(storage_path).suffix.lower() in DISPLAY_SOURCE_EXTENSIONS
+
+
+def _enabled_formats() -> list[str]:
+    names = [name.strip() for name in settings.DISPLAY_FORMATS.split(",") if name.strip() in DISPLAY_FORMATS]
+    names = [name for name in names if name == "jpeg" or features.check(name)]
+    # jpeg is always written so every client has something to fall back to
+    return names if "jpeg" in names else [*names, "jpeg"]
+
+
+def generate_display_copies(media_id: int, source: Path) -> Optional[str]:
+    original = open_image(source)
+    if original is None:
+        return None
+    rel_dir = new_output_dir(DISPLAY_DIR, media_id)
+    output = Path(settings.MEDIA_ROOT) / rel_dir
+    rel_file = (rel_dir / "display.jpg").as_posix()
+    try:
+        with original:
+            image = ImageOps.exif_transpose(original).convert("RGB")
+        image.thumbnail((settings.DISPLAY_MAX_EDGE, settings.DISPLAY_MAX_EDGE), Image.Resampling.LANCZOS)
+        for name in _enabled_formats():
+            pil_format, suffix, _ = DISPLAY_FORMATS[name]
+            image.save(output / f"display{suffix}", pil_format, quality=settings.DISPLAY_QUALITY)
+    except BaseException:
+        remove_output(rel_file)
+        raise
+    return rel_file
+
+
+def negotiate_display(display_path: str, accept: str) -> Optional[tuple[Path, str]]:
+    accepted = {item.split(";")[0].strip().lower() for item in accept.split(",")}
+    base = Path(settings.MEDIA_ROOT) / display_path
+    for _, suffix, mime in DISPLAY_FORMATS.values():
+        if mime != "image/jpeg" and mime not in accepted:
+            continue
+        candidate = base.with_suffix(suffix)
+        if candidate.exists():
+            return candidate, mime
+    return None
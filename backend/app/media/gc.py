@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import time
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import or_, select
+
+from ..config import settings
+from ..db import SessionLocal
+from ..models import Media
+from .display import DISPLAY_DIR
+from .hls import HLS_DIR
+from .storyboard import STORYBOARD_DIR
+
+logger = logging.getLogger(__name__)
+
+# multi-file outputs are judged per directory, everything else per file
+OUTPUT_DIRS = {HLS_DIR, STORYBOARD_DIR, DISPLAY_DIR}
+FILE_COLUMNS = (Media.storage_path, Media.preview_path, Media.waveform_path)
+DIR_COLUMNS = (Media.hls_path, Media.storyboard_path, Media.display_path)
+SAMPLE_SIZE = 20
+
+
+def _key(rel_path: str) -> int:
+    return int.from_bytes(hashlib.blake2b(rel_path.encode(), digest_size=8).digest(), "big")
+
+
+class PathSet:
+    # sorted 64-bit digests of every referenced path: 8 bytes per entry, so a
+    # library of millions of files fits in a few tens of MB. A digest
+    # collision can only keep an orphan alive, never delete a live file.
+    def __init__(self, paths: Iterable[str]) -> None:
+        self._keys = array("Q", sorted({_key(path) for path in paths}))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, rel_path: str) -> bool:
+        key = _key(rel_path)
+        index = bisect_left(self._keys, key)
+        return index < len(self._keys) and self._keys[index] == key
+
+
+def load_live_paths(batch_size: int = 10000) -> PathSet:
+    def rows() -> Iterator[str]:
+        with SessionLocal() as session:
+            result = session.execute(
+                select(*FILE_COLUMNS, *DIR_COLUMNS).execution_options(yield_per=batch_size)
+            )
+            for row in result:
+                for value in row[: len(FILE_COLUMNS)]:
+                    if value:
+                        yield value
+                for value in row[len(FILE_COLUMNS) :]:
+                    if value:
+                        yield Path(value).parent.as_posix()
+
+    return PathSet(rows())
+
+
+def _still_unreferenced(candidates: list[str], output_dirs: set[str]) -> set[str]:
+    # the live set is a snapshot taken before the walk; rows committed since
+    # (a relayout or an import linking files in) must still protect their files
+    files = [rel_path for rel_path in candidates if rel_path not in output_dirs]
+    dirs = [rel_path for rel_path in candidates if rel_path in output_dirs]
+    clauses = [column.in_(files) for column in FILE_COLUMNS] if files else []
+    clauses += [column.like(f"{rel_dir}/%") for rel_dir in dirs for column in DIR_COLUMNS]
+    if not clauses:
+        return set()
+    referenced: set[str] = set()
+    with SessionLocal() as session:
+        for row in session.execute(select(*FILE_COLUMNS, *DIR_COLUMNS).where(or_(*clauses))):
+            referenced.update(value for value in row[: len(FILE_COLUMNS)] if value)
+            referenced.update(Path(value).parent.as_posix() for value in row[len(FILE_COLUMNS) :] if value)
+    return set(candidates) - referenced
+
+
+def _walk(root: Path) -> Iterator[tuple[str, os.DirEntry]]:
+    # iterative scandir so memory is bounded by directory depth, not tree size
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            with os.scandir(root / rel_dir) as entries:
+                for entry in entries:
+                    if entry.name.startswith("."):
+                        continue
+                    rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        if rel_dir in OUTPUT_DIRS:
+                            yield rel_path, entry
+                        else:
+                            stack.append(rel_path)
+                    elif rel_dir and entry.is_file(follow_symlinks=False):
+                        # nothing managed lives at the top level (bench-seed.json
+                        # and the like), so only nested files are candidates
+                        yield rel_path, entry
+        except FileNotFoundError:
+            continue
+
+
+def _tree_size(path: str) -> int:
+    total = 0
+    for base, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.stat(os.path.join(base, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+@dataclass
+class GcReport:
+    dry_run: bool
+    live_paths: int = 0
+    scanned: int = 0
+    orphans: int = 0
+    orphan_bytes: int = 0
+    deleted: int = 0
+    skipped_recent: int = 0
+    errors: int = 0
+    sample: list[str] = field(default_factory=list)
+
+
+def collect_garbage(*, dry_run: bool, grace_seconds: Optional[int] = None) -> GcReport:
+    root = Path(settings.MEDIA_ROOT)
+    report = GcReport(dry_run=dry_run)
+    # anything modified inside the grace period may belong to an upload or a
+    # task whose row is not committed yet
+    cutoff = time.time() - (settings.GC_GRACE_SECONDS if grace_seconds is None else grace_seconds)
+    live = load_live_paths()
+    report.live_paths = len(live)
+
+    pending: list[tuple[str, os.DirEntry]] = []
+
+    def flush() -> None:
+        unreferenced = _still_unreferenced(
+            [rel_path for rel_path, _ in pending],
+            {rel_path for rel_path, entry in pending if entry.is_dir(follow_symlinks=False)},
+        )
+        for rel_path, entry in pending:
+            if rel_path not in unreferenced:
+                report.orphans -= 1
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.unlink(entry.path)
+                report.deleted += 1
+            except FileNotFoundError:
+                pass
+            except OSError:
+                report.errors += 1
+                logger.exception("gc could not remove %s", rel_path)
+        pending.clear()
+        # throttle so a large cleanup does not starve streaming of disk IO
+        time.sleep(settings.GC_DELETE_PAUSE_SECONDS)
+
+    for rel_path, entry in _walk(root):
+        report.scanned += 1
+        if rel_path in live:
+            continue
+        try:
+            stat = entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+        # link() keeps the source's mtime but updates ctime, so a file just
+        # hard-linked in by relayout or import --link counts as recent
+        if max(stat.st_mtime, stat.st_ctime) > cutoff:
+            report.skipped_recent += 1
+            continue
+        report.orphans += 1
+        report.orphan_bytes += _tree_size(entry.path) if entry.is_dir(follow_symlinks=False) else stat.st_size
+        if len(report.sample) < SAMPLE_SIZE:
+            report.sample.append(rel_path)
+        if not dry_run:
+            pending.append((rel_path, entry))
+            if len(pending) >= settings.GC_DELETE_BATCH:
+                flush()
+    if pending:
+        flush()
+    return report
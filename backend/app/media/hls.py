@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import subprocess
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from ..config import settings
+from ..metrics import observe_ffmpeg
+from .derived import new_output_dir, remove_output
+
+HLS_DIR = "hls"
+MASTER_PLAYLIST = "master.m3u8"
+CONTENT_TYPES = {".m3u8": "application/vnd.apple.mpegurl", ".ts": "video/mp2t"}
+
+# target video bitrate per rendition height (kbit/s)
+LADDER = {240: 400, 360: 800, 480: 1400, 720: 2800, 1080: 5000, 1440: 9000, 2160: 16000}
+AUDIO_KBPS = 128
+# per rendition: an encode slower than this multiple of realtime, or a copy
+# slower than the byte floor, is treated as stuck rather than busy
+HLS_TIMEOUT_BASE_SECONDS = 120
+HLS_TIMEOUT_REALTIME_FACTOR = 4
+HLS_MIN_BYTES_PER_SECOND = 8 * 1024 * 1024
+
+
+@dataclass(frozen=True, slots=True)
+class Rendition:
+    name: str
+    width: int
+    height: int
+    bandwidth: int
+    copy: bool
+
+
+def _even(value: float) -> int:
+    return max(2, int(round(value / 2)) * 2)
+
+
+def plan_renditions(
+    width: int, height: int, bitrate: Optional[int], video_codec: Optional[str], audio_codec: Optional[str]
+) -> list[Rendition]:
+    renditions = []
+    for target in sorted({int(item) for item in settings.HLS_RENDITIONS.split(",") if item.strip()}):
+        if target >= height:
+            continue
+        kbps = LADDER.get(target) or LADDER[min(LADDER, key=lambda known: abs(known - target))]
+        renditions.append(
+            Rendition(f"{target}p", _even(width * target / height), target, (kbps + AUDIO_KBPS) * 1000, False)
+        )
+    # the source rendition is a plain stream copy when browsers can already
+    # play its codecs, so packaging it costs no encode
+    copy = video_codec == "h264" and audio_codec in (None, "aac", "mp3")
+    renditions.append(
+        Rendition("source", width, height, bitrate or (LADDER.get(height, 5000) + AUDIO_KBPS) * 1000, copy)
+    )
+    return renditions
+
+
+def _timeout(source: Path, duration_sec: Optional[int]) -> float:
+    return (
+        HLS_TIMEOUT_BASE_SECONDS
+        + (duration_sec or 0) * HLS_TIMEOUT_REALTIME_FACTOR
+        + source.stat().st_size / HLS_MIN_BYTES_PER_SECOND
+    )
+
+
+def _package(source: Path, output: Path, rendition: Rendition, timeout: float) -> None:
+    output.mkdir(parents=True, exist_ok=True)
+    command = ["ffmpeg", "-y", "-v", "error", "-i", str(source), "-map", "0:v:0", "-map", "0:a:0?"]
+    if rendition.copy:
+        command += ["-c", "copy"]
+    else:
+        kbps = rendition.bandwidth // 1000 - AUDIO_KBPS
+        command += [
+            "-vf",
+            f"scale={rendition.width}:{rendition.height}",
+            "-c:v",
+            "libx264",
+            "-preset",
+            settings.HLS_PRESET,
+            "-b:v",
+            f"{kbps}k",
+            "-maxrate",
+            f"{int(kbps * 1.07)}k",
+            "-bufsize",
+            f"{kbps * 2}k",
+            # keyframes on segment boundaries keep every rendition aligned
+            "-force_key_frames",
+            f"expr:gte(t,n_forced*{settings.HLS_SEGMENT_SECONDS})",
+            "-c:a",
+            "aac",
+            "-b:a",
+            f"{AUDIO_KBPS}k",
+            "-ac",
+            "2",
+        ]
+    command += [
+        "-f",
+        "hls",
+        "-hls_time",
+        str(settings.HLS_SEGMENT_SECONDS),
+        "-hls_playlist_type",
+        "vod",
+        "-hls_segment_filename",
+        str(output / "seg_%05d.ts"),
+        str(output / "index.m3u8"),
+    ]
+    started = time.perf_counter()
+    try:
+        subprocess.run(command, capture_output=True, check=True, timeout=timeout)
+    except FileNotFoundError as exc:
+        raise RuntimeError("FFMPEG_NOT_FOUND") from exc
+    except subprocess.TimeoutExpired as exc:
+        raise RuntimeError(f"HLS_FAILED ({rendition.name}): timed out after {round(timeout)}s") from exc
+    except subprocess.CalledProcessError as exc:
+        stderr = exc.stderr.decode("utf-8", errors="ignore") if exc.stderr else ""
+        raise RuntimeError(f"HLS_FAILED ({rendition.name}): {stderr.strip()[:500]}") from exc
+    finally:
+        observe_ffmpeg("hls", time.perf_counter() - started)
+
+
+def _master_playlist(renditions: list[Rendition]) -> str:
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
+    for rendition in sorted(renditions, key=lambda item: item.bandwidth):
+        lines.append(
+            f"#EXT-X-STREAM-INF:BANDWIDTH={rendition.bandwidth},RESOLUTION={rendition.width}x{rendition.height}"
+        )
+        lines.append(f"{rendition.name}/index.m3u8")
+    return "\n".join(lines) + "\n"
+
+
+def package_hls(media_id: int, source: Path, renditions: list[Rendition], duration_sec: Optional[int]) -> str:
+    rel_dir = new_output_dir(HLS_DIR, media_id)
+    rel_file = (rel_dir / MASTER_PLAYLIST).as_posix()
+    output = Path(settings.MEDIA_ROOT) / rel_dir
+    timeout = _timeout(source, duration_sec)
+    try:
+        for rendition in renditions:
+            _package(source, output / rendition.name, rendition, timeout)
+        (output / MASTER_PLAYLIST).write_text(_master_playlist(renditions))
+    except BaseException:
+        # a failed, timed out or interrupted run leaves no hls/<id>-* behind
+        remove_output(rel_file)
+        raise
+    return rel_file
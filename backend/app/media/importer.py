@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import logging
+import mimetypes
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from ..config import settings
+from ..db import SessionLocal
+from ..models import Album, Media, MediaTask, User
+from .routes import AUDIO_EXTENSIONS, IMAGE_EXTENSIONS, VIDEO_EXTENSIONS, _classify_type, _initial_task_kinds
+from .storage import file_sha256, link_into_place, new_storage_path
+
+logger = logging.getLogger(__name__)
+
+MEDIA_EXTENSIONS = IMAGE_EXTENSIONS | VIDEO_EXTENSIONS | AUDIO_EXTENSIONS
+LOOKUP_CHUNK = 1000
+
+
+@dataclass
+class ImportReport:
+    dry_run: bool
+    scanned: int = 0
+    known: int = 0
+    repeated: int = 0
+    imported: int = 0
+    bytes: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    failed: list[str] = field(default_factory=list)
+
+
+def _walk(root: Path) -> Iterator[Path]:
+    for base, dirs, files in os.walk(root):
+        dirs[:] = sorted(name for name in dirs if not name.startswith("."))
+        for name in sorted(files):
+            if not name.startswith(".") and Path(name).suffix.lower() in MEDIA_EXTENSIONS:
+                yield Path(base) / name
+
+
+def _hash(path: Path) -> tuple[Path, int, Optional[str]]:
+    # runs in a worker process; errors come back as a missing digest so one
+    # unreadable file does not abort the batch
+    try:
+        return path, path.stat().st_size, file_sha256(path)
+    except OSError:
+        return path, 0, None
+
+
+def _place(source: Path, rel_path: Path, link: bool) -> Optional[bool]:
+    try:
+        return link_into_place(source, rel_path, link=link)
+    except OSError:
+        logger.exception("could not place %s", source)
+        return None
+
+
+def _known_hashes(session, hashes: list[str]) -> set[str]:
+    known: set[str] = set()
+    for start in range(0, len(hashes), LOOKUP_CHUNK):
+        known.update(
+            session.execute(select(Media.sha256).where(Media.sha256.in_(hashes[start : start + LOOKUP_CHUNK]))).scalars()
+        )
+    return known
+
+
+def import_tree(
+    root: Path,
+    *,
+    owner: str,
+    album_id: Optional[int] = None,
+    link: bool = False,
+    workers: Optional[int] = None,
+    batch_size: int = 2000,
+    dry_run: bool = False,
+) -> ImportReport:
+    started = time.perf_counter()
+    report = ImportReport(dry_run=dry_run)
+    media_root = Path(settings.MEDIA_ROOT)
+    workers = workers or os.cpu_count() or 1
+
+    with SessionLocal() as session:
+        owner_id = session.execute(select(User.id).where(User.username == owner)).scalar_one_or_none()
+        if owner_id is None:
+            raise SystemExit(f"user {owner!r} not found")
+        if album_id is not None and session.get(Album, album_id) is None:
+            raise SystemExit(f"album {album_id} not found")
+
+        # hashing is CPU bound and goes to processes; placing files is IO
+        # bound and goes to threads; the database sees one statement per
+        # batch rather than one per file
+        with ProcessPoolExecutor(max_workers=workers) as hashers, ThreadPoolExecutor(max_workers=workers) as placers:
+            paths = _walk(root)
+            seen: set[str] = set()
+            while batch := list(islice(paths, batch_size)):
+                report.scanned += len(batch)
+                hashed = []
+                for path, size, sha256 in hashers.map(_hash, batch, chunksize=max(1, len(batch) // (workers * 4))):
+                    if sha256 is None or size == 0:
+                        report.errors += 1
+                        report.failed.append(str(path))
+                    elif sha256 in seen:
+                        report.repeated += 1
+                    else:
+                        seen.add(sha256)
+                        hashed.append((path, size, sha256))
+
+                known = _known_hashes(session, [sha256 for _, _, sha256 in hashed])
+                report.known += sum(1 for _, _, sha256 in hashed if sha256 in known)
+                fresh = [item for item in hashed if item[2] not in known]
+                if dry_run or not fresh:
+                    report.imported += len(fresh)
+                    report.bytes += sum(size for _, size, _ in fresh)
+                    continue
+
+                targets = [new_storage_path(sha256, path.suffix) for path, _, sha256 in fresh]
+                placed = placers.map(lambda item: _place(item[0][0], item[1], link), zip(fresh, targets))
+                kept = []
+                for (path, size, sha256), rel_path, created in zip(fresh, targets, placed):
+                    if created is None:
+                        report.errors += 1
+                        report.failed.append(str(path))
+                    else:
+                        kept.append((path, size, sha256, rel_path, created))
+                if not kept:
+                    continue
+                rows = []
+                for path, size, sha256, rel_path, _ in kept:
+                    mime = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+                    rows.append(
+                        {
+                            "owner_id": owner_id,
+                            "album_id": album_id,
+                            "type": _classify_type(mime, path.name),
+                            "filename": path.name,
+                            "title": path.name,
+                            "mime_type": mime,
+                            "bytes": size,
+                            "sha256": sha256,
+                            "storage_path": rel_path.as_posix(),
+                        }
+                    )
+                try:
+                    session.execute(insert(Media), rows)
+                    ids = dict(
+                        session.execute(
+                            select(Media.sha256, Media.id).where(Media.sha256.in_([row["sha256"] for row in rows]))
+                        ).all()
+                    )
+                    tasks = [
+                        {"media_id": ids[row["sha256"]], "kind": kind, "status": "pending", "attempts": 0}
+                        for row in rows
+                        for kind in _initial_task_kinds(row["type"], row["storage_path"])
+                    ]
+                    if tasks:
+                        session.execute(insert(MediaTask), tasks)
+                    session.commit()
+                except IntegrityError:
+                    # something uploaded the same bytes meanwhile; the next
+                    # run skips those and imports the rest
+                    session.rollback()
+                    for path, _, _, rel_path, created in kept:
+                        if created:
+                            (media_root / rel_path).unlink(missing_ok=True)
+                        report.failed.append(str(path))
+                    report.errors += len(kept)
+                    logger.warning("import batch of %s hit a concurrent upload; rerun to import it", len(rows))
+                    continue
+                report.imported += len(rows)
+                report.bytes += sum(row["bytes"] for row in rows)
+                logger.info("imported %s of %s files scanned", report.imported, report.scanned)
+
+    report.seconds = round(time.perf_counter() - started, 2)
+    return report
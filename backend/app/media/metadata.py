@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from pillow_heif import register_heif_opener
+
+from ..config import settings
+from .similar import dhash
+
+# HEIC/HEIF originals from phones decode through the same Image.open calls
+register_heif_opener()
+
+EXIF_IFD = 0x8769
+EXIF_DATETIME = 0x0132
+EXIF_DATETIME_ORIGINAL = 0x9003
+EXIF_OFFSET_TIME_ORIGINAL = 0x9011
+EXIF_ORIENTATION = 0x0112
+
+PLACEHOLDER_SIZE = 32
+BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+
+@dataclass(frozen=True, slots=True)
+class ImageMetadata:
+    width: int
+    height: int
+    taken_at: Optional[datetime]
+    blurhash: str
+    phash: int
+
+
+def _parse_exif_datetime(value: object, offset: object) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    value = value.strip("\x00 ")
+    try:
+        parsed = datetime.strptime(value, "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        return None
+    if isinstance(offset, str):
+        try:
+            parsed = datetime.fromisoformat(f"{parsed.isoformat()}{offset.strip()}")
+        except ValueError:
+            pass
+    return parsed
+
+
+def _encode83(value: int, length: int) -> str:
+    return "".join(BASE83[value // 83 ** (length - index - 1) % 83] for index in range(length))
+
+
+def _srgb_to_linear(value: int) -> float:
+    v = value / 255
+    return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+
+def _linear_to_srgb(value: float) -> int:
+    v = max(0.0, min(1.0, value))
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value: float, exp: float) -> float:
+    return math.copysign(abs(value) ** exp, value)
+
+
+def blurhash_encode(image: Image.Image, x_components: int, y_components: int) -> str:
+    width, height = image.size
+    pixels = [tuple(_srgb_to_linear(channel) for channel in pixel) for pixel in image.getdata()]
+    cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(x_components)]
+    cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(y_components)]
+
+    factors: list[tuple[float, float, float]] = []
+    for j in range(y_components):
+        for i in range(x_components):
+            scale = (1 if i == 0 and j == 0 else 2) / (width * height)
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                for x in range(width):
+                    basis = cos_x[i][x] * cos_y[j][y]
+                    pr, pg, pb = pixels[row + x]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _encode83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        actual_max = max(abs(value) for factor in ac for value in factor)
+        quantised_max = max(0, min(82, math.floor(actual_max * 166 - 0.5)))
+        max_value = (quantised_max + 1) / 166
+        result += _encode83(quantised_max, 1)
+    else:
+        max_value = 1.0
+        result += _encode83(0, 1)
+    result += _encode83(
+        (_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4
+    )
+    for factor in ac:
+        r, g, b = (
+            max(0, min(18, math.floor(_sign_pow(value / max_value, 0.5) * 9 + 9.5))) for value in factor
+        )
+        result += _encode83(r * 19 * 19 + g * 19 + b, 2)
+    return result
+
+
+def open_image(path: Path) -> Optional[Image.Image]:
+    try:
+        return Image.open(path)
+    except (UnidentifiedImageError, Image.DecompressionBombError):
+        return None
+
+
+def read_image_metadata(path: Path) -> Optional[ImageMetadata]:
+    image = open_image(path)
+    if image is None:
+        return None
+    with image:
+        exif = image.getexif()
+        exif_ifd = exif.get_ifd(EXIF_IFD)
+        taken_at = _parse_exif_datetime(
+            exif_ifd.get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME),
+            exif_ifd.get(EXIF_OFFSET_TIME_ORIGINAL),
+        )
+        width, height = image.size
+        if exif.get(EXIF_ORIENTATION) in (5, 6, 7, 8):
+            width, height = height, width
+
+        # let the JPEG decoder downscale while decoding; only a thumbnail is
+        # needed for the placeholder
+        image.draft("RGB", (PLACEHOLDER_SIZE * 2, PLACEHOLDER_SIZE * 2))
+        thumb = ImageOps.exif_transpose(image).convert("RGB")
+        thumb.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+        x_components, y_components = (4, 3) if width >= height else (3, 4)
+        return ImageMetadata(
+            width, height, taken_at, blurhash_encode(thumb, x_components, y_components), dhash(thumb)
+        )
+
+
+class MetadataPool:
+    # decoding, the blurhash and the dhash are pure CPU work that holds the
+    # GIL; in the web process that would stall the event loop and every
+    # request thread, so it runs in a separate process pool like bcrypt does
+    def __init__(self) -> None:
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=settings.METADATA_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def read(self, path: Path) -> Optional[ImageMetadata]:
+        if settings.METADATA_WORKERS <= 0:
+            return read_image_metadata(path)
+        return self._get_executor().submit(read_image_metadata, path).result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+metadata_pool = MetadataPool()
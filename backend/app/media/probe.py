@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from ..metrics import observe_ffmpeg
+
+PROBE_TIMEOUT_SECONDS = 60
+
+
+@dataclass(frozen=True, slots=True)
+class VideoProbe:
+    duration_sec: Optional[int]
+    width: Optional[int]
+    height: Optional[int]
+    video_codec: Optional[str]
+    audio_codec: Optional[str]
+    bitrate: Optional[int]
+
+
+def _to_float(value: object) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value: object) -> Optional[int]:
+    number = _to_float(value)
+    return int(number) if number is not None else None
+
+
+def _rotation(stream: dict) -> int:
+    rotate = _to_int(stream.get("tags", {}).get("rotate"))
+    if rotate is None:
+        for side_data in stream.get("side_data_list", []):
+            rotate = _to_int(side_data.get("rotation"))
+            if rotate is not None:
+                break
+    return abs(rotate or 0) % 180
+
+
+def parse_probe(report: dict) -> VideoProbe:
+    streams = report.get("streams", [])
+    # cover art is reported as a video stream flagged attached_pic
+    video = next(
+        (s for s in streams if s.get("codec_type") == "video" and not s.get("disposition", {}).get("attached_pic")),
+        None,
+    )
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    fmt = report.get("format", {})
+
+    width = height = None
+    if video is not None:
+        width, height = _to_int(video.get("width")), _to_int(video.get("height"))
+        if _rotation(video) == 90:
+            width, height = height, width
+    duration = _to_float(fmt.get("duration"))
+    if duration is None and video is not None:
+        duration = _to_float(video.get("duration"))
+    return VideoProbe(
+        duration_sec=round(duration) if duration is not None else None,
+        width=width,
+        height=height,
+        video_codec=video.get("codec_name") if video else None,
+        audio_codec=audio.get("codec_name") if audio else None,
+        bitrate=_to_int(fmt.get("bit_rate")),
+    )
+
+
+def probe_video(path: Path) -> VideoProbe:
+    command = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-print_format",
+        "json",
+        "-show_format",
+        "-show_streams",
+        str(path),
+    ]
+    started = time.perf_counter()
+    try:
+        result = subprocess.run(command, capture_output=True, check=True, timeout=PROBE_TIMEOUT_SECONDS)
+    except FileNotFoundError as exc:
+        raise RuntimeError("FFPROBE_NOT_FOUND") from exc
+    except subprocess.TimeoutExpired as exc:
+        raise RuntimeError("FFPROBE_TIMEOUT") from exc
+    except subprocess.CalledProcessError as exc:
+        stderr = exc.stderr.decode("utf-8", errors="ignore") if exc.stderr else ""
+        raise RuntimeError(f"FFPROBE_FAILED: {stderr.strip()[:500]}") from exc
+    finally:
+        observe_ffmpeg("video_probe", time.perf_counter() - started)
+    return parse_probe(json.loads(result.stdout or b"{}"))
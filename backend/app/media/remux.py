@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import struct
+import subprocess
+import time
+from pathlib import Path
+
+from ..metrics import observe_ffmpeg
+
+FASTSTART_EXTENSIONS = {".mp4", ".m4v", ".mov"}
+# a stream copy is bound by disk speed, so the allowance grows with the file;
+# the floor rate is far below any working disk, which leaves only stuck runs
+FASTSTART_TIMEOUT_BASE_SECONDS = 60
+FASTSTART_MIN_BYTES_PER_SECOND = 8 * 1024 * 1024
+
+
+def needs_faststart(path: Path) -> bool:
+    # walk the top-level boxes until moov or mdat shows up; only a file whose
+    # media data precedes its index needs remuxing
+    file_size = path.stat().st_size
+    with path.open("rb") as file:
+        offset = 0
+        while offset + 8 <= file_size:
+            file.seek(offset)
+            header = file.read(8)
+            if len(header) < 8:
+                return False
+            size, box_type = struct.unpack(">I4s", header)
+            if size == 1:
+                size = struct.unpack(">Q", file.read(8))[0]
+            elif size == 0:
+                size = file_size - offset
+            if box_type == b"moov":
+                return False
+            if box_type == b"mdat":
+                return True
+            if size < 8:
+                return False
+            offset += size
+    return False
+
+
+def remux_faststart(source: Path, target: Path) -> None:
+    # stream copy only: the moov atom moves to the front, samples are untouched.
+    # Every track is kept, timecode and camera data tracks included, and
+    # streams ffmpeg cannot classify are copied rather than failing the run
+    command = [
+        "ffmpeg",
+        "-y",
+        "-v",
+        "error",
+        "-i",
+        str(source),
+        "-map",
+        "0",
+        "-c",
+        "copy",
+        "-copy_unknown",
+        "-movflags",
+        "+faststart",
+        str(target),
+    ]
+    timeout = FASTSTART_TIMEOUT_BASE_SECONDS + source.stat().st_size / FASTSTART_MIN_BYTES_PER_SECOND
+    started = time.perf_counter()
+    try:
+        subprocess.run(command, capture_output=True, check=True, timeout=timeout)
+    except FileNotFoundError as exc:
+        raise RuntimeError("FFMPEG_NOT_FOUND") from exc
+    except subprocess.TimeoutExpired as exc:
+        raise RuntimeError(f"FASTSTART_FAILED: timed out after {round(timeout)}s") from exc
+    except subprocess.CalledProcessError as exc:
+        stderr = exc.stderr.decode("utf-8", errors="ignore") if exc.stderr else ""
+        raise RuntimeError(f"FASTSTART_FAILED: {stderr.strip()[:500]}") from exc
+    finally:
+        observe_ffmpeg("faststart", time.perf_counter() - started)
@@ -5,23 +5,36 @@ import logging
 import mimetypes
 import re
 import subprocess
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Iterator, List, Optional
-from uuid import uuid4
 
 from fastapi import APIRouter, Depends, File, Form, Query, Request, UploadFile
-from fastapi.responses import FileResponse, StreamingResponse
-from pydantic import BaseModel
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 from sqlalchemy import func, or_, select
 from sqlalchemy.dialects.mysql import INTEGER as MySQLInteger
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
 from ..config import settings
-from ..deps import SessionDep, require_manager, require_user
-from ..models import Album, Media, Tag, User
+from ..deps import ReadSessionDep, SessionDep, require_manager, require_user
+from ..jobs.queue import enqueue_media_task
+from ..jobs.runner import runner
+from ..limits.middleware import limited
+from ..metrics import observe_bytes_streamed, observe_ffmpeg, observe_range_request, observe_upload
+from ..models import Album, Media, MediaTask, Tag, User
+from ..timing import timed
 from ..utils.api import AppError, success
+from .archive import archive_entries, content_disposition, stream_zip
+from .derived import remove_output, resolve_output_asset
+from .display import needs_display_copy, negotiate_display
+from .similar import MAX_DISTANCE as MAX_PHASH_DISTANCE, similarity_index, to_unsigned
+from .hls import CONTENT_TYPES as HLS_CONTENT_TYPES
+from .storyboard import CONTENT_TYPES as STORYBOARD_CONTENT_TYPES, INDEX_FILE as STORYBOARD_INDEX
+from .remux import FASTSTART_EXTENSIONS
+from .storage import content_hash, new_storage_path, write_once
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +52,15 @@ def _media_summary(media: Media) -> dict:
         "created_at": media.created_at,
         "taken_at": media.taken_at,
         "preview_path": media.preview_path,
+        "width": media.width,
+        "height": media.height,
+        "blurhash": media.blurhash,
+        "duration_sec": media.duration_sec,
+        "video_codec": media.video_codec,
+        "audio_codec": media.audio_codec,
+        "bitrate": media.bitrate,
+        "hls_path": media.hls_path,
+        "content_hash": content_hash(media.storage_path),
     }
 
 
@@ -51,7 +73,11 @@ def _media_detail(media: Media) -> dict:
         "duration_sec": media.duration_sec,
         "storage_path": media.storage_path,
         "preview_path": media.preview_path,
+        "storyboard_path": media.storyboard_path,
+        "waveform_path": media.waveform_path,
+        "display_path": media.display_path,
         "sha256": media.sha256,
+        "content_hash": content_hash(media.storage_path),
         "tags": [tag.name for tag in media.tags],
         "owner_id": media.owner_id,
     }
@@ -64,8 +90,12 @@ def _media_public_detail(media: Media) -> dict:
         "type": media.type,
         "mime_type": media.mime_type,
         "preview_path": media.preview_path,
+        "hls_path": media.hls_path,
+        "storyboard_path": media.storyboard_path,
+        "waveform_path": media.waveform_path,
         "album_id": media.album_id,
         "sha256": media.sha256,
+        "content_hash": content_hash(media.storage_path),
         "created_at": media.created_at,
     }
 
@@ -97,6 +127,20 @@ VIDEO_EXTENSIONS = {
     ".mpg",
 }
 
+AUDIO_EXTENSIONS = {
+    ".mp3",
+    ".m4a",
+    ".aac",
+    ".wav",
+    ".flac",
+    ".ogg",
+    ".oga",
+    ".opus",
+    ".wma",
+    ".aif",
+    ".aiff",
+}
+
 
 def _classify_type(mime: str, filename: Optional[str]) -> str:
     mime_lower = (mime or "").lower()
@@ -106,33 +150,19 @@ def _classify_type(mime: str, filename: Optional[str]) -> str:
         return "video"
     if mime_lower.startswith("image/"):
         return "image"
+    if mime_lower.startswith("audio/"):
+        return "audio"
 
     if ext in VIDEO_EXTENSIONS:
         return "video"
+    if ext in AUDIO_EXTENSIONS:
+        return "audio"
     if ext in IMAGE_EXTENSIONS:
         return "image"
 
     return "image"
 
 
-def _sync_media_types(session: Session) -> None:
-    medias = session.execute(select(Media)).scalars().all()
-    changed = False
-    for media in medias:
-        desired = _classify_type(media.mime_type, media.filename)
-        if media.type != desired:
-            media.type = desired
-            changed = True
-        if desired == "video" and not media.preview_path and media.storage_path:
-            preview_rel = _generate_video_preview(Path(media.storage_path))
-            if preview_rel:
-                media.preview_path = preview_rel
-                changed = True
-    if changed:
-        session.commit()
-        session.expire_all()
-
-
 def _generate_video_preview(rel_path: Path) -> Optional[str]:
     source_path = Path(settings.MEDIA_ROOT) / rel_path
     if not source_path.exists():
@@ -158,6 +188,7 @@ def _generate_video_preview(rel_path: Path) -> Optional[str]:
         str(preview_abs),
     ]
 
+    started = time.perf_counter()
     try:
         subprocess.run(command, capture_output=True, check=True)
     except FileNotFoundError:
@@ -170,13 +201,15 @@ def _generate_video_preview(rel_path: Path) -> Optional[str]:
             exc.stderr.decode("utf-8", errors="ignore") if exc.stderr else exc,
         )
         return None
+    finally:
+        observe_ffmpeg("video_preview", time.perf_counter() - started)
 
     if preview_abs.exists():
         return preview_rel.as_posix()
     return None
 
 
-def _file_iterator(path: Path, start: int, end: int) -> Iterator[bytes]:
+def _file_iterator(path: Path, start: int, end: int, *, kind: str = "file") -> Iterator[bytes]:
     chunk_size = 1024 * 512  # 512KB
     with path.open("rb") as file:
         file.seek(start)
@@ -187,15 +220,25 @@ def _file_iterator(path: Path, start: int, end: int) -> Iterator[bytes]:
             if not data:
                 break
             bytes_remaining -= len(data)
+            observe_bytes_streamed(kind, len(data))
             yield data
 
 
-def _serve_file(*, path: Path, request: Request, media_type: str, filename: str) -> StreamingResponse | FileResponse:
+def _serve_file(
+    *,
+    path: Path,
+    request: Request,
+    media_type: str,
+    filename: str,
+    kind: str = "file",
+    extra_headers: Optional[dict[str, str]] = None,
+) -> StreamingResponse | FileResponse:
     file_size = path.stat().st_size
     range_header = request.headers.get("range")
     headers = {
         "Accept-Ranges": "bytes",
         "Content-Disposition": f"inline; filename=\"{filename}\"",
+        **(extra_headers or {}),
     }
 
     if range_header:
@@ -209,8 +252,9 @@ def _serve_file(*, path: Path, request: Request, media_type: str, filename: str)
                 start = file_size - 1
             if end < start:
                 end = start
+            observe_range_request(kind)
             response = StreamingResponse(
-                _file_iterator(path, start, end),
+                _file_iterator(path, start, end, kind=kind),
                 media_type=media_type,
                 status_code=206,
                 headers={
@@ -221,6 +265,7 @@ def _serve_file(*, path: Path, request: Request, media_type: str, filename: str)
             )
             return response
 
+    observe_bytes_streamed(kind, file_size)
     return FileResponse(
         str(path),
         media_type=media_type,
@@ -229,6 +274,29 @@ def _serve_file(*, path: Path, request: Request, media_type: str, filename: str)
     )
 
 
+def _media_order_columns(sort: str = "created_at") -> list:
+    name_base = func.substring_index(Media.filename, ".", 1)
+    name_numeric = func.cast(name_base, MySQLInteger(unsigned=True))
+
+    if sort == "created_at":
+        date_bucket = func.date(Media.created_at)
+        return [
+            date_bucket.is_(None),
+            date_bucket.asc(),
+            Media.created_at.asc(),
+            name_numeric.asc(),
+            name_base.asc(),
+            Media.id.asc(),
+        ]
+    return [
+        Media.taken_at.is_(None),
+        Media.taken_at.asc(),
+        name_numeric.asc(),
+        name_base.asc(),
+        Media.id.asc(),
+    ]
+
+
 def _ensure_album(session: Session, album_id: Optional[int], user: User) -> None:
     if album_id is None:
         return
@@ -252,18 +320,16 @@ def _ensure_can_view(media: Media, user: User) -> None:
 
 
 @router.get("")
-def list_media(
-    session: SessionDep,
+async def list_media(
+    session: ReadSessionDep,
     current_user: User = Depends(require_user),
-    media_type: Optional[str] = Query(default=None, alias="type", pattern="^(image|video)$"),
+    media_type: Optional[str] = Query(default=None, alias="type", pattern="^(image|video|audio)$"),
     album_id: Optional[int] = Query(default=None),
     q: Optional[str] = Query(default=None),
     page: int = Query(default=1, ge=1),
     size: int = Query(default=20, ge=1, le=100),
     sort: str = Query(default="created_at", pattern="^(created_at|taken_at)$"),
 ):
-    _sync_media_types(session)
-
     query = select(Media)
     count_query = select(func.count(Media.id))
 
@@ -291,67 +357,157 @@ def list_media(
         query = query.join(Album, join_on, isouter=True).where(visibility_condition)
         count_query = count_query.join(Album, join_on, isouter=True).where(visibility_condition)
 
-    order_column = Media.created_at if sort == "created_at" else Media.taken_at
-    name_base = func.substring_index(Media.filename, ".", 1)
-    name_numeric = func.cast(name_base, MySQLInteger(unsigned=True))
+    query = query.order_by(*_media_order_columns(sort))
 
-    if sort == "created_at":
-        date_bucket = func.date(Media.created_at)
-        query = query.order_by(
-            date_bucket.is_(None),
-            date_bucket.asc(),
-            Media.created_at.asc(),
-            name_numeric.asc(),
-            name_base.asc(),
-            Media.id.asc(),
-        )
-    else:
-        query = query.order_by(
-            order_column.is_(None),
-            order_column.asc(),
-            name_numeric.asc(),
-            name_base.asc(),
-            Media.id.asc(),
+    # Server-Timing: query minus db is ORM hydration, build is the payload
+    with timed("query"):
+        total = (await session.execute(count_query)).scalar_one()
+        items = (
+            (await session.execute(query.offset((page - 1) * size).limit(size))).scalars().all()
         )
 
-    total = session.execute(count_query).scalar_one()
-    items = (
-        session.execute(query.offset((page - 1) * size).limit(size)).scalars().all()
-    )
-
-    data = {
-        "items": [_media_summary(item) for item in items],
-        "page": page,
-        "size": size,
-        "total": total,
-    }
+    with timed("build"):
+        data = {
+            "items": [_media_summary(item) for item in items],
+            "page": page,
+            "size": size,
+            "total": total,
+        }
     return success(data)
 
 
+@router.get("/duplicates")
+def list_duplicate_clusters(
+    session: SessionDep,
+    current_user: User = Depends(require_manager),
+    distance: int = Query(default=4, ge=0, le=MAX_PHASH_DISTANCE),
+    limit: int = Query(default=50, ge=1, le=500),
+):
+    similarity_index.refresh(session)
+    clusters = similarity_index.clusters(distance)
+    ids = [media_id for cluster in clusters for media_id in cluster]
+    found: dict[int, Media] = {}
+    for start in range(0, len(ids), 1000):
+        for media in session.execute(select(Media).where(Media.id.in_(ids[start : start + 1000]))).scalars():
+            found[media.id] = media
+    similarity_index.discard(set(ids) - found.keys())
+
+    items = []
+    for cluster in clusters:
+        members = [
+            found[media_id]
+            for media_id in cluster
+            if media_id in found and (current_user.role == "developer" or found[media_id].owner_id == current_user.id)
+        ]
+        if len(members) > 1:
+            items.append([_media_summary(media) for media in members])
+    return success({"items": items[:limit], "total": len(items), "distance": distance})
+
+
 @router.get("/{media_id}")
-def get_media(media_id: int, session: SessionDep, current_user: User = Depends(require_user)):
-    media = session.get(Media, media_id)
+async def get_media(media_id: int, session: ReadSessionDep, current_user: User = Depends(require_user)):
+    media = (
+        await session.execute(
+            select(Media)
+            .options(selectinload(Media.album), selectinload(Media.tags))
+            .where(Media.id == media_id)
+        )
+    ).scalar_one_or_none()
     if not media:
         raise AppError(status_code=404, code=40400, message="MEDIA_NOT_FOUND")
     _ensure_can_view(media, current_user)
     if current_user.role == "viewer":
         return success(_media_public_detail(media))
-    return success(_media_detail(media))
+    tasks = await session.execute(select(MediaTask.kind, MediaTask.status).where(MediaTask.media_id == media_id))
+    return success({**_media_detail(media), "tasks": dict(tasks.all())})
+
+
+@router.get("/{media_id}/similar")
+def list_similar_media(
+    media_id: int,
+    session: SessionDep,
+    current_user: User = Depends(require_user),
+    distance: int = Query(default=8, ge=0, le=MAX_PHASH_DISTANCE),
+    limit: int = Query(default=20, ge=1, le=100),
+):
+    media = session.get(Media, media_id)
+    if not media:
+        raise AppError(status_code=404, code=40400, message="MEDIA_NOT_FOUND")
+    _ensure_can_view(media, current_user)
+    if media.phash is None:
+        raise AppError(status_code=404, code=40400, message="PHASH_NOT_READY")
+
+    similarity_index.refresh(session)
+    matches = {
+        other: found
+        for other, found in similarity_index.search(to_unsigned(media.phash), distance)
+        if other != media.id
+    }
+    candidates = session.execute(
+        select(Media).options(selectinload(Media.album)).where(Media.id.in_(list(matches)[: limit * 4]))
+    ).scalars().all()
+    items = []
+    for candidate in sorted(candidates, key=lambda item: (matches[item.id], item.id)):
+        try:
+            _ensure_can_view(candidate, current_user)
+        except AppError:
+            continue
+        items.append({**_media_summary(candidate), "distance": matches[candidate.id]})
+    return success({"items": items[:limit], "distance": distance})
 
 
 @router.get("/{media_id}/file")
-def download_media(media_id: int, request: Request, session: SessionDep, current_user: User = Depends(require_user)):
+@limited("stream")
+def download_media(
+    media_id: int,
+    request: Request,
+    session: SessionDep,
+    current_user: User = Depends(require_user),
+    original: bool = Query(default=False),
+):
     media = session.get(Media, media_id)
     if not media:
         raise AppError(status_code=404, code=40400, message="MEDIA_NOT_FOUND")
     _ensure_can_view(media, current_user)
+    if media.display_path and not original:
+        # HEIC/TIFF/BMP originals are swapped for the best display copy the
+        # client accepts; ?original=true still returns the upload as stored
+        negotiated = negotiate_display(media.display_path, request.headers.get("accept", ""))
+        if negotiated:
+            display_path, display_type = negotiated
+            return _serve_file(
+                path=display_path,
+                request=request,
+                media_type=display_type,
+                filename=f"{Path(media.filename).stem}{display_path.suffix}",
+                kind="display",
+                extra_headers={"Vary": "Accept"},
+            )
     file_path = Path(settings.MEDIA_ROOT) / media.storage_path
     if not file_path.exists():
         raise AppError(status_code=404, code=40400, message="FILE_NOT_FOUND")
-    return _serve_file(path=file_path, request=request, media_type=media.mime_type, filename=media.filename)
+    headers = {"Vary": "Accept"} if media.display_path and not original else {}
+    digest = content_hash(media.storage_path)
+    if digest:
+        # a content-addressed name is a strong validator, and a URL pinned to
+        # it with ?v=<content_hash> can never change underneath a cache
+        headers["ETag"] = f'"{digest}"'
+        headers["Cache-Control"] = (
+            "private, max-age=31536000, immutable" if request.query_params.get("v") == digest else "private, no-cache"
+        )
+        if headers["ETag"] in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+    return _serve_file(
+        path=file_path,
+        request=request,
+        media_type=media.mime_type,
+        filename=media.filename,
+        extra_headers=headers or None,
+    )
 
 
 @router.get("/{media_id}/preview")
+@limited("stream")
 def download_media_preview(media_id: int, request: Request, session: SessionDep, current_user: User = Depends(require_user)):
     media = session.get(Media, media_id)
     if not media:
@@ -362,10 +518,123 @@ def download_media_preview(media_id: int, request: Request, session: SessionDep,
     preview_path = Path(settings.MEDIA_ROOT) / media.preview_path
     if not preview_path.exists():
         raise AppError(status_code=404, code=40400, message="PREVIEW_NOT_FOUND")
-    return _serve_file(path=preview_path, request=request, media_type="image/jpeg", filename=f"preview-{media.filename}.jpg")
+    return _serve_file(
+        path=preview_path,
+        request=request,
+        media_type="image/jpeg",
+        filename=f"preview-{media.filename}.jpg",
+        kind="preview",
+    )
 
 
-async def _store_file(upload: UploadFile, *, size_limit: int) -> tuple[Path, int, str]:
+@router.get("/{media_id}/hls/{asset:path}")
+@limited("stream")
+def download_media_hls(
+    media_id: int,
+    asset: str,
+    request: Request,
+    session: SessionDep,
+    current_user: User = Depends(require_user),
+):
+    media = session.get(Media, media_id)
+    if not media:
+        raise AppError(status_code=404, code=40400, message="MEDIA_NOT_FOUND")
+    _ensure_can_view(media, current_user)
+    if not media.hls_path:
+        raise AppError(status_code=404, code=40400, message="HLS_NOT_FOUND")
+    # playlists reference variants and segments relatively, so everything
+    # under the packaging directory is served through this one route
+    path = resolve_output_asset(media.hls_path, asset, HLS_CONTENT_TYPES)
+    if path is None:
+        raise AppError(status_code=404, code=40400, message="HLS_NOT_FOUND")
+    return _serve_file(
+        path=path,
+        request=request,
+        media_type=HLS_CONTENT_TYPES[path.suffix],
+        filename=path.name,
+        kind="hls",
+    )
+
+
+@router.get("/{media_id}/waveform")
+@limited("stream")
+def download_media_waveform(
+    media_id: int,
+    request: Request,
+    session: SessionDep,
+    current_user: User = Depends(require_user),
+):
+    media = session.get(Media, media_id)
+    if not media:
+        raise AppError(status_code=404, code=40400, message="MEDIA_NOT_FOUND")
+    _ensure_can_view(media, current_user)
+    waveform_path = Path(settings.MEDIA_ROOT) / media.waveform_path if media.waveform_path else None
+    if waveform_path is None or not waveform_path.exists():
+        raise AppError(status_code=404, code=40400, message="WAVEFORM_NOT_FOUND")
+    return _serve_file(
+        path=waveform_path,
+        request=request,
+        media_type="application/octet-stream",
+        filename=f"waveform-{media.id}.dat",
+        kind="waveform",
+    )
+
+
+def _storyboard_asset(media_id: int, asset: str, request: Request, session: Session, current_user: User):
+    media = session.get(Media, media_id)
+    if not media:
+        raise AppError(status_code=404, code=40400, message="MEDIA_NOT_FOUND")
+    _ensure_can_view(media, current_user)
+    path = resolve_output_asset(media.storyboard_path, asset, STORYBOARD_CONTENT_TYPES) if media.storyboard_path else None
+    if path is None:
+        raise AppError(status_code=404, code=40400, message="STORYBOARD_NOT_FOUND")
+    return _serve_file(
+        path=path,
+        request=request,
+        media_type=STORYBOARD_CONTENT_TYPES[path.suffix],
+        filename=path.name,
+        kind="storyboard",
+    )
+
+
+@router.get("/{media_id}/storyboard")
+@limited("stream")
+def download_media_storyboard(
+    media_id: int,
+    request: Request,
+    session: SessionDep,
+    current_user: User = Depends(require_user),
+):
+    return _storyboard_asset(media_id, STORYBOARD_INDEX, request, session, current_user)
+
+
+@router.get("/{media_id}/storyboard/{sheet}")
+@limited("stream")
+def download_media_storyboard_sheet(
+    media_id: int,
+    sheet: str,
+    request: Request,
+    session: SessionDep,
+    current_user: User = Depends(require_user),
+):
+    return _storyboard_asset(media_id, sheet, request, session, current_user)
+
+
+def _initial_task_kinds(media_type: str, storage_path: str) -> list[str]:
+    if media_type == "video":
+        kinds = ["preview", "probe"]
+        if settings.MEDIA_FASTSTART_ENABLED and Path(storage_path).suffix.lower() in FASTSTART_EXTENSIONS:
+            kinds.append("faststart")
+        return kinds
+    if media_type == "audio":
+        return ["probe", "waveform"]
+    kinds = ["metadata"]
+    if needs_display_copy(storage_path):
+        kinds.append("display")
+    return kinds
+
+
+async def _store_file(upload: UploadFile, *, size_limit: int) -> tuple[Path, int, str, bool]:
     contents = await upload.read()
     size = len(contents)
     if size == 0:
@@ -375,15 +644,63 @@ async def _store_file(upload: UploadFile, *, size_limit: int) -> tuple[Path, int
     sha256 = hashlib.sha256(contents).hexdigest()
 
     ext = Path(upload.filename or "").suffix or mimetypes.guess_extension(upload.content_type or "") or ""
-    rel_path = Path(datetime.utcnow().strftime("%Y/%m/%d")) / f"{uuid4().hex}{ext}"
-    target_path = Path(settings.MEDIA_ROOT) / rel_path
-    target_path.parent.mkdir(parents=True, exist_ok=True)
-    target_path.write_bytes(contents)
+    rel_path = new_storage_path(sha256, ext)
+    created = write_once(rel_path, contents)
+
+    return rel_path, size, sha256, created
+
+
+def _discard_stored(session: Session, stored: list[Path]) -> None:
+    if not stored:
+        return
+    paths = [rel_path.as_posix() for rel_path in stored]
+    try:
+        # with content-addressed storage a concurrent upload of the same bytes
+        # may have claimed the path; its file stays
+        referenced = set(session.execute(select(Media.storage_path).where(Media.storage_path.in_(paths))).scalars())
+    except Exception:
+        logger.warning("could not check %s stored uploads, leaving them to the media gc", len(paths))
+        return
+    root = Path(settings.MEDIA_ROOT)
+    for rel_path in paths:
+        if rel_path not in referenced:
+            (root / rel_path).unlink(missing_ok=True)
+
 
-    return rel_path, size, sha256
+class ArchivePayload(BaseModel):
+    ids: List[int] = Field(min_length=1)
+
+
+@router.post("/archive")
+@limited("stream")
+def download_media_archive(
+    body: ArchivePayload,
+    session: SessionDep,
+    current_user: User = Depends(require_user),
+):
+    ids = list(dict.fromkeys(body.ids))
+    if len(ids) > settings.ARCHIVE_MAX_ITEMS:
+        raise AppError(status_code=400, code=40000, message="TOO_MANY_ITEMS")
+    found = {
+        media.id: media
+        for media in session.execute(select(Media).options(selectinload(Media.album)).where(Media.id.in_(ids))).scalars()
+    }
+    if len(found) != len(ids):
+        raise AppError(status_code=404, code=40400, message="MEDIA_NOT_FOUND")
+    # every item is checked before the first byte goes out; a stream that
+    # has started can no longer turn into an error response
+    for media in found.values():
+        _ensure_can_view(media, current_user)
+    entries = archive_entries(found[media_id] for media_id in ids)
+    return StreamingResponse(
+        stream_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": content_disposition(f"media-{len(entries)}")},
+    )
 
 
 @router.post("/upload")
+@limited("upload")
 async def upload_media(
     session: SessionDep,
     current_user: User = Depends(require_manager),
@@ -398,47 +715,56 @@ async def upload_media(
     _ensure_album(session, album_id, current_user)
 
     created_media = []
-    for upload in files:
-        rel_path, size, sha256 = await _store_file(upload, size_limit=settings.MAX_UPLOAD_MB * 1024 * 1024)
-
-        mime = upload.content_type or mimetypes.guess_type(upload.filename or "")[0] or "application/octet-stream"
-        media_type = _classify_type(mime, upload.filename)
-        taken_at_dt = None
-        if taken_at:
-            try:
-                taken_at_dt = datetime.fromisoformat(taken_at)
-            except ValueError as exc:  # noqa: PERF203 keep simple
-                raise AppError(status_code=400, code=40000, message="INVALID_TAKEN_AT") from exc
-
-        title_value = (title.strip() if title else "") or (upload.filename or rel_path.name)
-        preview_rel = None
-        if media_type == "video":
-            preview_rel = _generate_video_preview(rel_path)
-
-        media = Media(
-            owner_id=current_user.id,
-            album_id=album_id,
-            type=media_type,
-            filename=upload.filename or rel_path.name,
-            title=title_value,
-            mime_type=mime,
-            bytes=size,
-            sha256=sha256,
-            taken_at=taken_at_dt,
-            storage_path=rel_path.as_posix(),
-            preview_path=preview_rel,
-        )
-        session.add(media)
-        created_media.append(media)
-
+    stored: list[Path] = []
     try:
+        for upload in files:
+            rel_path, size, sha256, created = await _store_file(upload, size_limit=settings.MAX_UPLOAD_MB * 1024 * 1024)
+            if created:
+                stored.append(rel_path)
+            observe_upload(size)
+
+            mime = upload.content_type or mimetypes.guess_type(upload.filename or "")[0] or "application/octet-stream"
+            media_type = _classify_type(mime, upload.filename)
+            taken_at_dt = None
+            if taken_at:
+                try:
+                    taken_at_dt = datetime.fromisoformat(taken_at)
+                except ValueError as exc:  # noqa: PERF203 keep simple
+                    raise AppError(status_code=400, code=40000, message="INVALID_TAKEN_AT") from exc
+
+            title_value = (title.strip() if title else "") or (upload.filename or rel_path.name)
+
+            media = Media(
+                owner_id=current_user.id,
+                album_id=album_id,
+                type=media_type,
+                filename=upload.filename or rel_path.name,
+                title=title_value,
+                mime_type=mime,
+                bytes=size,
+                sha256=sha256,
+                taken_at=taken_at_dt,
+                storage_path=rel_path.as_posix(),
+            )
+            session.add(media)
+            created_media.append(media)
+
+        session.flush()
+        for media in created_media:
+            for kind in _initial_task_kinds(media.type, media.storage_path):
+                enqueue_media_task(session, media.id, kind)
         session.commit()
-    except IntegrityError as exc:
+    except BaseException as exc:
+        # a rejected batch must not leave the files it already wrote behind
         session.rollback()
-        raise AppError(status_code=409, code=40900, message="MEDIA_DUPLICATE") from exc
+        _discard_stored(session, stored)
+        if isinstance(exc, IntegrityError):
+            raise AppError(status_code=409, code=40900, message="MEDIA_DUPLICATE") from exc
+        raise
 
     for media in created_media:
         session.refresh(media)
+    runner.wake()
 
     return success([
         {
@@ -490,6 +816,19 @@ def update_media(
     return success(_media_detail(media))
 
 
+def _remove_media_files(media: Media) -> None:
+    root = Path(settings.MEDIA_ROOT)
+    for rel_path in (media.storage_path, media.preview_path, media.waveform_path):
+        if rel_path:
+            try:
+                (root / rel_path).unlink(missing_ok=True)
+            except OSError:
+                logger.warning("could not remove %s", rel_path)
+    remove_output(media.hls_path)
+    remove_output(media.storyboard_path)
+    remove_output(media.display_path)
+
+
 @router.delete("/{media_id}")
 def delete_media(
     media_id: int,
@@ -500,15 +839,12 @@ def delete_media(
     if not media:
         raise AppError(status_code=404, code=40400, message="MEDIA_NOT_FOUND")
 
-    file_path = Path(settings.MEDIA_ROOT) / media.storage_path
-    if file_path.exists():
-        try:
-            file_path.unlink()
-        except OSError:
-            pass
-
     session.delete(media)
     session.commit()
+    # files go only once the row is gone, so a failed commit never leaves a
+    # row pointing at nothing
+    _remove_media_files(media)
+    similarity_index.discard([media_id])
     return success(message="DELETED")
 
 
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..db import SessionLocal
+from ..models import Media, MediaCheck, MediaTask
+from .storage import content_hash
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 1024 * 1024
+BATCH_SIZE = 100
+PROBLEM_STATUSES = ("missing", "size_mismatch", "hash_mismatch", "error")
+
+
+class Throttle:
+    # keeps the average read rate under the budget across files; sleeping
+    # between chunks instead of per file avoids bursts on large videos
+    def __init__(self, bytes_per_second: float) -> None:
+        self.rate = bytes_per_second
+        self.started = time.monotonic()
+        self.consumed = 0
+
+    def consume(self, size: int) -> None:
+        if self.rate <= 0:
+            return
+        self.consumed += size
+        ahead = self.consumed / self.rate - (time.monotonic() - self.started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+def _advise(fd: int, offset: int, length: int, advice: str) -> None:
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(fd, offset, length, getattr(os, advice))
+
+
+def hash_file(path: Path, throttle: Throttle) -> str:
+    digest = hashlib.sha256()
+    offset = 0
+    with path.open("rb", buffering=0) as file:
+        fd = file.fileno()
+        _advise(fd, 0, 0, "POSIX_FADV_SEQUENTIAL")
+        while chunk := file.read(READ_SIZE):
+            digest.update(chunk)
+            # drop what was just read so a full pass over the library does not
+            # push the hot media that is actually being served out of the cache
+            _advise(fd, offset, len(chunk), "POSIX_FADV_DONTNEED")
+            offset += len(chunk)
+            throttle.consume(len(chunk))
+    return digest.hexdigest()
+
+
+def _cursor(session: Session) -> int:
+    # the most recently written check is the checkpoint, so an interrupted
+    # pass resumes where it stopped without a separate state table
+    last = session.execute(
+        select(MediaCheck.media_id).order_by(MediaCheck.checked_at.desc(), MediaCheck.media_id.desc()).limit(1)
+    ).scalar_one_or_none()
+    return last or 0
+
+
+def _due(session: Session, cursor: int) -> list:
+    recheck_before = datetime.utcnow() - timedelta(days=settings.SCRUB_RECHECK_DAYS)
+    return session.execute(
+        select(
+            Media.id,
+            Media.storage_path,
+            Media.bytes,
+            Media.sha256,
+            MediaCheck.storage_path.label("checked_path"),
+            MediaCheck.actual_sha256.label("checked_sha256"),
+            MediaCheck.status.label("checked_status"),
+        )
+        .outerjoin(MediaCheck, MediaCheck.media_id == Media.id)
+        .where(
+            Media.id > cursor,
+            or_(
+                MediaCheck.media_id.is_(None),
+                MediaCheck.checked_at < recheck_before,
+                MediaCheck.storage_path != Media.storage_path,
+            ),
+        )
+        .order_by(Media.id)
+        .limit(BATCH_SIZE)
+    ).all()
+
+
+def _check(session: Session, row, throttle: Throttle) -> MediaCheck:
+    check = MediaCheck(media_id=row.id, storage_path=row.storage_path, checked_at=datetime.utcnow())
+    path = Path(settings.MEDIA_ROOT) / row.storage_path
+    try:
+        check.actual_bytes = path.stat().st_size
+        if check.actual_bytes != row.bytes:
+            check.status = "size_mismatch"
+            return check
+        check.actual_sha256 = hash_file(path, throttle)
+    except FileNotFoundError:
+        check.status = "missing"
+        return check
+    except OSError as exc:
+        check.status = "error"
+        check.error = str(exc)[:500]
+        return check
+
+    if check.actual_sha256 == (content_hash(row.storage_path) or row.sha256):
+        check.status = "ok"
+    elif row.checked_path == row.storage_path and row.checked_sha256 and row.checked_status == "ok":
+        # a file already read once is held to the digest seen then, but only
+        # a verified one: a corrupt digest must never become the baseline
+        check.status = "ok" if check.actual_sha256 == row.checked_sha256 else "hash_mismatch"
+    else:
+        # remuxed files legitimately differ from the upload digest; their
+        # first read of this path becomes the baseline for later passes, and
+        # a path already flagged stays flagged
+        remuxed = row.checked_path != row.storage_path and session.execute(
+            select(MediaTask.id).where(
+                MediaTask.media_id == row.id, MediaTask.kind == "faststart", MediaTask.status == "done"
+            )
+        ).first()
+        check.status = "ok" if remuxed else "hash_mismatch"
+    return check
+
+
+def scrub(*, slice_seconds: Optional[float] = None) -> dict[str, int]:
+    started = time.monotonic()
+    limit = settings.SCRUB_SLICE_SECONDS if slice_seconds is None else slice_seconds
+    throttle = Throttle(settings.SCRUB_MB_PER_SECOND * 1024 * 1024)
+    counts: dict[str, int] = {}
+    wrapped = False
+    with SessionLocal() as session:
+        cursor = _cursor(session)
+        while time.monotonic() - started < limit:
+            rows = _due(session, cursor)
+            if not rows:
+                if wrapped or cursor == 0:
+                    break
+                # end of the table: start the next pass from the beginning
+                cursor, wrapped = 0, True
+                continue
+            for row in rows:
+                if time.monotonic() - started >= limit:
+                    break
+                check = _check(session, row, throttle)
+                cursor = row.id
+                if check.status != "ok":
+                    # a faststart or relayout may have moved the file while it
+                    # was read; the changed path makes it due again next time
+                    current = session.execute(select(Media.storage_path).where(Media.id == row.id)).scalar_one_or_none()
+                    if current != row.storage_path:
+                        continue
+                    logger.warning("integrity check failed for media %s: %s", row.id, check.status)
+                session.merge(check)
+                session.commit()
+                counts[check.status] = counts.get(check.status, 0) + 1
+    return counts
+
+
+def integrity_report(*, status: Optional[str] = None, limit: int = 100) -> dict:
+    with SessionLocal() as session:
+        by_status = dict(
+            session.execute(select(MediaCheck.status, func.count()).group_by(MediaCheck.status)).all()
+        )
+        oldest, newest = session.execute(select(func.min(MediaCheck.checked_at), func.max(MediaCheck.checked_at))).one()
+        problems = session.execute(
+            select(MediaCheck, Media.sha256, Media.bytes)
+            .join(Media, Media.id == MediaCheck.media_id)
+            .where(MediaCheck.status == status if status else MediaCheck.status.in_(PROBLEM_STATUSES))
+            .order_by(MediaCheck.checked_at.desc())
+            .limit(limit)
+        ).all()
+        return {
+            "media": session.execute(select(func.count(Media.id))).scalar_one(),
+            "checked": sum(by_status.values()),
+            "by_status": by_status,
+            "oldest_check": oldest,
+            "latest_check": newest,
+            "cursor": _cursor(session),
+            "items": [
+                {
+                    "media_id": check.media_id,
+                    "status": check.status,
+                    "storage_path": check.storage_path,
+                    "expected_bytes": expected_bytes,
+                    "actual_bytes": check.actual_bytes,
+                    "expected_sha256": content_hash(check.storage_path) or expected_sha256,
+                    "actual_sha256": check.actual_sha256,
+                    "error": check.error,
+                    "checked_at": check.checked_at,
+                }
+                for check, expected_sha256, expected_bytes in problems
+            ],
+        }
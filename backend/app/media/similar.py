@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import threading
+import time
+from array import array
+from datetime import datetime
+from typing import Iterable, Optional
+
+from PIL import Image
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..models import Media, MediaTask
+
+HASH_BITS = 64
+CHUNKS = 4
+CHUNK_BITS = HASH_BITS // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+MAX_DISTANCE = 11
+REFRESH_SECONDS = 10
+
+
+def dhash(image: Image.Image) -> int:
+    # difference hash: brightness gradient between neighbouring pixels of a
+    # 9x8 greyscale thumbnail; survives resizing and re-encoding
+    small = image.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+def to_signed(value: int) -> int:
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def to_unsigned(value: int) -> int:
+    return value & ((1 << HASH_BITS) - 1)
+
+
+def _chunks(value: int) -> list[int]:
+    return [(value >> (index * CHUNK_BITS)) & CHUNK_MASK for index in range(CHUNKS)]
+
+
+def _neighbours(chunk: int, radius: int) -> Iterable[int]:
+    yield chunk
+    if radius >= 1:
+        for i in range(CHUNK_BITS):
+            flipped = chunk ^ (1 << i)
+            yield flipped
+            if radius >= 2:
+                for j in range(i + 1, CHUNK_BITS):
+                    yield flipped ^ (1 << j)
+
+
+class SimilarityIndex:
+    # Multi-index hashing: the 64-bit hash is split into four 16-bit chunks,
+    # each with its own table. Two hashes within distance d share at least one
+    # chunk within distance d // 4, so a lookup probes a few hundred buckets
+    # at most instead of scanning every hash.
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._hashes: dict[int, int] = {}
+        self._tables: list[dict[int, array]] = [{} for _ in range(CHUNKS)]
+        self._watermark: Optional[datetime] = None
+        self._checked_at = 0.0
+        # bumped on every change, so computed clusters stay valid until then
+        self._version = 0
+        self._clusters_lock = threading.Lock()
+        self._clusters: dict[int, tuple[int, list[list[int]]]] = {}
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def _add(self, media_id: int, value: int) -> None:
+        if media_id in self._hashes:
+            if self._hashes[media_id] == value:
+                return
+            self._discard(media_id)
+        self._hashes[media_id] = value
+        self._version += 1
+        for table, chunk in zip(self._tables, _chunks(value)):
+            table.setdefault(chunk, array("q")).append(media_id)
+
+    def _discard(self, media_id: int) -> None:
+        value = self._hashes.pop(media_id, None)
+        if value is None:
+            return
+        self._version += 1
+        for table, chunk in zip(self._tables, _chunks(value)):
+            bucket = table.get(chunk)
+            if bucket is not None and media_id in bucket:
+                bucket.remove(media_id)
+
+    def discard(self, media_ids: Iterable[int]) -> None:
+        with self._lock:
+            for media_id in media_ids:
+                self._discard(media_id)
+
+    def refresh(self, session: Session) -> None:
+        # hashes are written by the metadata task, so the task's updated_at
+        # doubles as a change feed for incremental refreshes
+        with self._lock:
+            if self.loaded and time.monotonic() - self._checked_at < REFRESH_SECONDS:
+                return
+            changed = (
+                select(MediaTask.media_id, MediaTask.updated_at)
+                .where(MediaTask.kind == "metadata", MediaTask.status == "done")
+            )
+            if self.loaded and self._watermark is not None:
+                rows = session.execute(changed.where(MediaTask.updated_at >= self._watermark)).all()
+                ids = [media_id for media_id, _ in rows]
+                watermark = max((updated for _, updated in rows), default=self._watermark)
+                hashes = []
+                for start in range(0, len(ids), 1000):
+                    hashes += session.execute(
+                        select(Media.id, Media.phash).where(Media.id.in_(ids[start : start + 1000]))
+                    ).all()
+            else:
+                watermark = session.execute(
+                    select(func.max(MediaTask.updated_at)).where(MediaTask.kind == "metadata")
+                ).scalar_one()
+                hashes = session.execute(select(Media.id, Media.phash).where(Media.phash.is_not(None))).all()
+            for media_id, value in hashes:
+                if value is None:
+                    self._discard(media_id)
+                else:
+                    self._add(media_id, to_unsigned(value))
+            self._watermark = watermark
+            self._checked_at = time.monotonic()
+            self.loaded = True
+
+    def search(self, value: int, distance: int) -> list[tuple[int, int]]:
+        radius = distance // CHUNKS
+        seen: set[int] = set()
+        matches = []
+        with self._lock:
+            for table, chunk in zip(self._tables, _chunks(value)):
+                for probe in _neighbours(chunk, radius):
+                    for media_id in table.get(probe, ()):
+                        if media_id in seen:
+                            continue
+                        seen.add(media_id)
+                        found = (self._hashes[media_id] ^ value).bit_count()
+                        if found <= distance:
+                            matches.append((media_id, found))
+        return sorted(matches, key=lambda item: (item[1], item[0]))
+
+    def clusters(self, distance: int) -> list[list[int]]:
+        # a full pass searches once per stored hash; concurrent callers wait
+        # for one computation and share it until the index changes
+        with self._clusters_lock:
+            cached = self._clusters.get(distance)
+            if cached is not None and cached[0] == self._version:
+                return cached[1]
+            with self._lock:
+                version = self._version
+                items = list(self._hashes.items())
+            clusters = self._compute_clusters(items, distance)
+            self._clusters[distance] = (version, clusters)
+            return clusters
+
+    def _compute_clusters(self, items: list[tuple[int, int]], distance: int) -> list[list[int]]:
+        parent: dict[int, int] = {}
+
+        def find(node: int) -> int:
+            while parent.get(node, node) != node:
+                parent[node] = parent.get(parent[node], parent[node])
+                node = parent[node]
+            return node
+
+        for media_id, value in items:
+            for other, _ in self.search(value, distance):
+                if other != media_id:
+                    a, b = find(media_id), find(other)
+                    if a != b:
+                        parent[max(a, b)] = min(a, b)
+        groups: dict[int, list[int]] = {}
+        for media_id in parent:
+            groups.setdefault(find(media_id), []).append(media_id)
+        for root, members in groups.items():
+            if root not in members:
+                members.append(root)
+        clusters = [sorted(members) for members in groups.values()]
+        return sorted(clusters, key=lambda members: (-len(members), members[0]))
+
+
+similarity_index = SimilarityIndex()
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import errno
+import hashlib
+import logging
+import os
+import re
+import shutil
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+from sqlalchemy import bindparam, select, update
+
+from ..config import settings
+from ..db import SessionLocal
+from ..models import Media, MediaTask
+
+logger = logging.getLogger(__name__)
+
+# ab/cd/<sha256><ext>: two levels of 256 directories keep any one directory
+# small even with tens of millions of files
+CONTENT_PATH = re.compile(r"^([0-9a-f]{2})/([0-9a-f]{2})/(\1\2[0-9a-f]{60})(\.[^/]*)?$")
+HASH_CHUNK = 1024 * 1024
+
+
+def content_path(sha256: str, ext: str) -> Path:
+    return Path(sha256[:2]) / sha256[2:4] / f"{sha256}{ext.lower()}"
+
+
+def content_hash(storage_path: Optional[str]) -> Optional[str]:
+    # the digest a content-addressed path encodes, which is then a strong
+    # validator for the file's bytes; None for dated paths
+    if not storage_path:
+        return None
+    match = CONTENT_PATH.match(storage_path)
+    return match.group(3) if match else None
+
+
+def new_storage_path(sha256: str, ext: str) -> Path:
+    if settings.MEDIA_LAYOUT == "sha256":
+        return content_path(sha256, ext)
+    return Path(datetime.utcnow().strftime("%Y/%m/%d")) / f"{uuid4().hex}{ext}"
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as file:
+        while chunk := file.read(HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_once(rel_path: Path, contents: bytes) -> bool:
+    # content-addressed targets that already exist hold these exact bytes, so
+    # they are left alone; returns whether this call created the file
+    target = Path(settings.MEDIA_ROOT) / rel_path
+    if target.exists():
+        return False
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_name(f"{target.name}.{uuid4().hex}.part")
+    partial.write_bytes(contents)
+    os.replace(partial, target)
+    return True
+
+
+def link_into_place(source: Path, rel_path: Path, *, link: bool = True) -> bool:
+    target = Path(settings.MEDIA_ROOT) / rel_path
+    if target.exists():
+        return False
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_name(f"{target.name}.{uuid4().hex}.part")
+    try:
+        if not link:
+            shutil.copyfile(source, partial)
+        else:
+            try:
+                os.link(source, partial)
+            except OSError as exc:
+                # filesystems without hard links (or a source on another
+                # mount) fall back to a copy
+                if exc.errno not in (errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.EMLINK):
+                    raise
+                shutil.copyfile(source, partial)
+        os.replace(partial, target)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    return True
+
+
+def adopt_content(path: Path, ext: str) -> Path:
+    # rename a freshly written file to the content path of its own bytes
+    rel_path = content_path(file_sha256(path), ext)
+    target = Path(settings.MEDIA_ROOT) / rel_path
+    if target.exists():
+        path.unlink()
+    else:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, target)
+    return rel_path
+
+
+@dataclass
+class RelayoutReport:
+    dry_run: bool
+    scanned: int = 0
+    moved: int = 0
+    missing: int = 0
+    errors: int = 0
+    sample: list[str] = field(default_factory=list)
+
+
+def relayout(*, batch_size: int = 1000, dry_run: bool = False) -> RelayoutReport:
+    # Each batch hard-links files to their content path, repoints the rows in
+    # one executemany UPDATE guarded by the old path (a concurrent faststart
+    # or delete simply wins), commits, and only then unlinks the old names.
+    # Readers see a valid path throughout and an interrupted run resumes.
+    root = Path(settings.MEDIA_ROOT)
+    report = RelayoutReport(dry_run=dry_run)
+    cursor = 0
+    with SessionLocal() as session:
+        while True:
+            rows = session.execute(
+                select(Media.id, Media.storage_path, Media.sha256)
+                .where(Media.id > cursor)
+                .order_by(Media.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            cursor = rows[-1].id
+            report.scanned += len(rows)
+            rows = [row for row in rows if content_hash(row.storage_path) is None]
+            # remuxed files no longer hold the uploaded bytes, so their
+            # content path must come from the file rather than the column
+            remuxed = set(
+                session.execute(
+                    select(MediaTask.media_id).where(
+                        MediaTask.media_id.in_([row.id for row in rows]),
+                        MediaTask.kind == "faststart",
+                        MediaTask.status == "done",
+                    )
+                ).scalars()
+            ) if rows else set()
+
+            moves = []
+            for row in rows:
+                source = root / row.storage_path
+                if not source.exists():
+                    report.missing += 1
+                    continue
+                try:
+                    digest = file_sha256(source) if row.id in remuxed else row.sha256
+                    target = content_path(digest, Path(row.storage_path).suffix)
+                    if len(report.sample) < 20:
+                        report.sample.append(f"{row.storage_path} -> {target.as_posix()}")
+                    if not dry_run:
+                        link_into_place(source, target)
+                    moves.append({"b_id": row.id, "b_old": row.storage_path, "b_new": target.as_posix()})
+                except OSError:
+                    report.errors += 1
+                    logger.exception("relayout could not link %s", row.storage_path)
+            if dry_run or not moves:
+                report.moved += len(moves)
+                continue
+
+            session.connection().execute(
+                update(Media.__table__)
+                .where(Media.__table__.c.id == bindparam("b_id"), Media.__table__.c.storage_path == bindparam("b_old"))
+                .values(storage_path=bindparam("b_new")),
+                moves,
+            )
+            session.commit()
+            current = dict(
+                session.execute(
+                    select(Media.id, Media.storage_path).where(Media.id.in_([move["b_id"] for move in moves]))
+                ).all()
+            )
+            for move in moves:
+                if current.get(move["b_id"]) == move["b_new"]:
+                    report.moved += 1
+                    (root / move["b_old"]).unlink(missing_ok=True)
+                else:
+                    # the row changed underneath us; its new link is an
+                    # orphan that the media gc will collect
+                    logger.info("relayout skipped media %s, storage path changed", move["b_id"])
+            logger.info("relayout: %s rows scanned, %s moved", report.scanned, report.moved)
+    return report
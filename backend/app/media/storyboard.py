@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import math
+import subprocess
+import time
+from pathlib import Path
+
+from ..config import settings
+from ..metrics import observe_ffmpeg
+from .derived import new_output_dir, remove_output
+from .hls import _even
+
+STORYBOARD_DIR = "storyboards"
+INDEX_FILE = "storyboard.vtt"
+CONTENT_TYPES = {".vtt": "text/vtt", ".jpg": "image/jpeg"}
+# a keyframe-only decode runs many times faster than realtime, so one second
+# per second of video on top of the base only cuts off runs that are stuck
+STORYBOARD_TIMEOUT_BASE_SECONDS = 60
+STORYBOARD_TIMEOUT_REALTIME_FACTOR = 1
+
+
+def _timestamp(seconds: float) -> str:
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
+
+
+def build_vtt(duration: float, interval: int, columns: int, rows: int, width: int, height: int) -> str:
+    # cue images are relative to /media/{id}/storyboard, which is where the
+    # sheets are served from
+    frames = max(1, math.ceil(duration / interval))
+    per_sheet = columns * rows
+    lines = ["WEBVTT", ""]
+    for index in range(frames):
+        sheet, position = divmod(index, per_sheet)
+        x = position % columns * width
+        y = position // columns * height
+        start = index * interval
+        end = min(duration, start + interval)
+        lines.append(f"{_timestamp(start)} --> {_timestamp(end)}")
+        lines.append(f"storyboard/sheet_{sheet + 1:03d}.jpg#xywh={x},{y},{width},{height}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def generate_storyboard(media_id: int, source: Path, duration: float, width: int, height: int) -> str:
+    interval = settings.STORYBOARD_INTERVAL_SEC
+    columns, rows = settings.STORYBOARD_COLUMNS, settings.STORYBOARD_ROWS
+    thumb_width = settings.STORYBOARD_THUMB_WIDTH
+    thumb_height = _even(thumb_width * height / width)
+
+    rel_dir = new_output_dir(STORYBOARD_DIR, media_id)
+    rel_file = (rel_dir / INDEX_FILE).as_posix()
+    output = Path(settings.MEDIA_ROOT) / rel_dir
+    # decoding keyframes only keeps this a fraction of a full decode; a tile
+    # lands on the nearest keyframe rather than the exact second
+    command = [
+        "ffmpeg",
+        "-y",
+        "-v",
+        "error",
+        "-skip_frame",
+        "nokey",
+        "-i",
+        str(source),
+        "-map",
+        "0:v:0",
+        "-vf",
+        f"fps=1/{interval},scale={thumb_width}:{thumb_height},tile={columns}x{rows}",
+        "-fps_mode",
+        "vfr",
+        "-q:v",
+        "5",
+        str(output / "sheet_%03d.jpg"),
+    ]
+    timeout = STORYBOARD_TIMEOUT_BASE_SECONDS + duration * STORYBOARD_TIMEOUT_REALTIME_FACTOR
+    started = time.perf_counter()
+    try:
+        subprocess.run(command, capture_output=True, check=True, timeout=timeout)
+        (output / INDEX_FILE).write_text(build_vtt(duration, interval, columns, rows, thumb_width, thumb_height))
+    except FileNotFoundError as exc:
+        remove_output(rel_file)
+        raise RuntimeError("FFMPEG_NOT_FOUND") from exc
+    except subprocess.TimeoutExpired as exc:
+        remove_output(rel_file)
+        raise RuntimeError(f"STORYBOARD_FAILED: timed out after {round(timeout)}s") from exc
+    except subprocess.CalledProcessError as exc:
+        remove_output(rel_file)
+        stderr = exc.stderr.decode("utf-8", errors="ignore") if exc.stderr else ""
+        raise RuntimeError(f"STORYBOARD_FAILED: {stderr.strip()[:500]}") from exc
+    finally:
+        observe_ffmpeg("storyboard", time.perf_counter() - started)
+    return rel_file
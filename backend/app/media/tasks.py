@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from uuid import uuid4
+
+from sqlalchemy import ColumnElement, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..db import SessionLocal
+from ..jobs.queue import enqueue_media_task, periodic, task_handler
+from ..models import Media, MediaTask
+from .metadata import metadata_pool
+from .derived import remove_output, remove_stale_outputs
+from .gc import collect_garbage
+from .display import DISPLAY_DIR, DISPLAY_SOURCE_EXTENSIONS, generate_display_copies, needs_display_copy
+from .hls import HLS_DIR, package_hls, plan_renditions
+from .probe import probe_video
+from .similar import to_signed
+from .scrub import scrub
+from .storage import adopt_content
+from .storyboard import STORYBOARD_DIR, generate_storyboard
+from .waveform import compute_waveform
+from .remux import FASTSTART_EXTENSIONS, needs_faststart, remux_faststart
+from .routes import _classify_type, _generate_video_preview
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+# rows each task kind applies to, used by the backfill command
+BACKFILL_FILTERS: dict[str, ColumnElement[bool]] = {
+    "preview": (Media.type == "video") & Media.preview_path.is_(None),
+    "metadata": (Media.type == "image") & Media.phash.is_(None),
+    "probe": Media.type.in_(("video", "audio")),
+    "faststart": Media.type == "video",
+    "hls": (Media.type == "video") & (Media.duration_sec >= settings.HLS_MIN_DURATION_SEC),
+    "storyboard": (Media.type == "video") & (Media.duration_sec > 0),
+    "waveform": Media.type == "audio",
+    "display": (Media.type == "image")
+    & or_(*(func.lower(Media.storage_path).like(f"%{suffix}") for suffix in DISPLAY_SOURCE_EXTENSIONS)),
+}
+
+
+def _chunks(ids: list[int], size: int = BATCH_SIZE):
+    for start in range(0, len(ids), size):
+        yield ids[start : start + size]
+
+
+def _enqueue_missing(session: Session, kind: str, media_ids: list[int], *, rerun: bool = False) -> int:
+    tasks = session.execute(
+        select(MediaTask).where(MediaTask.kind == kind, MediaTask.media_id.in_(media_ids))
+    ).scalars()
+    known = set()
+    requeued = 0
+    for task in tasks:
+        known.add(task.media_id)
+        if rerun and task.status in ("done", "failed"):
+            task.status = "pending"
+            task.attempts = 0
+            task.error = None
+            requeued += 1
+    missing = [media_id for media_id in media_ids if media_id not in known]
+    session.add_all(MediaTask(media_id=media_id, kind=kind, status="pending", attempts=0) for media_id in missing)
+    return len(missing) + requeued
+
+
+def backfill(kind: str, *, batch_size: int = BATCH_SIZE, rerun: bool = False) -> int:
+    # walks the table in primary key order and commits per batch so it can be
+    # interrupted and rerun on a large library; with rerun, rows that still
+    # match the filter after an earlier pass are queued again
+    enqueued = 0
+    last_id = 0
+    while True:
+        with SessionLocal() as session:
+            ids = session.execute(
+                select(Media.id)
+                .where(BACKFILL_FILTERS[kind], Media.id > last_id)
+                .order_by(Media.id)
+                .limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                return enqueued
+            enqueued += _enqueue_missing(session, kind, list(ids), rerun=rerun)
+            session.commit()
+        last_id = ids[-1]
+        logger.info("backfill %s: scanned up to media %s, %s tasks queued", kind, last_id, enqueued)
+
+
+@task_handler("preview")
+def generate_preview(session: Session, media: Media) -> None:
+    if media.type != "video" or media.preview_path:
+        return
+    preview_rel = _generate_video_preview(Path(media.storage_path))
+    if not preview_rel:
+        raise RuntimeError("PREVIEW_FAILED")
+    media.preview_path = preview_rel
+
+
+@task_handler("metadata")
+def extract_metadata(session: Session, media: Media) -> None:
+    if media.type != "image":
+        return
+    metadata = metadata_pool.read(Path(settings.MEDIA_ROOT) / media.storage_path)
+    if metadata is None:
+        logger.info("media %s is not a decodable image, skipping metadata", media.id)
+        return
+    media.width = metadata.width
+    media.height = metadata.height
+    media.blurhash = metadata.blurhash
+    media.phash = to_signed(metadata.phash)
+    if media.taken_at is None:
+        media.taken_at = metadata.taken_at
+
+
+@task_handler("display")
+def generate_display(session: Session, media: Media) -> None:
+    if media.type != "image" or not needs_display_copy(media.storage_path):
+        return
+    source = Path(settings.MEDIA_ROOT) / media.storage_path
+    if not source.exists():
+        raise FileNotFoundError(media.storage_path)
+    remove_stale_outputs(DISPLAY_DIR, media.id, keep=media.display_path)
+    display_path = generate_display_copies(media.id, source)
+    if display_path is None:
+        raise RuntimeError("IMAGE_NOT_DECODABLE")
+    previous = media.display_path
+    media.display_path = display_path
+    try:
+        session.commit()
+    except BaseException:
+        remove_output(display_path)
+        raise
+    remove_output(previous)
+
+
+@task_handler("probe")
+def probe_media(session: Session, media: Media) -> None:
+    if media.type not in ("video", "audio"):
+        return
+    path = Path(settings.MEDIA_ROOT) / media.storage_path
+    if not path.exists():
+        raise FileNotFoundError(media.storage_path)
+    probe = probe_video(path)
+    media.duration_sec = probe.duration_sec
+    media.width = probe.width
+    media.height = probe.height
+    media.video_codec = probe.video_codec
+    media.audio_codec = probe.audio_codec
+    media.bitrate = probe.bitrate
+    if media.type != "video":
+        return
+    if settings.HLS_ENABLED and (probe.duration_sec or 0) >= settings.HLS_MIN_DURATION_SEC:
+        enqueue_media_task(session, media.id, "hls")
+    if settings.STORYBOARD_ENABLED and probe.duration_sec and probe.width and probe.height:
+        enqueue_media_task(session, media.id, "storyboard")
+
+
+@task_handler("faststart")
+def faststart_media(session: Session, media: Media) -> None:
+    rel_path = Path(media.storage_path)
+    if media.type != "video" or rel_path.suffix.lower() not in FASTSTART_EXTENSIONS:
+        return
+    source = Path(settings.MEDIA_ROOT) / rel_path
+    if not needs_faststart(source):
+        return
+    # remux into a fresh name and repoint the row, so readers see either the
+    # old file or the complete new one; sha256 stays that of the upload so
+    # duplicate detection keeps matching the original bytes
+    new_rel = rel_path.with_name(f"{uuid4().hex}{rel_path.suffix}")
+    target = Path(settings.MEDIA_ROOT) / new_rel
+    try:
+        remux_faststart(source, target)
+        if settings.MEDIA_LAYOUT == "sha256":
+            new_rel = adopt_content(target, rel_path.suffix)
+            target = Path(settings.MEDIA_ROOT) / new_rel
+        media.storage_path = new_rel.as_posix()
+        media.bytes = target.stat().st_size
+        session.commit()
+    except BaseException:
+        target.unlink(missing_ok=True)
+        raise
+    source.unlink(missing_ok=True)
+
+
+@task_handler("hls")
+def package_media_hls(session: Session, media: Media) -> None:
+    if media.type != "video":
+        return
+    if not media.width or not media.height:
+        raise RuntimeError("HLS_NEEDS_PROBE")
+    source = Path(settings.MEDIA_ROOT) / media.storage_path
+    if not source.exists():
+        raise FileNotFoundError(media.storage_path)
+    remove_stale_outputs(HLS_DIR, media.id, keep=media.hls_path)
+    renditions = plan_renditions(media.width, media.height, media.bitrate, media.video_codec, media.audio_codec)
+    hls_path = package_hls(media.id, source, renditions, media.duration_sec)
+    previous = media.hls_path
+    media.hls_path = hls_path
+    try:
+        session.commit()
+    except BaseException:
+        remove_output(hls_path)
+        raise
+    remove_output(previous)
+
+
+@task_handler("storyboard")
+def generate_media_storyboard(session: Session, media: Media) -> None:
+    if media.type != "video":
+        return
+    if not media.duration_sec or not media.width or not media.height:
+        raise RuntimeError("STORYBOARD_NEEDS_PROBE")
+    source = Path(settings.MEDIA_ROOT) / media.storage_path
+    if not source.exists():
+        raise FileNotFoundError(media.storage_path)
+    remove_stale_outputs(STORYBOARD_DIR, media.id, keep=media.storyboard_path)
+    storyboard_path = generate_storyboard(media.id, source, media.duration_sec, media.width, media.height)
+    previous = media.storyboard_path
+    media.storyboard_path = storyboard_path
+    try:
+        session.commit()
+    except BaseException:
+        remove_output(storyboard_path)
+        raise
+    remove_output(previous)
+
+
+@task_handler("waveform")
+def generate_waveform(session: Session, media: Media) -> None:
+    if media.type != "audio":
+        return
+    rel_path = Path(media.storage_path)
+    source = Path(settings.MEDIA_ROOT) / rel_path
+    if not source.exists():
+        raise FileNotFoundError(media.storage_path)
+    waveform = compute_waveform(source, rel_path)
+    media.waveform_path = waveform.path
+    if media.duration_sec is None:
+        media.duration_sec = waveform.duration_sec
+
+
+@periodic("reconcile-media", every=settings.JOB_RECONCILE_INTERVAL)
+def reconcile_media() -> None:
+    with SessionLocal() as session:
+        retype: dict[str, list[int]] = {}
+        missing_preview: list[int] = []
+        missing_waveform: list[int] = []
+        rows = session.execute(
+            select(Media.id, Media.type, Media.mime_type, Media.filename, Media.preview_path, Media.waveform_path)
+        )
+        for media_id, current, mime_type, filename, preview_path, waveform_path in rows:
+            desired = _classify_type(mime_type, filename)
+            if desired != current:
+                retype.setdefault(desired, []).append(media_id)
+            if desired == "video" and not preview_path:
+                missing_preview.append(media_id)
+            if desired == "audio" and not waveform_path:
+                missing_waveform.append(media_id)
+
+        for desired, ids in retype.items():
+            for chunk in _chunks(ids):
+                session.execute(update(Media).where(Media.id.in_(chunk)).values(type=desired))
+
+        enqueued = sum(_enqueue_missing(session, "preview", chunk) for chunk in _chunks(missing_preview))
+        waveforms = 0
+        for chunk in _chunks(missing_waveform):
+            _enqueue_missing(session, "probe", chunk)
+            waveforms += _enqueue_missing(session, "waveform", chunk)
+        session.commit()
+
+    if retype or enqueued or waveforms:
+        logger.info(
+            "reconciled media: %s retyped, %s previews and %s waveforms queued",
+            sum(len(ids) for ids in retype.values()),
+            enqueued,
+            waveforms,
+        )
+
+
+@periodic("media-scrub", every=settings.SCRUB_INTERVAL)
+def media_scrub() -> None:
+    if not settings.SCRUB_ENABLED:
+        return
+    counts = scrub()
+    if counts:
+        logger.info("media scrub checked %s files: %s", sum(counts.values()), counts)
+
+
+@periodic("media-gc", every=settings.GC_INTERVAL)
+def media_gc() -> None:
+    # without GC_ENABLED the job only reports, so a fresh deployment can check
+    # what would go before turning deletion on
+    report = collect_garbage(dry_run=not settings.GC_ENABLED)
+    if report.orphans or report.errors:
+        logger.info(
+            "media gc (%s): %s orphans, %s bytes, %s deleted, %s errors, sample %s",
+            "dry run" if report.dry_run else "delete",
+            report.orphans,
+            report.orphan_bytes,
+            report.deleted,
+            report.errors,
+            report.sample[:5],
+        )
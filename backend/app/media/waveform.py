@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from uuid import uuid4
+
+from ..config import settings
+from ..metrics import observe_ffmpeg
+
+WAVEFORM_DIR = "waveforms"
+SAMPLE_RATE = 8000
+READ_SIZE = 1024 * 256
+# decoding to 8 kHz mono runs far faster than this byte floor, so the
+# deadline only ever cuts off a decoder that has stopped making progress
+WAVEFORM_TIMEOUT_BASE_SECONDS = 60
+WAVEFORM_MIN_BYTES_PER_SECOND = 1024 * 1024
+
+
+@dataclass(frozen=True, slots=True)
+class Waveform:
+    path: str
+    duration_sec: int
+
+
+def _header(samples_per_pixel: int, length: int) -> bytes:
+    # audiowaveform .dat v1 layout with the 8-bit flag, which peaks.js and
+    # similar players read directly: version, flags, sample rate,
+    # samples per pixel, number of min/max pairs
+    return struct.pack("<iIiiI", 1, 1, SAMPLE_RATE, samples_per_pixel, length)
+
+
+def compute_waveform(source: Path, rel_source: Path) -> Waveform:
+    samples_per_pixel = max(1, SAMPLE_RATE // settings.WAVEFORM_PIXELS_PER_SECOND)
+    rel_path = Path(WAVEFORM_DIR) / rel_source.with_suffix(".dat")
+    target = Path(settings.MEDIA_ROOT) / rel_path
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    command = [
+        "ffmpeg",
+        "-v",
+        "error",
+        "-i",
+        str(source),
+        "-map",
+        "0:a:0",
+        "-ac",
+        "1",
+        "-ar",
+        str(SAMPLE_RATE),
+        "-f",
+        "s16le",
+        "-",
+    ]
+    peaks = array("b")
+    total = 0
+    pending = b""
+    timeout = WAVEFORM_TIMEOUT_BASE_SECONDS + source.stat().st_size / WAVEFORM_MIN_BYTES_PER_SECOND
+    started = time.perf_counter()
+    # stderr goes to a file so a chatty decoder can never block on a full pipe
+    errors = tempfile.TemporaryFile()
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=errors)
+    except FileNotFoundError as exc:
+        errors.close()
+        raise RuntimeError("FFMPEG_NOT_FOUND") from exc
+    # a blocking read has no timeout of its own: the watchdog kills a hung
+    # decoder, which closes its stdout and ends the loop below
+    expired = threading.Event()
+
+    def expire() -> None:
+        expired.set()
+        process.kill()
+
+    watchdog = threading.Timer(timeout, expire)
+    watchdog.start()
+    try:
+        # decode is streamed and reduced a bucket at a time, so memory stays
+        # flat no matter how long the recording is
+        bucket_bytes = samples_per_pixel * 2
+        while True:
+            chunk = process.stdout.read(READ_SIZE)
+            if not chunk:
+                break
+            pending += chunk
+            usable = len(pending) - len(pending) % bucket_bytes
+            samples = array("h", pending[:usable])
+            pending = pending[usable:]
+            if sys.byteorder == "big":
+                samples.byteswap()
+            total += len(samples)
+            for start in range(0, len(samples), samples_per_pixel):
+                bucket = samples[start : start + samples_per_pixel]
+                peaks.append(min(bucket) >> 8)
+                peaks.append(max(bucket) >> 8)
+        if len(pending) >= 2:
+            samples = array("h", pending[: len(pending) - len(pending) % 2])
+            if sys.byteorder == "big":
+                samples.byteswap()
+            total += len(samples)
+            peaks.append(min(samples) >> 8)
+            peaks.append(max(samples) >> 8)
+        returncode = process.wait()
+        errors.seek(0)
+        stderr = errors.read()
+    finally:
+        watchdog.cancel()
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        process.stdout.close()
+        errors.close()
+        observe_ffmpeg("waveform", time.perf_counter() - started)
+    if expired.is_set():
+        raise RuntimeError(f"WAVEFORM_FAILED: timed out after {round(timeout)}s")
+    if returncode != 0:
+        raise RuntimeError(f"WAVEFORM_FAILED: {stderr.decode('utf-8', errors='ignore').strip()[:500]}")
+    if total == 0:
+        raise RuntimeError("WAVEFORM_NO_AUDIO")
+
+    partial = target.with_name(f"{target.name}.{uuid4().hex}.part")
+    partial.write_bytes(_header(samples_per_pixel, len(peaks) // 2) + peaks.tobytes())
+    os.replace(partial, target)
+    return Waveform(rel_path.as_posix(), round(total / SAMPLE_RATE))
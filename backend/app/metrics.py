@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+from .utils.api import AppError
+
+registry = CollectorRegistry(auto_describe=True)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template",
+    ["method", "route", "status"],
+    registry=registry,
+)
+NOT_MODIFIED = Counter("http_not_modified_total", "304 responses by route template", ["route"], registry=registry)
+RANGE_REQUESTS = Counter("media_range_requests_total", "Range requests served from MEDIA_ROOT", ["kind"], registry=registry)
+BYTES_STREAMED = Counter("media_bytes_streamed_total", "Bytes streamed from MEDIA_ROOT", ["kind"], registry=registry)
+UPLOAD_BYTES = Histogram(
+    "media_upload_bytes",
+    "Size of uploaded files",
+    buckets=(1 << 16, 1 << 20, 1 << 22, 1 << 24, 1 << 26, 1 << 28, 1 << 30),
+    registry=registry,
+)
+FFMPEG_DURATION = Histogram(
+    "ffmpeg_duration_seconds",
+    "Wall time of ffmpeg invocations",
+    ["task"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+    registry=registry,
+)
+LIMIT_SHED = Counter("http_requests_shed_total", "Requests rejected by the limiter", ["rule", "reason"], registry=registry)
+TASK_QUEUE_DEPTH = Gauge("media_task_queue_depth", "Media tasks pending or running, as seen by the job leader", registry=registry)
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed", registry=registry)
+DB_QUERY_SECONDS = Counter("db_query_seconds_total", "Time spent executing SQL statements", registry=registry)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed per request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+    registry=registry,
+)
+DB_SECONDS_PER_REQUEST = Histogram(
+    "db_seconds_per_request",
+    "Time spent in SQL per request",
+    ["route"],
+    registry=registry,
+)
+
+_request_db: ContextVar[Optional[list[float]]] = ContextVar("metrics_request_db", default=None)
+
+
+def _route_template(request: Request) -> str:
+    route = request.scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+def observe_range_request(kind: str) -> None:
+    if settings.METRICS_ENABLED:
+        RANGE_REQUESTS.labels(kind).inc()
+
+
+def observe_bytes_streamed(kind: str, size: int) -> None:
+    if settings.METRICS_ENABLED:
+        BYTES_STREAMED.labels(kind).inc(size)
+
+
+def observe_upload(size: int) -> None:
+    if settings.METRICS_ENABLED:
+        UPLOAD_BYTES.observe(size)
+
+
+def observe_ffmpeg(task: str, seconds: float) -> None:
+    if settings.METRICS_ENABLED:
+        FFMPEG_DURATION.labels(task).observe(seconds)
+
+
+def observe_limit_shed(rule: str, reason: str) -> None:
+    if settings.METRICS_ENABLED:
+        LIMIT_SHED.labels(rule, reason).inc()
+
+
+def observe_task_queue_depth(depth: int) -> None:
+    if settings.METRICS_ENABLED:
+        TASK_QUEUE_DEPTH.set(depth)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+    DB_QUERIES.inc()
+    DB_QUERY_SECONDS.inc(elapsed)
+    request_db = _request_db.get()
+    if request_db is not None:
+        request_db[0] += 1
+        request_db[1] += elapsed
+
+
+def install_metrics(app: FastAPI) -> None:
+    if not settings.METRICS_ENABLED:
+        return
+
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    @app.middleware("http")
+    async def record_request_metrics(request: Request, call_next):
+        request_db = [0, 0.0]
+        token = _request_db.set(request_db)
+        started = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            _request_db.reset(token)
+        route = _route_template(request)
+        REQUEST_LATENCY.labels(request.method, route, str(response.status_code)).observe(time.perf_counter() - started)
+        if response.status_code == 304:
+            NOT_MODIFIED.labels(route).inc()
+        DB_QUERIES_PER_REQUEST.labels(route).observe(request_db[0])
+        DB_SECONDS_PER_REQUEST.labels(route).observe(request_db[1])
+        return response
+
+    @app.get("/metrics", tags=["system"], include_in_schema=False)
+    async def metrics(request: Request):
+        if settings.METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {settings.METRICS_TOKEN}":
+            raise AppError(status_code=401, code=40100, message="NOT_AUTHENTICATED")
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
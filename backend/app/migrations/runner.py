@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+LOCK_NAME = "suzuhara_schema_migrations"
+LOCK_TIMEOUT_SECONDS = 300
+
+metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(128), nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+
+MIGRATIONS: list[Migration] = []
+
+
+def migration(version: int, name: str):
+    def register(func: Callable[[Connection], None]) -> Callable[[Connection], None]:
+        if any(item.version == version for item in MIGRATIONS):
+            raise RuntimeError(f"duplicate migration version {version}")
+        MIGRATIONS.append(Migration(version, name, func))
+        MIGRATIONS.sort(key=lambda item: item.version)
+        return func
+
+    return register
+
+
+def latest_version() -> int:
+    from . import versions  # noqa: F401 registers migrations
+
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def current_version(connection: Connection) -> int:
+    try:
+        return connection.execute(select(func.coalesce(func.max(schema_migrations.c.version), 0))).scalar_one()
+    except DBAPIError:
+        connection.rollback()
+        return 0
+
+
+def has_column(connection: Connection, table: str, column: str) -> bool:
+    return any(item["name"] == column for item in inspect(connection).get_columns(table))
+
+
+def add_column(connection: Connection, table: str, column: str, ddl: str) -> None:
+    if not has_column(connection, table, column):
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def create_tables(connection: Connection, *tables: Table) -> None:
+    for table in tables:
+        table.create(connection, checkfirst=True)
+
+
+def _acquire_lock(connection: Connection) -> None:
+    if connection.dialect.name != "mysql":
+        return
+    acquired = connection.execute(
+        text("SELECT GET_LOCK(:name, :timeout)"), {"name": LOCK_NAME, "timeout": LOCK_TIMEOUT_SECONDS}
+    ).scalar()
+    connection.commit()
+    if acquired != 1:
+        raise RuntimeError(f"timed out waiting for migration lock {LOCK_NAME}")
+
+
+def _release_lock(connection: Connection) -> None:
+    if connection.dialect.name != "mysql":
+        return
+    connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": LOCK_NAME})
+    connection.commit()
+
+
+def pending(connection: Connection) -> list[Migration]:
+    version = current_version(connection)
+    latest_version()
+    return [item for item in MIGRATIONS if item.version > version]
+
+
+def migrate(engine: Engine) -> list[Migration]:
+    applied: list[Migration] = []
+    with engine.connect() as connection:
+        _acquire_lock(connection)
+        try:
+            create_tables(connection, schema_migrations)
+            # re-read under the lock: another process may have finished first
+            todo = pending(connection)
+            connection.commit()
+            for item in todo:
+                started = time.perf_counter()
+                with connection.begin():
+                    item.apply(connection)
+                    connection.execute(
+                        schema_migrations.insert().values(
+                            version=item.version, name=item.name, applied_at=datetime.now(timezone.utc)
+                        )
+                    )
+                logger.info("applied migration %s %s in %.2fs", item.version, item.name, time.perf_counter() - started)
+                applied.append(item)
+        finally:
+            _release_lock(connection)
+    return applied
+
+
+def ensure_schema(engine: Engine, *, auto_migrate: bool) -> None:
+    with engine.connect() as connection:
+        version = current_version(connection)
+    latest = latest_version()
+    if version >= latest:
+        return
+    if not auto_migrate:
+        raise RuntimeError(
+            f"database schema is at version {version}, expected {latest}; run `python -m app.cli migrate`"
+        )
+    migrate(engine)
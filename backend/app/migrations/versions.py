@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .runner import add_column, create_tables, has_column, migration
+
+
+@migration(1, "baseline schema")
+def baseline_schema(connection: Connection) -> None:
+    from .. import models  # noqa: F401 ensure models are registered
+    from ..db import Base
+
+    Base.metadata.create_all(bind=connection)
+    if connection.dialect.name == "mysql":
+        connection.execute(
+            text("ALTER TABLE users MODIFY COLUMN role ENUM('developer','manager','viewer') NOT NULL DEFAULT 'viewer'")
+        )
+    add_column(connection, "media", "preview_path", "VARCHAR(512) NULL")
+    add_column(connection, "home_sections", "preview_rows", "INT NOT NULL DEFAULT 1")
+    if has_column(connection, "home_sections", "preview_limit"):
+        connection.execute(
+            text(
+                "UPDATE home_sections SET preview_rows = CASE WHEN preview_limit > 12 THEN 4"
+                " WHEN preview_limit > 8 THEN 3 WHEN preview_limit > 4 THEN 2 ELSE 1 END"
+            )
+        )
+        connection.execute(text("ALTER TABLE home_sections DROP COLUMN preview_limit"))
+
+
+@migration(2, "seed defaults")
+def seed_defaults(connection: Connection) -> None:
+    with Session(bind=connection) as session:
+        _ensure_default_developer(session)
+        _seed_social_posts(session)
+        _seed_home_sections(session)
+
+
+def _ensure_default_developer(session: Session) -> None:
+    from passlib.hash import bcrypt
+    from ..models import User
+
+    exists = session.query(User).filter(User.role == "developer").first()
+    if exists:
+        return
+    password_hash = bcrypt.hash("ChangeMe123!")
+    user = User(
+        username="developer",
+        email="developer@example.com",
+        password_hash=password_hash,
+        role="developer",
+    )
+    session.add(user)
+    session.commit()
+
+
+def _seed_social_posts(session: Session) -> None:
+    from datetime import datetime, timezone
+    from ..models import SocialPost, SocialMedia, SocialReply
+
+    existing = session.execute(select(SocialPost).limit(1)).scalar_one_or_none()
+    if existing:
+        return
+
+    base_created = datetime(2025, 9, 8, 9, 0, tzinfo=timezone.utc)
+
+    post1 = SocialPost(
+        platform="x",
+        external_id="1832712345678901234",
+        author_name="鈴原希実",
+        author_handle="NozomiSuzuhara",
+        author_avatar_url="https://placekitten.com/200/200",
+        content=(
+            "#鈴原希実 の夢はカワイイなんばーわんの誕生会2025\n\n"
+            "グッズ販売はじまったよ〜っ🥰💕\n今年はくまさん🐻と白ねこさん🐈🎀\nどっちが好きですか？👀\n\n"
+            "ぜひチェックしてね( ˘˘ )\nstore.plusmember.jp/shop/products/…\n\n"
+            "そして会場にもぜひ来てね〜！🙌\n#鈴原希実のカワイイ誕生会2025"
+        ),
+        created_at=base_created,
+        like_count=40123,
+        repost_count=1123,
+        reply_count=194,
+        is_pinned=True,
+        permalink="https://x.com/NozomiSuzuhara/status/1832712345678901234",
+    )
+
+    post1.media_items = [
+        SocialMedia(
+            media_type="image",
+            url="https://placekitten.com/600/400",
+            preview_url="https://placekitten.com/300/200",
+            alt_text="Nozomi Suzuhara in maid outfit with teddy bear",
+            order_index=0,
+        ),
+        SocialMedia(
+            media_type="image",
+            url="https://placebear.com/600/400",
+            preview_url="https://placebear.com/300/200",
+            alt_text="Nozomi Suzuhara smiling in red outfit",
+            order_index=1,
+        ),
+        SocialMedia(
+            media_type="image",
+            url="https://placekitten.com/601/401",
+            preview_url="https://placekitten.com/300/201",
+            alt_text="Close-up portrait",
+            order_index=2,
+        ),
+        SocialMedia(
+            media_type="image",
+            url="https://placebear.com/601/401",
+            preview_url="https://placebear.com/300/201",
+            alt_text="Holding teddy bear",
+            order_index=3,
+        ),
+    ]
+
+    post1.replies = [
+        SocialReply(
+            author_name="Apollo Bay 公式",
+            author_handle="ApolloBay_seiyu",
+            author_avatar_url="https://placekitten.com/180/180",
+            content="オフィシャルグッズ事前販売開始のお知らせ🔔",
+            created_at=base_created.replace(hour=10),
+            like_count=120,
+            permalink="https://x.com/ApolloBay_seiyu/status/1832719900000000000",
+        )
+    ]
+
+    post2 = SocialPost(
+        platform="x",
+        external_id="1832755555555555555",
+        author_name="鈴原希実",
+        author_handle="NozomiSuzuhara",
+        author_avatar_url="https://placekitten.com/200/201",
+        content="お知らせ🖤🤍\n\nFC2次先行受付が始まったよ〜ん🥰⚠️\n受付期間は9/28(日)23時59分まで🙌",
+        created_at=base_created.replace(day=9, hour=1),
+        like_count=10240,
+        repost_count=612,
+        reply_count=85,
+        permalink="https://x.com/NozomiSuzuhara/status/1832755555555555555",
+    )
+
+    post2.media_items = [
+        SocialMedia(
+            media_type="image",
+            url="https://placekitten.com/602/402",
+            preview_url="https://placekitten.com/301/201",
+            alt_text="Nozomi Suzuhara announcement banner",
+            order_index=0,
+        )
+    ]
+
+    session.add_all([post1, post2])
+    session.commit()
+
+
+def _seed_home_sections(session: Session) -> None:
+    from ..models import HomeSection
+
+    defaults = [
+        {"key": "photos", "title": "照片", "preview_rows": 2},
+        {"key": "broadcast", "title": "广播", "preview_rows": 1},
+        {"key": "live", "title": "生放送", "preview_rows": 1},
+        {"key": "xspace", "title": "Xspace", "preview_rows": 1},
+    ]
+
+    for index, item in enumerate(defaults):
+        section = session.execute(select(HomeSection).where(HomeSection.key == item["key"])).scalar_one_or_none()
+        if section:
+            section.title = item["title"]
+            section.preview_rows = item["preview_rows"]
+            section.order_index = index
+        else:
+            session.add(
+                HomeSection(
+                    key=item["key"],
+                    title=item["title"],
+                    preview_rows=item["preview_rows"],
+                    order_index=index,
+                )
+            )
+
+    session.commit()
+
+
+@migration(3, "media task queue")
+def media_task_queue(connection: Connection) -> None:
+    from ..models import MediaTask
+
+    create_tables(connection, MediaTask.__table__)
+
+
+@migration(4, "media blurhash")
+def media_blurhash(connection: Connection) -> None:
+    add_column(connection, "media", "blurhash", "VARCHAR(64) NULL")
+
+
+@migration(5, "media video probe columns")
+def media_video_probe(connection: Connection) -> None:
+    add_column(connection, "media", "video_codec", "VARCHAR(32) NULL")
+    add_column(connection, "media", "audio_codec", "VARCHAR(32) NULL")
+    add_column(connection, "media", "bitrate", "BIGINT NULL")
+
+
+@migration(6, "media hls path")
+def media_hls_path(connection: Connection) -> None:
+    add_column(connection, "media", "hls_path", "VARCHAR(512) NULL")
+
+
+@migration(7, "media storyboard path")
+def media_storyboard_path(connection: Connection) -> None:
+    add_column(connection, "media", "storyboard_path", "VARCHAR(512) NULL")
+
+
+@migration(8, "audio media type")
+def audio_media_type(connection: Connection) -> None:
+    if connection.dialect.name == "mysql":
+        connection.execute(text("ALTER TABLE media MODIFY COLUMN type ENUM('image','video','audio') NOT NULL"))
+    add_column(connection, "media", "waveform_path", "VARCHAR(512) NULL")
+
+
+@migration(9, "media display path")
+def media_display_path(connection: Connection) -> None:
+    add_column(connection, "media", "display_path", "VARCHAR(512) NULL")
+
+
+@migration(10, "media perceptual hash")
+def media_phash(connection: Connection) -> None:
+    add_column(connection, "media", "phash", "BIGINT NULL")
+
+
+@migration(11, "media integrity checks")
+def media_integrity_checks(connection: Connection) -> None:
+    from ..models import MediaCheck
+
+    create_tables(connection, MediaCheck.__table__)
+
+
+@migration(12, "shared cache versions")
+def shared_cache_versions(connection: Connection) -> None:
+    from ..home.cache import HOME_CACHE_NAME
+    from ..models import CacheVersion
+
+    create_tables(connection, CacheVersion.__table__)
+    exists = connection.execute(select(CacheVersion.name).where(CacheVersion.name == HOME_CACHE_NAME)).first()
+    if exists is None:
+        connection.execute(CacheVersion.__table__.insert().values(name=HOME_CACHE_NAME, version=0))
@@ -84,7 +84,7 @@ class Media(Base):
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
     album_id: Mapped[Optional[int]] = mapped_column(ForeignKey("albums.id"), nullable=True, index=True)
-    type: Mapped[str] = mapped_column(Enum("image", "video", name="media_type_enum"))
+    type: Mapped[str] = mapped_column(Enum("image", "video", "audio", name="media_type_enum"))
     filename: Mapped[str] = mapped_column(String(255))
     title: Mapped[Optional[str]] = mapped_column(String(255))
     mime_type: Mapped[str] = mapped_column(String(128))
@@ -96,6 +96,15 @@ class Media(Base):
     taken_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
     storage_path: Mapped[str] = mapped_column(String(512))
     preview_path: Mapped[Optional[str]] = mapped_column(String(512))
+    blurhash: Mapped[Optional[str]] = mapped_column(String(64))
+    video_codec: Mapped[Optional[str]] = mapped_column(String(32))
+    audio_codec: Mapped[Optional[str]] = mapped_column(String(32))
+    bitrate: Mapped[Optional[int]] = mapped_column(BigInteger)
+    hls_path: Mapped[Optional[str]] = mapped_column(String(512))
+    storyboard_path: Mapped[Optional[str]] = mapped_column(String(512))
+    waveform_path: Mapped[Optional[str]] = mapped_column(String(512))
+    display_path: Mapped[Optional[str]] = mapped_column(String(512))
+    phash: Mapped[Optional[int]] = mapped_column(BigInteger)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     owner: Mapped[User] = relationship(back_populates="media")
@@ -250,3 +259,56 @@ class AccessRequest(Base):
         foreign_keys=[processed_by_id],
         back_populates="processed_requests",
     )
+
+
+class MediaTask(Base):
+    __tablename__ = "media_tasks"
+    __table_args__ = (
+        UniqueConstraint("media_id", "kind", name="uq_media_task_kind"),
+        Index("idx_media_task_status", "status", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(MySQLBigInt(unsigned=True), primary_key=True, autoincrement=True)
+    media_id: Mapped[int] = mapped_column(ForeignKey("media.id", ondelete="CASCADE"), nullable=False)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    status: Mapped[str] = mapped_column(
+        Enum("pending", "running", "done", "failed", name="media_task_status_enum"),
+        nullable=False,
+        default="pending",
+    )
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class MediaCheck(Base):
+    __tablename__ = "media_checks"
+    __table_args__ = (
+        Index("idx_media_check_status", "status", "media_id"),
+        Index("idx_media_check_checked", "checked_at", "media_id"),
+    )
+
+    media_id: Mapped[int] = mapped_column(ForeignKey("media.id", ondelete="CASCADE"), primary_key=True)
+    status: Mapped[str] = mapped_column(
+        Enum("ok", "missing", "size_mismatch", "hash_mismatch", "error", name="media_check_status_enum"),
+        nullable=False,
+    )
+    # the path and digest actually read, so later passes can verify files
+    # whose bytes no longer match the upload digest (faststart remuxes)
+    storage_path: Mapped[str] = mapped_column(String(512), nullable=False)
+    actual_bytes: Mapped[Optional[int]] = mapped_column(BigInteger)
+    actual_sha256: Mapped[Optional[str]] = mapped_column(String(64))
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    checked_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+
+    # bumped in the same transaction as the writes it covers, so every worker
+    # process can tell when its in-process cache went stale
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
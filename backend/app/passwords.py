@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Optional, TypeVar
+
+from passlib.hash import bcrypt
+from starlette.concurrency import run_in_threadpool
+
+from .config import settings
+from .utils.api import AppError
+
+T = TypeVar("T")
+
+
+def bcrypt_hash(password: str, rounds: int) -> str:
+    return bcrypt.using(rounds=rounds).hash(password)
+
+
+def bcrypt_verify(password: str, hashed: str, rounds: int) -> tuple[bool, Optional[str]]:
+    # verify and, when the stored cost differs from the configured one, rehash
+    # in the same worker call so a login never queues twice
+    hasher = bcrypt.using(rounds=rounds)
+    if not hasher.verify(password, hashed):
+        return False, None
+    return True, hasher.hash(password) if hasher.needs_update(hashed) else None
+
+
+class PasswordPool:
+    def __init__(self) -> None:
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.in_flight = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # created lazily so every gunicorn worker owns its pool; spawn avoids
+        # forking a process that already runs threadpool threads
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        if self.in_flight >= settings.PASSWORD_HASH_MAX_PENDING:
+            raise AppError(status_code=429, code=42900, message="TOO_MANY_REQUESTS", headers={"Retry-After": "1"})
+        self.in_flight += 1
+        try:
+            if settings.PASSWORD_HASH_WORKERS <= 0:
+                return await run_in_threadpool(func, *args)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), partial(func, *args))
+        finally:
+            self.in_flight -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_pool = PasswordPool()
+
+
+async def hash_password(password: str) -> str:
+    return await password_pool.run(bcrypt_hash, password, settings.BCRYPT_ROUNDS)
+
+
+async def verify_password(password: str, hashed: str) -> tuple[bool, Optional[str]]:
+    return await password_pool.run(bcrypt_verify, password, hashed, settings.BCRYPT_ROUNDS)
@@ -6,9 +6,9 @@ from typing import Optional
 from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel, ConfigDict
 from sqlalchemy import and_, desc, func, or_, select
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
-from ..deps import SessionDep, require_user
+from ..deps import ReadSessionDep, SessionDep, require_user
 from ..models import SocialMedia, SocialPost, SocialReply, User
 from ..utils.api import AppError, success
 
@@ -72,14 +72,14 @@ def _make_cursor(post: SocialPost) -> str:
 
 
 @router.get("/posts")
-def list_posts(
-    session: SessionDep,
+async def list_posts(
+    session: ReadSessionDep,
     current_user: User = Depends(require_user),
     platform: Optional[str] = Query(default=None, pattern="^(x|instagram)$"),
     limit: int = Query(default=10, ge=1, le=50),
     cursor: Optional[str] = Query(default=None),
 ) -> dict:
-    base_query = select(SocialPost)
+    base_query = select(SocialPost).options(selectinload(SocialPost.media_items))
     if platform:
         base_query = base_query.where(SocialPost.platform == platform)
 
@@ -102,7 +102,7 @@ def list_posts(
 
     query = base_query.order_by(*order_columns)
 
-    rows = session.execute(query.limit(limit + 1)).scalars().all()
+    rows = (await session.execute(query.limit(limit + 1))).scalars().all()
 
     has_more = len(rows) > limit
     visible = rows[:limit]
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from starlette.concurrency import run_in_threadpool
+
+from ..db_pool import pool_stats
+from ..db_replicas import replicas
+from ..deps import require_developer
+from ..jobs.runner import runner
+from ..media.scrub import integrity_report
+from ..models import User
+from ..utils.api import success
+
+router = APIRouter(prefix="/system", tags=["system"])
+
+
+@router.get("/db-pool")
+async def get_db_pool_stats(current_user: User = Depends(require_developer)):
+    return success({"pools": pool_stats(), "replicas": replicas.status()})
+
+
+@router.get("/jobs")
+async def get_job_status(current_user: User = Depends(require_developer)):
+    return success(await run_in_threadpool(runner.status))
+
+
+@router.get("/integrity")
+async def get_integrity_report(
+    status: Optional[str] = Query(default=None, pattern="^(ok|missing|size_mismatch|hash_mismatch|error)$"),
+    limit: int = Query(default=100, ge=1, le=1000),
+    current_user: User = Depends(require_developer),
+):
+    return success(await run_in_threadpool(lambda: integrity_report(status=status, limit=limit)))
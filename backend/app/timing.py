@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import cProfile
+import marshal
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+
+PROFILE_PARAM = "__profile"
+
+
+class RequestTiming:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.db_count = 0
+        self.db_seconds = 0.0
+        self.handler_done: Optional[float] = None
+        self.spans: dict[str, float] = {}
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans[name] = self.spans.get(name, 0.0) + time.perf_counter() - started
+
+    def header(self, finished: float) -> str:
+        handler_done = self.handler_done or finished
+        entries = [
+            f"db;dur={self.db_seconds * 1000:.2f}",
+            f'db-count;desc="{self.db_count}"',
+            *(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.spans.items()),
+            f"app;dur={(handler_done - self.started) * 1000:.2f}",
+            f"serialize;dur={(finished - handler_done) * 1000:.2f}",
+            f"total;dur={(finished - self.started) * 1000:.2f}",
+        ]
+        return ", ".join(entries)
+
+
+_current: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    with timing.span(name):
+        yield
+
+
+def mark_handler_done() -> None:
+    timing = _current.get()
+    if timing is not None and timing.handler_done is None:
+        timing.handler_done = time.perf_counter()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current.get() is not None:
+        conn.info.setdefault("timing_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    timing = _current.get()
+    starts = conn.info.get("timing_query_start")
+    if timing is None or not starts:
+        return
+    timing.db_count += 1
+    timing.db_seconds += time.perf_counter() - starts.pop()
+
+
+async def _authorize_profiling(request: Request) -> None:
+    from .db import AsyncSessionLocal
+    from .deps import get_current_user, get_token_from_cookie, require_developer
+
+    token = get_token_from_cookie(request)
+    async with AsyncSessionLocal() as session:
+        user = await get_current_user(session, token)
+    await require_developer(user)
+
+
+async def _profile_request(request: Request, call_next, timing: RequestTiming) -> Response:
+    from .utils.api import AppError
+
+    try:
+        await _authorize_profiling(request)
+    except AppError as exc:
+        return JSONResponse(
+            status_code=exc.status_code,
+            content={"code": exc.code, "message": exc.message, "request_id": request.state.request_id},
+        )
+
+    # only code running on the event loop thread is captured; sync routes
+    # dispatched to the threadpool show up as time spent awaiting them
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        response = await call_next(request)
+        async for _ in response.body_iterator:
+            pass
+    finally:
+        profiler.disable()
+    finished = time.perf_counter()
+
+    profiler.create_stats()
+    return Response(
+        content=marshal.dumps(profiler.stats),
+        media_type="application/octet-stream",
+        headers={
+            "Content-Disposition": f'attachment; filename="profile-{request.state.request_id}.prof"',
+            "Server-Timing": timing.header(finished),
+            "X-Profiled-Status": str(response.status_code),
+        },
+    )
+
+
+def install_server_timing(app: FastAPI) -> None:
+    if not (settings.SERVER_TIMING_ENABLED or settings.PROFILING_ENABLED):
+        return
+
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    @app.middleware("http")
+    async def add_server_timing(request: Request, call_next):
+        timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            if settings.PROFILING_ENABLED and request.query_params.get(PROFILE_PARAM) == "1":
+                return await _profile_request(request, call_next, timing)
+            response = await call_next(request)
+        finally:
+            _current.reset(token)
+        if settings.SERVER_TIMING_ENABLED:
+            response.headers["Server-Timing"] = timing.header(time.perf_counter())
+        return response
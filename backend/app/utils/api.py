@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Optional
+
+from ..timing import mark_handler_done
 
 
 @dataclass(slots=True)
@@ -9,7 +11,9 @@ class AppError(Exception):
     status_code: int
     code: int
     message: str
+    headers: Optional[dict[str, str]] = None
 
 
 def success(data: Any | None = None, message: str = "") -> dict[str, Any]:
+    mark_handler_done()
     return {"code": 0, "data": data, "message": message}
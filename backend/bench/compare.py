@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "mean_ms")
+
+
+def compare(baseline: dict, candidate: dict, *, metric: str) -> list[dict]:
+    rows = []
+    for name, before in baseline["scenarios"].items():
+        after = candidate["scenarios"].get(name)
+        if not after or not before.get(metric) or after.get(metric) is None:
+            continue
+        change = (after[metric] - before[metric]) / before[metric] * 100
+        rows.append({"scenario": name, "before": before[metric], "after": after[metric], "change_pct": round(change, 1)})
+    return rows
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--metric", choices=METRICS, default="p95_ms")
+    parser.add_argument("--fail-over", type=float, default=None, help="exit 1 if any scenario regresses by more than this percentage")
+    args = parser.parse_args(argv)
+
+    baseline = json.loads(Path(args.baseline).read_text())
+    candidate = json.loads(Path(args.candidate).read_text())
+    for label, report in (("baseline", baseline), ("candidate", candidate)):
+        meta = report["meta"]
+        print(f"{label:9s} {meta.get('git_commit') or '?'}{' (dirty)' if meta.get('git_dirty') else ''} {meta.get('db_backend')} scale={meta['seed'].get('scale')}")
+    if baseline["meta"]["seed"].get("scale") != candidate["meta"]["seed"].get("scale"):
+        print("warning: results were recorded against different library scales")
+
+    rows = compare(baseline, candidate, metric=args.metric)
+    regressions = []
+    print(f"\n{'scenario':32s} {'before':>10s} {'after':>10s} {'change':>8s}")
+    for row in rows:
+        print(f"{row['scenario']:32s} {row['before']:10.2f} {row['after']:10.2f} {row['change_pct']:+7.1f}%")
+        if args.fail_over is not None and row["change_pct"] > args.fail_over:
+            regressions.append(row["scenario"])
+
+    if regressions:
+        print(f"\n{args.metric} regressed by more than {args.fail_over}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
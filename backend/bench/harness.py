@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+DEFAULT_DB_URL = "sqlite:///./bench-data/bench.db"
+DEFAULT_MEDIA_ROOT = "./bench-data/media"
+
+
+# must run before anything imports `app`, which reads settings at import time
+def configure(db_url: Optional[str], media_root: Optional[str]) -> None:
+    os.environ["DB_URL"] = db_url or os.environ.get("BENCH_DB_URL") or DEFAULT_DB_URL
+    os.environ["MEDIA_ROOT"] = media_root or os.environ.get("BENCH_MEDIA_ROOT") or DEFAULT_MEDIA_ROOT
+    os.environ.setdefault("JWT_SECRET", "bench-secret")
+    # reconcile, scrub, gc and backfill would otherwise start with the app and
+    # add their own IO and statements to whatever is being measured
+    os.environ["JOBS_ENABLED"] = "false"
+    # the bench drives far more traffic from one client than the admission
+    # limits allow; they would turn most requests into 429s
+    os.environ["LIMITS_ENABLED"] = "false"
+    if os.environ["DB_URL"].startswith("sqlite"):
+        Path(os.environ["DB_URL"].split("///", 1)[1]).parent.mkdir(parents=True, exist_ok=True)
+        _install_sqlite_shims()
+    Path(os.environ["MEDIA_ROOT"]).mkdir(parents=True, exist_ok=True)
+
+
+def _substring_index(value, delimiter, count):
+    if value is None:
+        return None
+    parts = value.split(delimiter)
+    return delimiter.join(parts[:count]) if count > 0 else delimiter.join(parts[count:])
+
+
+def _install_sqlite_shims() -> None:
+    # SQLite stand-in: BIGINT primary keys only autoincrement as INTEGER, and the
+    # listing queries use MySQL's SUBSTRING_INDEX for natural filename ordering.
+    from sqlalchemy import event
+    from sqlalchemy.dialects.mysql import BIGINT
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.ext.compiler import compiles
+
+    @compiles(BIGINT, "sqlite")
+    def _compile_bigint(type_, compiler, **kw):
+        return "INTEGER"
+
+    @event.listens_for(Engine, "connect")
+    def _register_functions(dbapi_connection, connection_record):
+        if isinstance(dbapi_connection, sqlite3.Connection) or hasattr(dbapi_connection, "create_function"):
+            dbapi_connection.create_function("substring_index", 3, _substring_index)
+
+
+def auth_cookies(username: str) -> dict[str, str]:
+    from sqlalchemy import select
+
+    from app.db import SessionLocal
+    from app.deps import ACCESS_TOKEN_COOKIE, create_access_token
+    from app.models import User
+
+    with SessionLocal() as session:
+        user = session.execute(select(User).where(User.username == username)).scalar_one()
+        return {ACCESS_TOKEN_COOKIE: create_access_token(user=user)}
+
+
+def cookie_header(username: str) -> str:
+    return "; ".join(f"{key}={value}" for key, value in auth_cookies(username).items())
+
+
+@asynccontextmanager
+async def asgi_client() -> AsyncIterator:
+    import httpx
+
+    from app.main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await app.router.startup()
+        try:
+            yield client
+        finally:
+            await app.router.shutdown()
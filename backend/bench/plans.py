@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextvars
+import json
+import random
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from .harness import asgi_client, configure, cookie_header
+from .seed import load_seed_meta
+
+DEFAULT_SCENARIOS = ["list_media", "list_albums", "social"]
+BUDGETS_PATH = Path(__file__).with_name("plan_budgets.json")
+COUNTERS = ("full_scans", "filesorts", "temporary")
+
+
+class StatementCapture:
+    # the listener sees every Engine in the process, so statements only count
+    # when issued from the request's own context (threadpool dependencies and
+    # tasks inherit it); anything started elsewhere, like a job, is ignored
+    def __init__(self) -> None:
+        self._recording: contextvars.ContextVar[bool] = contextvars.ContextVar("recording", default=False)
+        self.statements: list[tuple[str, Any]] = []
+
+    def start(self) -> contextvars.Token:
+        self.statements = []
+        return self._recording.set(True)
+
+    def stop(self, token: contextvars.Token) -> None:
+        self._recording.reset(token)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if self._recording.get() and not executemany and statement.lstrip().upper().startswith("SELECT"):
+            self.statements.append((statement, parameters))
+
+
+def _walk(node: Any):
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk(value)
+
+
+def summarize_mysql_plan(plan: dict) -> dict:
+    summary = {"tables": [], "full_scans": 0, "filesorts": 0, "temporary": 0}
+    for node in _walk(plan):
+        if node.get("using_filesort") is True:
+            summary["filesorts"] += 1
+        if node.get("using_temporary_table") is True:
+            summary["temporary"] += 1
+        table = node.get("table")
+        if isinstance(table, dict) and "table_name" in table:
+            access = table.get("access_type")
+            summary["tables"].append(
+                {
+                    "table": table["table_name"],
+                    "access": access,
+                    "key": table.get("key"),
+                    "rows": table.get("rows_examined_per_scan"),
+                }
+            )
+            if access == "ALL":
+                summary["full_scans"] += 1
+    return summary
+
+
+def summarize_sqlite_plan(rows: list) -> dict:
+    summary = {"tables": [], "full_scans": 0, "filesorts": 0, "temporary": 0}
+    for row in rows:
+        detail = row[-1]
+        if detail.startswith(("SCAN ", "SEARCH ")):
+            words = detail.split()
+            summary["tables"].append({"table": words[1], "access": words[0], "detail": detail})
+            if words[0] == "SCAN" and "INDEX" not in detail:
+                summary["full_scans"] += 1
+        elif detail.startswith("USE TEMP B-TREE FOR ORDER BY"):
+            summary["filesorts"] += 1
+        elif detail.startswith("USE TEMP B-TREE"):
+            summary["temporary"] += 1
+    return summary
+
+
+def explain(connection, statement: str, parameters) -> dict:
+    dialect = connection.dialect.name
+    if dialect == "mysql":
+        raw = connection.exec_driver_sql(f"EXPLAIN FORMAT=JSON {statement}", parameters).scalar_one()
+        plan = json.loads(raw)
+        return {**summarize_mysql_plan(plan), "plan": plan}
+    if dialect == "sqlite":
+        rows = [tuple(row) for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+        return {**summarize_sqlite_plan(rows), "plan": [row[-1] for row in rows]}
+    raise SystemExit(f"EXPLAIN is not supported for {dialect}")
+
+
+async def capture(patterns: list[str]) -> dict[str, list[tuple[str, Any]]]:
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    from .scenarios import prepare_meta, select_scenarios
+
+    scenarios = [scenario for scenario in select_scenarios(patterns) if not scenario.mutating]
+    if not scenarios:
+        raise SystemExit("no scenarios matched")
+    cookies = {user: cookie_header(user) for user in {scenario.user for scenario in scenarios} | {"bench-viewer"}}
+    rng = random.Random(0)
+    recorder = StatementCapture()
+    captured: dict[str, list[tuple[str, Any]]] = {}
+
+    event.listen(Engine, "before_cursor_execute", recorder)
+    try:
+        async with asgi_client() as client:
+            meta = await prepare_meta(client, cookies, load_seed_meta())
+            for scenario in scenarios:
+                request = scenario.build(rng, meta)
+                request.setdefault("headers", {})["cookie"] = cookies[scenario.user]
+                token = recorder.start()
+                try:
+                    response = await client.request(**request)
+                finally:
+                    recorder.stop(token)
+                if response.status_code not in scenario.expect:
+                    raise SystemExit(f"{scenario.name}: unexpected {response.status_code} {response.text[:200]}")
+                captured[scenario.name] = recorder.statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", recorder)
+    return captured
+
+
+def check(report: dict, budgets: dict) -> list[str]:
+    violations = []
+    for name, result in report["scenarios"].items():
+        # an unrecorded scenario has no budget rather than a budget of zero
+        budget = budgets.get(name)
+        if budget is None:
+            continue
+        for counter in COUNTERS:
+            allowed = budget.get(counter, 0)
+            if result[counter] > allowed:
+                violations.append(f"{name}: {counter} {result[counter]} > budget {allowed}")
+    return violations
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="EXPLAIN the SQL issued by hot routes and enforce plan budgets")
+    parser.add_argument("--db-url", default=None)
+    parser.add_argument("--media-root", default=None)
+    parser.add_argument("--scenarios", nargs="*", default=DEFAULT_SCENARIOS)
+    parser.add_argument("--budgets", default=str(BUDGETS_PATH))
+    parser.add_argument("--record", action="store_true", help="store the current plan counts as the budgets for this backend")
+    parser.add_argument("--output", default=None, help="plan summary file (default: bench-results/plans-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    configure(args.db_url, args.media_root)
+    from app.db import engine
+
+    from .run import _git
+
+    captured = asyncio.run(capture(args.scenarios))
+    dialect = engine.dialect.name
+    scenarios: dict[str, dict] = {}
+    with engine.connect() as connection:
+        for name, statements in captured.items():
+            explained = []
+            for statement, parameters in statements:
+                explained.append({"sql": statement, **explain(connection, statement, parameters)})
+            scenarios[name] = {
+                "statements": explained,
+                **{counter: sum(item[counter] for item in explained) for counter in COUNTERS},
+            }
+
+    report = {
+        "meta": {
+            "git_commit": _git("rev-parse", "HEAD"),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "db_backend": dialect,
+            "seed": load_seed_meta(),
+        },
+        "scenarios": scenarios,
+    }
+    output = Path(args.output or f"bench-results/plans-{(report['meta']['git_commit'] or 'unknown')[:12]}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False, default=str))
+
+    budgets_path = Path(args.budgets)
+    all_budgets: dict[str, dict] = json.loads(budgets_path.read_text()) if budgets_path.exists() else {}
+    if args.record:
+        recorded = dict(all_budgets.get(dialect, {}))
+        for name, result in scenarios.items():
+            recorded[name] = {counter: result[counter] for counter in COUNTERS}
+        all_budgets[dialect] = dict(sorted(recorded.items()))
+        budgets_path.write_text(json.dumps(all_budgets, indent=2) + "\n")
+        print(f"budgets for {dialect} written to {budgets_path}")
+
+    print(f"{'scenario':32s} {'stmts':>5s} {'scans':>5s} {'sorts':>5s} {'temp':>5s}")
+    for name, result in scenarios.items():
+        print(
+            f"{name:32s} {len(result['statements']):5d} {result['full_scans']:5d}"
+            f" {result['filesorts']:5d} {result['temporary']:5d}"
+        )
+    print(f"plan summaries written to {output}")
+
+    budgets = all_budgets.get(dialect, {})
+    unbudgeted = sorted(name for name in scenarios if name not in budgets)
+    # a missing budget fails the run too, so a new backend or scenario cannot
+    # pass the gate just because nobody recorded its plans yet
+    if unbudgeted:
+        print(
+            f"\nno {dialect} plan budget recorded for {', '.join(unbudgeted)}"
+            f" (record one with --record against a {dialect} database)",
+            file=sys.stderr,
+        )
+    violations = check(report, budgets)
+    if violations:
+        print("\nplan budget exceeded:\n  " + "\n  ".join(violations))
+    if unbudgeted or violations:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
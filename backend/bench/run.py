@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from .harness import asgi_client, configure, cookie_header
+from .seed import load_seed_meta
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: list[float], errors: int, wall_seconds: float) -> dict:
+    if not samples:
+        return {"n": 0, "errors": errors}
+    ordered = sorted(samples)
+    return {
+        "n": len(samples),
+        "errors": errors,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(_percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(_percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(_percentile(ordered, 99) * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        "rps": round(len(samples) / wall_seconds, 2) if wall_seconds else None,
+    }
+
+
+async def _run_scenario(client, scenario, cookies, meta, *, iterations: int, warmup: int, concurrency: int, rng) -> dict:
+    samples: list[float] = []
+    errors = 0
+    first_error: Optional[str] = None
+
+    async def one(record: bool) -> None:
+        nonlocal errors, first_error
+        request = scenario.build(rng, meta)
+        request.setdefault("headers", {})["cookie"] = cookies[scenario.user]
+        started = time.perf_counter()
+        response = await client.request(**request)
+        await response.aread()
+        elapsed = time.perf_counter() - started
+        if response.status_code not in scenario.expect:
+            errors += 1
+            first_error = first_error or f"{response.status_code}: {response.text[:200]}"
+        elif record:
+            samples.append(elapsed)
+
+    for _ in range(warmup):
+        await one(False)
+
+    remaining = iterations
+    wall_started = time.perf_counter()
+    while remaining > 0:
+        batch = min(concurrency, remaining)
+        await asyncio.gather(*(one(True) for _ in range(batch)))
+        remaining -= batch
+    result = summarize(samples, errors, time.perf_counter() - wall_started)
+    if first_error:
+        result["first_error"] = first_error
+    return result
+
+
+async def run(
+    *,
+    patterns: Optional[list[str]],
+    iterations: int,
+    warmup: int,
+    concurrency: int,
+    seed_value: int,
+) -> dict:
+    import sqlalchemy
+
+    from app.db import engine
+
+    from .scenarios import prepare_meta, select_scenarios
+
+    seed_meta = load_seed_meta()
+
+    scenarios = select_scenarios(patterns)
+    if not scenarios:
+        raise SystemExit("no scenarios matched")
+    # uploads change the library, so they run after every read scenario
+    scenarios.sort(key=lambda scenario: scenario.mutating)
+
+    cookies = {user: cookie_header(user) for user in {scenario.user for scenario in scenarios} | {"bench-viewer"}}
+    rng = random.Random(seed_value)
+    results: dict[str, dict] = {}
+
+    async with asgi_client() as client:
+        meta = await prepare_meta(client, cookies, dict(seed_meta))
+        for scenario in scenarios:
+            results[scenario.name] = await _run_scenario(
+                client,
+                scenario,
+                cookies,
+                meta,
+                iterations=iterations,
+                warmup=warmup,
+                concurrency=concurrency,
+                rng=rng,
+            )
+            print(f"{scenario.name:32s} {json.dumps(results[scenario.name])}")
+
+    return {
+        "meta": {
+            "git_commit": _git("rev-parse", "HEAD"),
+            "git_dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "db_backend": engine.dialect.name,
+            "iterations": iterations,
+            "warmup": warmup,
+            "concurrency": concurrency,
+            "seed": seed_meta,
+        },
+        "scenarios": results,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Run timed API scenarios against a seeded library")
+    parser.add_argument("--db-url", default=None)
+    parser.add_argument("--media-root", default=None)
+    parser.add_argument("--scenarios", nargs="*", help="scenario names, name prefixes or tags")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="results file (default: bench-results/<commit>.json)")
+    args = parser.parse_args(argv)
+
+    configure(args.db_url, args.media_root)
+    report = asyncio.run(
+        run(
+            patterns=args.scenarios,
+            iterations=args.iterations,
+            warmup=args.warmup,
+            concurrency=args.concurrency,
+            seed_value=args.seed,
+        )
+    )
+    output = Path(args.output or f"bench-results/{(report['meta']['git_commit'] or 'unknown')[:12]}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import os
+import random
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+import httpx
+
+RequestFactory = Callable[[random.Random, dict], dict[str, Any]]
+
+
+@dataclass(slots=True)
+class Scenario:
+    name: str
+    user: str
+    build: RequestFactory
+    mutating: bool = False
+    expect: tuple[int, ...] = (200,)
+    tags: list[str] = field(default_factory=list)
+
+
+def _get(path: str, **params) -> dict[str, Any]:
+    return {"method": "GET", "url": path, "params": {key: value for key, value in params.items() if value is not None}}
+
+
+def _random_media_id(rng: random.Random, meta: dict) -> int:
+    return rng.randint(1, meta["scale"])
+
+
+def _range_request(rng: random.Random, meta: dict, *, offset: str) -> dict[str, Any]:
+    size = meta["video_kb"] * 1024
+    chunk = 512 * 1024
+    start = 0 if offset == "head" else rng.randrange(0, max(1, size - chunk))
+    request = _get(f"/media/{meta['video_media_id']}/file")
+    request["headers"] = {"range": f"bytes={start}-{min(size - 1, start + chunk - 1)}"}
+    return request
+
+
+def _upload(rng: random.Random, meta: dict) -> dict[str, Any]:
+    payload = os.urandom(meta["image_kb"] * 1024)
+    return {
+        "method": "POST",
+        "url": "/media/upload",
+        "files": {"file": (f"upload-{rng.getrandbits(48):x}.jpg", payload, "image/jpeg")},
+        "data": {"album_id": str(meta["upload_album_id"])} if meta.get("upload_album_id") else {},
+    }
+
+
+def _social_next_page(rng: random.Random, meta: dict) -> dict[str, Any]:
+    return _get("/social/posts", limit=20, cursor=meta.get("social_cursor"))
+
+
+SCENARIOS: list[Scenario] = [
+    Scenario("list_media.page1", "bench-viewer", lambda rng, meta: _get("/media", page=1, size=24), tags=["list_media"]),
+    Scenario(
+        "list_media.deep_page",
+        "bench-viewer",
+        lambda rng, meta: _get("/media", page=max(1, meta["scale"] // 24 // 2), size=24),
+        tags=["list_media"],
+    ),
+    Scenario(
+        "list_media.album",
+        "bench-viewer",
+        lambda rng, meta: _get("/media", album_id=rng.randint(1, meta["albums"]), size=24),
+        tags=["list_media"],
+    ),
+    Scenario("list_media.type_video", "bench-viewer", lambda rng, meta: _get("/media", type="video", size=24), tags=["list_media"]),
+    Scenario("list_media.search", "bench-viewer", lambda rng, meta: _get("/media", q=f"photo {rng.randint(1, 999)}", size=24), tags=["list_media"]),
+    Scenario("list_media.sort_taken_at", "bench-viewer", lambda rng, meta: _get("/media", sort="taken_at", size=24), tags=["list_media"]),
+    Scenario("list_media.developer", "bench-developer", lambda rng, meta: _get("/media", page=1, size=100), tags=["list_media"]),
+    Scenario("get_media", "bench-developer", lambda rng, meta: _get(f"/media/{_random_media_id(rng, meta)}"), tags=["media"]),
+    Scenario("list_albums.viewer", "bench-viewer", lambda rng, meta: _get("/albums"), tags=["list_albums"]),
+    Scenario("list_albums.developer", "bench-developer", lambda rng, meta: _get("/albums"), tags=["list_albums"]),
+    Scenario("home", "bench-viewer", lambda rng, meta: _get("/home"), tags=["home"]),
+    Scenario("home_sections", "bench-viewer", lambda rng, meta: _get("/home-sections"), tags=["home"]),
+    Scenario(
+        "serve_file.full_image",
+        "bench-developer",
+        lambda rng, meta: _get(f"/media/{meta['image_media_id']}/file"),
+        tags=["serve_file"],
+    ),
+    Scenario(
+        "serve_file.range_head",
+        "bench-developer",
+        lambda rng, meta: _range_request(rng, meta, offset="head"),
+        expect=(206,),
+        tags=["serve_file"],
+    ),
+    Scenario(
+        "serve_file.range_seek",
+        "bench-developer",
+        lambda rng, meta: _range_request(rng, meta, offset="seek"),
+        expect=(206,),
+        tags=["serve_file"],
+    ),
+    Scenario(
+        "serve_file.preview",
+        "bench-developer",
+        lambda rng, meta: _get(f"/media/{meta['video_media_id']}/preview"),
+        tags=["serve_file"],
+    ),
+    Scenario("social.first_page", "bench-viewer", lambda rng, meta: _get("/social/posts", limit=20), tags=["social"]),
+    Scenario("social.next_page", "bench-viewer", _social_next_page, tags=["social"]),
+    Scenario("upload.small_image", "bench-manager", _upload, mutating=True, tags=["upload"]),
+]
+
+
+def select_scenarios(patterns: Optional[list[str]]) -> list[Scenario]:
+    if not patterns:
+        return list(SCENARIOS)
+    chosen = []
+    for scenario in SCENARIOS:
+        if any(scenario.name.startswith(pattern) or pattern in scenario.tags for pattern in patterns):
+            chosen.append(scenario)
+    return chosen
+
+
+async def prepare_meta(client: httpx.AsyncClient, cookies: dict[str, str], meta: dict) -> dict:
+    # resolve ids the file-serving and pagination scenarios depend on
+    from sqlalchemy import select
+
+    from app.db import SessionLocal
+    from app.models import Album, Media, User
+
+    with SessionLocal() as session:
+        meta["upload_album_id"] = session.execute(
+            select(Album.id).join(User, User.id == Album.owner_id).where(User.username == "bench-manager").limit(1)
+        ).scalar_one_or_none()
+        meta["image_media_id"] = session.execute(select(Media.id).where(Media.type == "image").limit(1)).scalar_one()
+        meta["video_media_id"] = session.execute(select(Media.id).where(Media.type == "video").limit(1)).scalar_one()
+    response = await client.get("/social/posts", params={"limit": 20}, headers={"cookie": cookies["bench-viewer"]})
+    meta["social_cursor"] = response.json()["data"]["next_cursor"]
+    return meta
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from .harness import configure
+
+BATCH_SIZE = 5000
+META_FILENAME = "bench-seed.json"
+
+BENCH_USERS = [
+    ("bench-developer", "developer"),
+    ("bench-manager", "manager"),
+    ("bench-viewer", "viewer"),
+]
+SECTION_KEYS = [("photos", "照片", 2), ("broadcast", "广播", 1), ("live", "生放送", 1), ("xspace", "Xspace", 1)]
+
+
+def _batched(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _write_file_pool(media_root: Path, rng: random.Random, *, images: int, videos: int, image_kb: int, video_kb: int):
+    pool_dir = media_root / "bench"
+    pool_dir.mkdir(parents=True, exist_ok=True)
+    image_paths, video_paths, preview_paths = [], [], []
+    for index in range(images):
+        rel = Path("bench") / f"image-{index:05d}.jpg"
+        (media_root / rel).write_bytes(rng.randbytes(image_kb * 1024))
+        image_paths.append(rel.as_posix())
+    for index in range(videos):
+        rel = Path("bench") / f"video-{index:05d}.mp4"
+        (media_root / rel).write_bytes(rng.randbytes(video_kb * 1024))
+        video_paths.append(rel.as_posix())
+        preview = Path("previews") / "bench" / f"video-{index:05d}.jpg"
+        (media_root / preview).parent.mkdir(parents=True, exist_ok=True)
+        (media_root / preview).write_bytes(rng.randbytes(8 * 1024))
+        preview_paths.append(preview.as_posix())
+    return image_paths, video_paths, preview_paths
+
+
+def seed(
+    *,
+    scale: int,
+    seed_value: int,
+    file_pool: int,
+    image_kb: int,
+    video_kb: int,
+    reset: bool,
+) -> dict:
+    from sqlalchemy import func, insert, select
+
+    from app.db import Base, SessionLocal, engine
+    from app.models import (
+        Album,
+        HomeSection,
+        HomeSectionAlbum,
+        Media,
+        MediaTag,
+        SocialMedia,
+        SocialPost,
+        SocialReply,
+        Tag,
+        User,
+    )
+    from app.config import settings
+    from app.passwords import bcrypt_hash
+
+    rng = random.Random(seed_value)
+    media_root = Path(settings.MEDIA_ROOT)
+
+    if reset:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    with SessionLocal() as session:
+        if session.execute(select(func.count(Media.id))).scalar_one():
+            raise SystemExit("bench database already contains media; rerun with --reset")
+
+    video_files = max(1, file_pool // 8)
+    image_paths, video_paths, preview_paths = _write_file_pool(
+        media_root,
+        rng,
+        images=max(1, file_pool - video_files),
+        videos=video_files,
+        image_kb=image_kb,
+        video_kb=video_kb,
+    )
+
+    extra_managers = max(1, scale // 10_000)
+    album_count = max(5, scale // 100)
+    tag_count = min(500, max(20, scale // 1000))
+    post_count = max(10, scale // 20)
+    base_time = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    span_seconds = int(timedelta(days=730).total_seconds())
+    password_hash = bcrypt_hash("bench-password", settings.BCRYPT_ROUNDS)
+
+    with engine.begin() as connection:
+        users = [
+            {"id": index + 1, "username": name, "email": f"{name}@bench.local", "password_hash": password_hash, "role": role}
+            for index, (name, role) in enumerate(BENCH_USERS)
+        ]
+        users += [
+            {
+                "id": len(BENCH_USERS) + index + 1,
+                "username": f"bench-owner-{index}",
+                "email": f"bench-owner-{index}@bench.local",
+                "password_hash": password_hash,
+                "role": "manager",
+            }
+            for index in range(extra_managers)
+        ]
+        connection.execute(insert(User), users)
+        owner_ids = [user["id"] for user in users if user["role"] != "viewer"]
+
+        albums = [
+            {
+                "id": index + 1,
+                "owner_id": rng.choice(owner_ids),
+                "title": f"Bench album {index}",
+                "visibility": rng.choices(["public", "unlisted", "private"], weights=[6, 2, 2])[0],
+                "created_at": base_time + timedelta(seconds=rng.randrange(span_seconds)),
+            }
+            for index in range(album_count)
+        ]
+        connection.execute(insert(Album), albums)
+
+        def media_rows():
+            for index in range(scale):
+                is_video = rng.random() < 0.15
+                created = base_time + timedelta(seconds=rng.randrange(span_seconds))
+                yield {
+                    "id": index + 1,
+                    "owner_id": rng.choice(owner_ids),
+                    "album_id": rng.randint(1, album_count) if rng.random() < 0.9 else None,
+                    "type": "video" if is_video else "image",
+                    "filename": f"{index:07d}.{'mp4' if is_video else 'jpg'}",
+                    "title": f"bench {'clip' if is_video else 'photo'} {index}",
+                    "mime_type": "video/mp4" if is_video else "image/jpeg",
+                    "bytes": (video_kb if is_video else image_kb) * 1024,
+                    "sha256": hashlib.sha256(f"bench-{seed_value}-{index}".encode()).hexdigest(),
+                    "taken_at": created - timedelta(hours=rng.randrange(72)) if rng.random() < 0.7 else None,
+                    "storage_path": rng.choice(video_paths if is_video else image_paths),
+                    "preview_path": rng.choice(preview_paths) if is_video else None,
+                    "created_at": created,
+                }
+
+        for batch in _batched(media_rows()):
+            connection.execute(insert(Media), batch)
+
+        connection.execute(insert(Tag), [{"id": index + 1, "name": f"bench-tag-{index}"} for index in range(tag_count)])
+
+        def media_tag_rows():
+            for media_id in range(1, scale + 1):
+                for tag_id in rng.sample(range(1, tag_count + 1), rng.randint(0, 3)):
+                    yield {"media_id": media_id, "tag_id": tag_id}
+
+        for batch in _batched(media_tag_rows()):
+            connection.execute(insert(MediaTag), batch)
+
+        def post_rows():
+            for index in range(post_count):
+                yield {
+                    "id": index + 1,
+                    "platform": rng.choice(["x", "instagram"]),
+                    "external_id": f"bench-{index}",
+                    "author_name": "鈴原希実",
+                    "author_handle": "NozomiSuzuhara",
+                    "content": f"bench post {index} " + "♪" * rng.randint(10, 200),
+                    "created_at": base_time + timedelta(seconds=rng.randrange(span_seconds)),
+                    "like_count": rng.randint(0, 50_000),
+                    "repost_count": rng.randint(0, 2_000),
+                    "reply_count": rng.randint(0, 300),
+                    "is_pinned": index < 2,
+                }
+
+        for batch in _batched(post_rows()):
+            connection.execute(insert(SocialPost), batch)
+
+        def social_media_rows():
+            for post_id in range(1, post_count + 1):
+                for order in range(rng.randint(0, 4)):
+                    yield {
+                        "post_id": post_id,
+                        "media_type": "image",
+                        "url": f"https://example.invalid/{post_id}/{order}.jpg",
+                        "preview_url": f"https://example.invalid/{post_id}/{order}-small.jpg",
+                        "order_index": order,
+                    }
+
+        for batch in _batched(social_media_rows()):
+            connection.execute(insert(SocialMedia), batch)
+
+        def reply_rows():
+            for post_id in range(1, post_count + 1):
+                for order in range(rng.randint(0, 5)):
+                    yield {
+                        "post_id": post_id,
+                        "author_name": f"fan {order}",
+                        "author_handle": f"fan_{order}",
+                        "content": "reply " * rng.randint(1, 20),
+                        "created_at": base_time + timedelta(seconds=rng.randrange(span_seconds)),
+                        "like_count": rng.randint(0, 500),
+                    }
+
+        for batch in _batched(reply_rows()):
+            connection.execute(insert(SocialReply), batch)
+
+        connection.execute(
+            insert(HomeSection),
+            [
+                {"id": index + 1, "key": key, "title": title, "preview_rows": rows, "order_index": index}
+                for index, (key, title, rows) in enumerate(SECTION_KEYS)
+            ],
+        )
+        section_albums = []
+        for section_id in range(1, len(SECTION_KEYS) + 1):
+            for order, album_id in enumerate(rng.sample(range(1, album_count + 1), min(album_count, 3))):
+                section_albums.append({"section_id": section_id, "album_id": album_id, "order_index": order})
+        connection.execute(insert(HomeSectionAlbum), section_albums)
+
+    meta = {
+        "scale": scale,
+        "seed": seed_value,
+        "file_pool": file_pool,
+        "image_kb": image_kb,
+        "video_kb": video_kb,
+        "users": len(users),
+        "albums": album_count,
+        "tags": tag_count,
+        "posts": post_count,
+        "seeded_at": datetime.now(timezone.utc).isoformat(),
+    }
+    (media_root / META_FILENAME).write_text(json.dumps(meta, indent=2))
+    return meta
+
+
+def load_seed_meta() -> dict:
+    from app.config import settings
+    from app.passwords import bcrypt_hash
+
+    meta_path = Path(settings.MEDIA_ROOT) / META_FILENAME
+    if not meta_path.exists():
+        raise SystemExit(f"{meta_path} not found; run `python -m bench.seed` first")
+    return json.loads(meta_path.read_text())
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic media library for benchmarks")
+    parser.add_argument("--scale", type=int, default=10_000, help="number of media rows (10k to 1M)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--file-pool", type=int, default=200, help="distinct on-disk files shared by media rows")
+    parser.add_argument("--image-kb", type=int, default=64)
+    parser.add_argument("--video-kb", type=int, default=4096)
+    parser.add_argument("--db-url", default=None)
+    parser.add_argument("--media-root", default=None)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    args = parser.parse_args(argv)
+
+    configure(args.db_url, args.media_root)
+    meta = seed(
+        scale=args.scale,
+        seed_value=args.seed,
+        file_pool=args.file_pool,
+        image_kb=args.image_kb,
+        video_kb=args.video_kb,
+        reset=args.reset,
+    )
+    print(json.dumps(meta, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import multiprocessing
+import os
+
+# production entry point: gunicorn -c gunicorn.conf.py app.main:app
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+timeout = 120
+keepalive = 5
+forwarded_allow_ips = "*"
+accesslog = "-"
+
+
+def on_starting(server):
+    # migrate once in the master so forked workers only check the schema version
+    from app.db import engine
+    from app.migrations.runner import migrate
+
+    for item in migrate(engine):
+        server.log.info("applied migration %s %s", item.version, item.name)
+    engine.dispose()
+
+
+def post_fork(server, worker):
+    # connections opened before the fork must never be shared between workers
+    from app.db import async_engine, engine
+    from app.db_replicas import replicas
+
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    for replica in replicas.replicas:
+        replica.engine.sync_engine.dispose(close=False)
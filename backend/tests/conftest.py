@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+
+# settings are read when `app` is first imported, so the environment has to be
+# in place before any test module imports it
+_data = Path(tempfile.mkdtemp(prefix="suzuhara-tests-"))
+os.environ.setdefault("DB_URL", f"sqlite:///{_data / 'primary.db'}")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("MEDIA_ROOT", str(_data / "media"))
+os.environ.setdefault("JOBS_ENABLED", "false")
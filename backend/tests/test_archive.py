@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import io
+import struct
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+from app.config import settings
+from app.media.archive import ZIP_EPOCH, ArchiveEntry, archive_entries, stream_zip
+from app.models import Media
+
+
+def _entry(tmp_path: Path, name: str, data: bytes) -> ArchiveEntry:
+    path = tmp_path / name
+    path.write_bytes(data)
+    return ArchiveEntry(name, path, len(data), (2024, 5, 6, 7, 8, 10))
+
+
+def test_stream_zip_is_a_readable_stored_archive(tmp_path):
+    data = {"a.jpg": b"\xff\xd8" + bytes(range(256)) * 4000, "b.mp4": b"movie" * 10, "empty.txt": b""}
+    entries = [_entry(tmp_path, name, content) for name, content in data.items()]
+
+    chunks = list(stream_zip(entries))
+
+    assert len(chunks) > 1
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == list(data)
+        for name, content in data.items():
+            info = archive.getinfo(name)
+            assert info.compress_type == zipfile.ZIP_STORED
+            assert info.date_time == (2024, 5, 6, 7, 8, 10)
+            assert archive.read(name) == content
+
+
+def test_stream_zip_writes_zip64_records_for_large_members(tmp_path, monkeypatch):
+    # members at or over the 4 GiB limit need zip64 sizes; lowering the limit
+    # exercises the same path without writing gigabytes
+    monkeypatch.setattr(zipfile, "ZIP64_LIMIT", 1024)
+    data = {"big.mov": bytes(range(256)) * 64, "small.jpg": b"tiny"}
+    entries = [_entry(tmp_path, name, content) for name, content in data.items()]
+
+    payload = b"".join(stream_zip(entries))
+
+    # the first local header carries a zip64 extra field (tag 0x0001)
+    name_length, extra_length = struct.unpack("<HH", payload[26:30])
+    assert payload[30 + name_length : 32 + name_length] == b"\x01\x00" and extra_length >= 20
+    assert b"PK\x06\x06" in payload  # zip64 end of central directory
+    with zipfile.ZipFile(io.BytesIO(payload)) as archive:
+        assert archive.testzip() is None
+        assert {name: archive.read(name) for name in archive.namelist()} == data
+
+
+def test_stream_zip_skips_files_removed_before_streaming(tmp_path):
+    entries = [_entry(tmp_path, "kept.jpg", b"kept"), _entry(tmp_path, "gone.jpg", b"gone")]
+    entries[1].path.unlink()
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(stream_zip(entries)))) as archive:
+        assert archive.namelist() == ["kept.jpg"]
+
+
+def test_archive_entries_dedupe_names_and_skip_missing_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MEDIA_ROOT", str(tmp_path))
+    for name in ("1.jpg", "2.jpg", "3.jpg"):
+        (tmp_path / name).write_bytes(name.encode())
+    media = [
+        Media(filename="IMG.jpg", storage_path="1.jpg", taken_at=datetime(2023, 1, 2, 3, 4, 5)),
+        Media(filename="dir\\img.jpg", storage_path="2.jpg", created_at=datetime(1970, 1, 1)),
+        Media(filename="missing.jpg", storage_path="missing.jpg"),
+        Media(filename="img.jpg", storage_path="3.jpg"),
+    ]
+
+    entries = archive_entries(media)
+
+    assert [entry.name for entry in entries] == ["IMG.jpg", "img (2).jpg", "img (3).jpg"]
+    assert [entry.size for entry in entries] == [5, 5, 5]
+    assert entries[0].date_time == (2023, 1, 2, 3, 4, 5)
+    assert entries[1].date_time == ZIP_EPOCH
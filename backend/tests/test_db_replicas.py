@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, select, update
+from starlette.requests import Request
+
+from app import db_replicas
+from app.db import async_engine, engine
+from app.db_replicas import READ_PRIMARY_COOKIE, ReadSessionLocal, ReplicaSet, get_read_session
+from app.models import Tag
+
+
+def _seed(url: str, marker: str) -> None:
+    seed_engine = create_engine(url)
+    Tag.__table__.drop(seed_engine, checkfirst=True)
+    Tag.__table__.create(seed_engine)
+    with seed_engine.begin() as connection:
+        connection.execute(Tag.__table__.insert().values(name=marker))
+    seed_engine.dispose()
+
+
+@pytest.fixture
+def replica_urls(tmp_path: Path) -> list[str]:
+    # every database holds one tag naming itself, so a read shows where it went
+    _seed(str(engine.url), "primary")
+    urls = [f"sqlite:///{tmp_path / f'replica-{index}.db'}" for index in range(2)]
+    for index, url in enumerate(urls):
+        _seed(url, f"replica-{index}")
+    return urls
+
+
+def _request(cookies: str = "") -> Request:
+    headers = [(b"cookie", cookies.encode())] if cookies else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "query_string": b""})
+
+
+async def _markers(session) -> list[str]:
+    return list((await session.execute(select(Tag.name).order_by(Tag.id))).scalars())
+
+
+async def _read_via_dependency(replica_set: ReplicaSet, request: Request, monkeypatch) -> list[str]:
+    monkeypatch.setattr(db_replicas, "replicas", replica_set)
+    dependency = get_read_session(request)
+    session = await dependency.__anext__()
+    try:
+        return await _markers(session)
+    finally:
+        await dependency.aclose()
+        await replica_set.stop()
+        await async_engine.dispose()
+
+
+def test_replicas_are_picked_round_robin(replica_urls):
+    replica_set = ReplicaSet(replica_urls)
+    assert [replica_set.pick().name for _ in range(4)] == ["replica-0", "replica-1", "replica-0", "replica-1"]
+
+    replica_set.replicas[0].mark_down()
+    assert {replica_set.pick().name for _ in range(3)} == {"replica-1"}
+
+    replica_set.replicas[1].mark_down()
+    assert replica_set.pick() is None
+    asyncio.run(replica_set.stop())
+
+
+def test_reads_go_to_the_replica_and_writes_to_the_primary(replica_urls):
+    replica_set = ReplicaSet(replica_urls)
+
+    async def scenario() -> None:
+        async with ReadSessionLocal(info={"replica": replica_set.replicas[0]}) as session:
+            assert await _markers(session) == ["replica-0"]
+            # the ORM flush and a DML statement both bypass the replica
+            session.add(Tag(name="flushed"))
+            await session.flush()
+            await session.execute(update(Tag).where(Tag.name == "primary").values(name="updated"))
+            await session.commit()
+        await replica_set.stop()
+        await async_engine.dispose()
+
+    asyncio.run(scenario())
+    with engine.connect() as connection:
+        assert set(connection.execute(select(Tag.name)).scalars()) == {"updated", "flushed"}
+    replica_engine = create_engine(replica_urls[0])
+    with replica_engine.connect() as connection:
+        assert list(connection.execute(select(Tag.name)).scalars()) == ["replica-0"]
+    replica_engine.dispose()
+
+
+def test_reads_fall_back_to_the_primary_when_a_replica_cannot_connect(replica_urls, tmp_path, monkeypatch):
+    # sqlite cannot create a file in a directory that does not exist
+    replica_set = ReplicaSet([f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"])
+
+    markers = asyncio.run(_read_via_dependency(replica_set, _request(), monkeypatch))
+
+    assert markers == ["primary"]
+    assert not replica_set.replicas[0].healthy
+
+
+def test_read_primary_cookie_pins_reads_to_the_primary(replica_urls, monkeypatch):
+    replica_set = ReplicaSet(replica_urls)
+
+    markers = asyncio.run(_read_via_dependency(replica_set, _request(f"{READ_PRIMARY_COOKIE}=1"), monkeypatch))
+
+    assert markers == ["primary"]
+    assert replica_set.pick().name == "replica-0"  # the cookie never consumed a replica turn
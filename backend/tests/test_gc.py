@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import delete
+
+from app.config import settings
+from app.db import engine
+from app.media import gc
+from app.media.gc import PathSet, collect_garbage
+from app.models import Media
+
+DAY = 86400
+
+
+@pytest.fixture
+def media_root(tmp_path: Path, monkeypatch) -> Path:
+    monkeypatch.setattr(settings, "MEDIA_ROOT", str(tmp_path))
+    monkeypatch.setattr(settings, "GC_DELETE_PAUSE_SECONDS", 0)
+    Media.__table__.create(engine, checkfirst=True)
+    with engine.begin() as connection:
+        connection.execute(delete(Media))
+    return tmp_path
+
+
+def _file(root: Path, rel_path: str, age: int = 2 * DAY) -> Path:
+    path = root / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * 10)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def _media(**paths: str) -> None:
+    values = {
+        "owner_id": 1,
+        "type": "video",
+        "filename": "clip.mp4",
+        "mime_type": "video/mp4",
+        "bytes": 10,
+        "sha256": os.urandom(32).hex(),
+        "storage_path": "originals/clip.mp4",
+    }
+    with engine.begin() as connection:
+        connection.execute(Media.__table__.insert().values(**{**values, **paths}))
+
+
+def _later(monkeypatch, seconds: int) -> None:
+    # ctime cannot be set from Python, so the clock is moved forward instead
+    monkeypatch.setattr(gc, "time", SimpleNamespace(time=lambda: time.time() + seconds, sleep=time.sleep))
+
+
+def test_unreferenced_files_are_removed_and_referenced_ones_kept(media_root, monkeypatch):
+    _media(storage_path="originals/live.mp4", hls_path="hls/1-live/master.m3u8")
+    live = _file(media_root, "originals/live.mp4")
+    live_hls = _file(media_root, "hls/1-live/master.m3u8")
+    orphan = _file(media_root, "originals/orphan.jpg")
+    orphan_hls = _file(media_root, "hls/2-old/master.m3u8")
+    _file(media_root, "bench-seed.json")
+    _later(monkeypatch, 2 * DAY)
+
+    report = collect_garbage(dry_run=False, grace_seconds=DAY)
+
+    assert (report.orphans, report.deleted, report.errors) == (2, 2, 0)
+    assert live.exists() and live_hls.exists()
+    assert not orphan.exists() and not orphan_hls.parent.exists()
+    assert (media_root / "bench-seed.json").exists()
+
+
+def test_dry_run_reports_without_deleting(media_root, monkeypatch):
+    orphan = _file(media_root, "originals/orphan.jpg")
+    _later(monkeypatch, 2 * DAY)
+
+    report = collect_garbage(dry_run=True, grace_seconds=DAY)
+
+    assert (report.orphans, report.orphan_bytes, report.deleted) == (1, 10, 0)
+    assert report.sample == ["originals/orphan.jpg"]
+    assert orphan.exists()
+
+
+def test_grace_period_counts_ctime_as_well_as_mtime(media_root):
+    # an old mtime with a fresh ctime is what a hard link made by relayout or
+    # import --link looks like; the file must survive until the grace ends
+    linked = _file(media_root, "originals/linked.jpg", age=30 * DAY)
+
+    report = collect_garbage(dry_run=False, grace_seconds=DAY)
+
+    assert (report.orphans, report.skipped_recent, report.deleted) == (0, 1, 0)
+    assert linked.exists()
+
+
+def test_rows_committed_after_the_snapshot_still_protect_their_files(media_root, monkeypatch):
+    relaid = _file(media_root, "ab/cd/abcdef.mp4")
+    storyboard = _file(media_root, "storyboards/3-new/sheet-0.jpg")
+    orphan = _file(media_root, "originals/orphan.jpg")
+    _media(storage_path="ab/cd/abcdef.mp4", storyboard_path="storyboards/3-new/storyboard.vtt")
+    # the live set was loaded before these rows were committed
+    monkeypatch.setattr(gc, "load_live_paths", lambda: PathSet([]))
+    _later(monkeypatch, 2 * DAY)
+
+    report = collect_garbage(dry_run=False, grace_seconds=DAY)
+
+    assert (report.orphans, report.deleted) == (1, 1)
+    assert relaid.exists() and storyboard.exists()
+    assert not orphan.exists()
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from jose import jwt
+
+from app.config import settings
+from app.deps import ACCESS_TOKEN_COOKIE, ALGORITHM
+from app.limits import memory
+from app.limits.memory import MemoryLimiter
+from app.limits.middleware import LimiterMiddleware, LimitRule, limited
+
+
+class _Stream:
+    # a response that sends one chunk, then waits until the test lets it finish
+    def __init__(self) -> None:
+        self.first_chunk = asyncio.Event()
+        self.finish = asyncio.Event()
+
+    async def body(self):
+        yield b"first"
+        self.first_chunk.set()
+        await self.finish.wait()
+        yield b"last"
+
+
+def _middleware(rule: LimitRule) -> tuple[LimiterMiddleware, MemoryLimiter, list[_Stream]]:
+    app = FastAPI()
+    streams: list[_Stream] = []
+
+    @app.get("/stream/{media_id}")
+    @limited("stream")
+    async def stream(media_id: int):
+        streams.append(_Stream())
+        return StreamingResponse(streams[-1].body())
+
+    @app.get("/open")
+    async def open_route():
+        return {"ok": True}
+
+    backend = MemoryLimiter()
+    return LimiterMiddleware(app, backend, {"stream": rule}, app.router), backend, streams
+
+
+def _scope(path: str, ip: str = "10.0.0.1", user: str | None = None) -> dict:
+    headers = []
+    if user is not None:
+        token = jwt.encode({"sub": user}, settings.JWT_SECRET, algorithm=ALGORITHM)
+        headers.append((b"cookie", f"{ACCESS_TOKEN_COOKIE}={token}".encode()))
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": headers,
+        "client": (ip, 50000),
+        "server": ("testserver", 80),
+    }
+
+
+class _Call:
+    def __init__(self, middleware: LimiterMiddleware, scope: dict) -> None:
+        self.messages: list[dict] = []
+        self._requested = False
+        self._disconnect = asyncio.Event()
+        self.task = asyncio.ensure_future(middleware(scope, self._receive, self._send))
+
+    async def _receive(self) -> dict:
+        if not self._requested:
+            self._requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self._disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def _send(self, message: dict) -> None:
+        self.messages.append(message)
+
+    @property
+    def status(self) -> int:
+        return self.messages[0]["status"]
+
+    def header(self, name: bytes) -> bytes | None:
+        return dict(self.messages[0]["headers"]).get(name)
+
+    @property
+    def body(self) -> bytes:
+        return b"".join(message.get("body", b"") for message in self.messages[1:])
+
+
+async def _finished(middleware: LimiterMiddleware, scope: dict) -> _Call:
+    call = _Call(middleware, scope)
+    await call.task
+    return call
+
+
+async def _streaming(middleware: LimiterMiddleware, streams: list[_Stream], scope: dict) -> _Call:
+    call = _Call(middleware, scope)
+    await asyncio.sleep(0)
+    while not streams or not streams[-1].first_chunk.is_set():
+        await asyncio.sleep(0.001)
+    return call
+
+
+def test_per_user_limit_sheds_with_429_across_addresses():
+    async def scenario() -> None:
+        middleware, _, streams = _middleware(LimitRule("stream", 10, 1, 0, 0))
+        held = await _streaming(middleware, streams, _scope("/stream/1", ip="10.0.0.1", user="7"))
+
+        # the same account from another address shares the per-user slot
+        shed = await _finished(middleware, _scope("/stream/2", ip="10.0.0.2", user="7"))
+        assert shed.status == 429
+        assert shed.header(b"retry-after") == b"1"
+        assert b"TOO_MANY_REQUESTS" in shed.body
+
+        other = await _streaming(middleware, streams, _scope("/stream/3", ip="10.0.0.2", user="8"))
+        assert other.status == 200
+        for stream in streams:
+            stream.finish.set()
+        await asyncio.gather(held.task, other.task)
+
+    asyncio.run(scenario())
+
+
+def test_global_limit_sheds_with_503():
+    async def scenario() -> None:
+        middleware, backend, streams = _middleware(LimitRule("stream", 1, 5, 0, 0))
+        held = await _streaming(middleware, streams, _scope("/stream/1", ip="10.0.0.1"))
+
+        shed = await _finished(middleware, _scope("/stream/2", ip="10.0.0.2"))
+        assert shed.status == 503
+        assert shed.header(b"retry-after") == b"1"
+        # the per-user slot taken before the global check was handed back
+        assert "stream:ip:10.0.0.2" not in backend.in_use
+
+        # routes without a rule are never counted
+        assert (await _finished(middleware, _scope("/open", ip="10.0.0.2"))).status == 200
+        streams[0].finish.set()
+        await held.task
+
+    asyncio.run(scenario())
+
+
+def test_rate_limit_reports_retry_after_until_the_next_token():
+    async def scenario() -> None:
+        middleware, _, streams = _middleware(LimitRule("stream", 0, 0, 0.25, 1))
+        first = await _streaming(middleware, streams, _scope("/stream/1"))
+
+        # the only token is spent and the next one is about 4s away
+        shed = await _finished(middleware, _scope("/stream/1"))
+        assert shed.status == 429
+        assert shed.header(b"retry-after") == b"4"
+        streams[0].finish.set()
+        await first.task
+
+    asyncio.run(scenario())
+
+
+def test_slots_are_held_until_the_last_chunk_is_sent():
+    async def scenario() -> None:
+        middleware, backend, streams = _middleware(LimitRule("stream", 1, 1, 0, 0))
+        call = await _streaming(middleware, streams, _scope("/stream/1"))
+
+        # the endpoint has returned and the first chunk is out, but the body
+        # is still streaming, so both slots stay taken
+        assert call.status == 200
+        assert backend.in_use == {"stream:ip:10.0.0.1": 1, "stream:*": 1}
+        assert (await _finished(middleware, _scope("/stream/2", ip="10.0.0.2"))).status == 503
+
+        streams[0].finish.set()
+        await call.task
+        assert call.body == b"firstlast"
+        assert backend.in_use == {}
+        assert (await _finished(middleware, _scope("/open"))).status == 200
+        follow_up = await _streaming(middleware, streams, _scope("/stream/2", ip="10.0.0.2"))
+        assert follow_up.status == 200
+        streams[-1].finish.set()
+        await follow_up.task
+
+    asyncio.run(scenario())
+
+
+def test_full_buckets_are_swept(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(memory, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    backend = MemoryLimiter()
+
+    async def scenario() -> None:
+        assert await backend.take("stream:ip:a", 1.0, 2) == 0
+        assert await backend.take("stream:ip:b", 1.0, 2) == 0
+        assert await backend.take("stream:ip:b", 1.0, 2) == 0
+        assert await backend.take("stream:ip:b", 1.0, 2) == 1.0
+
+        # a refills after 1s and b after 2s; the sweep only drops full buckets
+        now[0] += memory.SWEEP_SECONDS
+        await backend.take("stream:ip:c", 1.0, 2)
+        assert set(backend.buckets) == {"stream:ip:c"}
+
+    asyncio.run(scenario())
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from app.media import probe
+from app.media.probe import VideoProbe, parse_probe
+
+
+def test_parse_probe_reads_video_and_audio_streams():
+    report = {
+        "streams": [
+            {"codec_type": "video", "codec_name": "h264", "width": 1920, "height": 1080},
+            {"codec_type": "audio", "codec_name": "aac"},
+        ],
+        "format": {"duration": "61.6", "bit_rate": "4500000"},
+    }
+
+    assert parse_probe(report) == VideoProbe(62, 1920, 1080, "h264", "aac", 4500000)
+
+
+@pytest.mark.parametrize(
+    "stream",
+    [
+        {"tags": {"rotate": "90"}},
+        {"tags": {"rotate": "-270"}},
+        {"side_data_list": [{"side_data_type": "Display Matrix", "rotation": -90}]},
+    ],
+)
+def test_parse_probe_swaps_dimensions_for_portrait_rotation(stream):
+    report = {"streams": [{"codec_type": "video", "codec_name": "hevc", "width": 1920, "height": 1080, **stream}]}
+
+    result = parse_probe(report)
+
+    assert (result.width, result.height) == (1080, 1920)
+
+
+def test_parse_probe_keeps_dimensions_for_upside_down_video():
+    report = {"streams": [{"codec_type": "video", "width": 640, "height": 480, "tags": {"rotate": "180"}}]}
+
+    assert (parse_probe(report).width, parse_probe(report).height) == (640, 480)
+
+
+def test_parse_probe_ignores_cover_art_and_falls_back_to_stream_duration():
+    report = {
+        "streams": [
+            {"codec_type": "video", "codec_name": "mjpeg", "width": 600, "height": 600, "disposition": {"attached_pic": 1}},
+            {"codec_type": "audio", "codec_name": "mp3", "duration": "200.2"},
+        ],
+        "format": {"duration": "N/A"},
+    }
+
+    assert parse_probe(report) == VideoProbe(None, None, None, None, "mp3", None)
+
+
+def test_parse_probe_tolerates_missing_and_malformed_fields():
+    report = {
+        "streams": [{"codec_type": "video", "width": "wide", "duration": "12.4"}],
+        "format": {"bit_rate": None},
+    }
+
+    assert parse_probe(report) == VideoProbe(12, None, None, None, None, None)
+    assert parse_probe({}) == VideoProbe(None, None, None, None, None, None)
+
+
+def test_probe_video_reports_a_hung_ffprobe_as_a_timeout(monkeypatch):
+    def hang(command, **kwargs):
+        raise subprocess.TimeoutExpired(command, kwargs["timeout"])
+
+    monkeypatch.setattr(probe.subprocess, "run", hang)
+
+    with pytest.raises(RuntimeError, match="^FFPROBE_TIMEOUT$"):
+        probe.probe_video(Path("clip.mp4"))
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import random
+
+from app.media.similar import HASH_BITS, MAX_DISTANCE, SimilarityIndex, to_signed, to_unsigned
+
+
+def _index(hashes: dict[int, int]) -> SimilarityIndex:
+    index = SimilarityIndex()
+    for media_id, value in hashes.items():
+        index._add(media_id, value)
+    return index
+
+
+def _flip(value: int, bits: list[int]) -> int:
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+
+def _library(seed: int = 7) -> dict[int, int]:
+    # random hashes plus near copies of a few of them at every distance up to
+    # just past the search limit
+    rng = random.Random(seed)
+    hashes = {media_id: rng.getrandbits(HASH_BITS) for media_id in range(1, 501)}
+    next_id = 1000
+    for base in (1, 2, 3):
+        for distance in range(MAX_DISTANCE + 2):
+            hashes[next_id] = _flip(hashes[base], rng.sample(range(HASH_BITS), distance))
+            next_id += 1
+    return hashes
+
+
+def test_search_matches_a_brute_force_scan():
+    hashes = _library()
+    index = _index(hashes)
+
+    for query in (hashes[1], hashes[2], hashes[250], _flip(hashes[3], [0, 17, 33, 63])):
+        for distance in (0, 3, 8, MAX_DISTANCE):
+            expected = sorted(
+                ((media_id, (value ^ query).bit_count()) for media_id, value in hashes.items()
+                 if (value ^ query).bit_count() <= distance),
+                key=lambda item: (item[1], item[0]),
+            )
+            assert index.search(query, distance) == expected
+
+
+def test_clusters_group_near_duplicates_and_follow_changes():
+    base = 0x0123_4567_89AB_CDEF
+    index = _index({1: base, 2: _flip(base, [1, 2]), 3: _flip(base, [40]), 4: ~base & ((1 << HASH_BITS) - 1), 5: 99})
+    index._add(6, _flip(99, [5]))
+
+    clusters = index.clusters(4)
+    assert clusters == [[1, 2, 3], [5, 6]]
+    # unchanged index: the same computed result is handed back
+    assert index.clusters(4) is clusters
+    assert index.clusters(1) == [[1, 3], [5, 6]]
+
+    index.discard([3])
+    assert index.clusters(4) == [[1, 2], [5, 6]]
+    index._add(2, 12345)
+    assert index.clusters(4) == [[5, 6]]
+
+
+def test_signed_round_trip_fits_a_bigint_column():
+    for value in (0, 1, (1 << 63) - 1, 1 << 63, (1 << 64) - 1):
+        signed = to_signed(value)
+        assert -(1 << 63) <= signed < 1 << 63
+        assert to_unsigned(signed) == value
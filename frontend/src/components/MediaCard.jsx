@@ -21,7 +21,9 @@ export default function MediaCard({ item, linkState }) {
   const cacheBuster = item.updated_at || item.created_at || item.taken_at || `${item.id}`;
   const previewUrl = item.preview_path
     ? `${api.defaults.baseURL}/media/${item.id}/preview?t=${encodeURIComponent(cacheBuster)}`
-    : `${api.defaults.baseURL}/media/${item.id}/file?t=${encodeURIComponent(cacheBuster)}`;
+    : item.content_hash
+      ? `${api.defaults.baseURL}/media/${item.id}/file?v=${item.content_hash}`
+      : `${api.defaults.baseURL}/media/${item.id}/file?t=${encodeURIComponent(cacheBuster)}`;
 
   const rawTitle = item.title || item.filename || "未命名";
   const title = stripExtension(rawTitle);
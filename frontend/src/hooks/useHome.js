@@ -0,0 +1,11 @@
+import { useQuery } from "@tanstack/react-query";
+import api from "../api";
+
+export function useHome(type = "all") {
+  return useQuery({
+    // nested under "home-sections" so section/album mutations refresh it too
+    queryKey: ["home-sections", "home", type],
+    queryFn: () => api.get("/home", { params: type === "all" ? {} : { type } }),
+    staleTime: 60_000,
+  });
+}
@@ -1,5 +1,6 @@
 import React, { useEffect } from "react";
 import { useNavigate, useParams, useSearchParams } from "react-router-dom";
+import api from "../api";
 import MediaCard from "../components/MediaCard";
 import { useAlbums } from "../hooks/useAlbums";
 import { useMediaList } from "../hooks/useMediaList";
@@ -73,6 +74,11 @@ export default function AlbumDetail() {
         <h2 style={{ fontSize: 24, fontWeight: 700, marginBottom: 4 }}>
           {album ? album.title : "相册详情"}
         </h2>
+        {total > 0 && (
+          <a href={`${api.defaults.baseURL}/albums/${id}/archive`} className="button-secondary" download>
+            下载整个相册（ZIP）
+          </a>
+        )}
       </header>
       {showInitialLoading && <div>加载相册内容…</div>}
       {isError && <div style={{ color: "#dc2626" }}>{error?.message || "加载失败"}</div>}
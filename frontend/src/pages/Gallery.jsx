@@ -1,27 +1,17 @@
-import React, { useMemo } from "react";
+import React from "react";
 import { Link, useSearchParams } from "react-router-dom";
 import MediaCard from "../components/MediaCard";
-import { useCategoryMedia } from "../hooks/useCategoryMedia";
-import { useHomeSections } from "../hooks/useHomeSections";
+import { useHome } from "../hooks/useHome";
 
-function CategoryPreviewSection({ section, albumIds, type, isConfigLoading }) {
+function CategoryPreviewSection({ section, type }) {
   const rows = Math.max(1, section.preview_rows || 1);
-  const { data, isLoading, isError, error } = useCategoryMedia({
-    albumIds,
-    page: 1,
-    size: rows * 4,
-    type,
-  });
-
-  const items = data?.items ?? [];
-  const total = data?.total ?? 0;
+  const albumIds = section.album_ids ?? [];
+  const items = section.media?.items ?? [];
+  const total = section.media?.total ?? 0;
   const shouldShowMore = total > rows * 4;
   const search = type === "all" ? "" : `?type=${type}`;
 
   const renderBody = () => {
-    if (isConfigLoading && albumIds.length === 0) {
-      return <div>正在加载分类信息…</div>;
-    }
     if (albumIds.length === 0) {
       return (
         <div style={{ color: "rgba(50,44,84,0.6)" }}>
@@ -29,12 +19,6 @@ function CategoryPreviewSection({ section, albumIds, type, isConfigLoading }) {
         </div>
       );
     }
-    if (isLoading) {
-      return <div>加载 {section.title} …</div>;
-    }
-    if (isError) {
-      return <div style={{ color: "#dc2626" }}>{error?.message || "加载失败"}</div>;
-    }
     if (items.length === 0) {
       return <div style={{ color: "rgba(50,44,84,0.6)" }}>该分类暂无内容，稍后再来看看吧。</div>;
     }
@@ -70,35 +54,21 @@ export default function Gallery() {
   const [params] = useSearchParams();
   const type = params.get("type") || "all";
 
-  const { data: sections, isLoading: sectionsLoading } = useHomeSections();
-
-  const sectionAlbumMap = useMemo(() => {
-    if (!sections) {
-      return new Map();
-    }
-    return new Map(
-      sections.map((section) => [section.key, section.album_ids])
-    );
-  }, [sections]);
+  const { data, isLoading: sectionsLoading, isError, error } = useHome(type);
 
-  const orderedSections = sections ?? [];
+  const orderedSections = data?.sections ?? [];
 
   return (
     <section>
       {sectionsLoading && <div>加载分类中…</div>}
+      {isError && <div style={{ color: "#dc2626" }}>{error?.message || "加载失败"}</div>}
       {!sectionsLoading && orderedSections.length === 0 && (
         <div style={{ color: "rgba(50,44,84,0.6)", marginTop: 16 }}>
           暂无首页分类，请在控制中心新增分类。
         </div>
       )}
       {orderedSections.map((section) => (
-        <CategoryPreviewSection
-          key={section.id}
-          section={section}
-          albumIds={sectionAlbumMap.get(section.key) || []}
-          type={type}
-          isConfigLoading={sectionsLoading}
-        />
+        <CategoryPreviewSection key={section.id} section={section} type={type} />
       ))}
     </section>
   );
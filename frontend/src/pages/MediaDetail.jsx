@@ -91,7 +91,7 @@ export default function MediaDetail() {
   }
 
   const hasFullData = !!rawMedia;
-  const fileURL = hasFullData ? `${api.defaults.baseURL}/media/${id}/file?v=${media.sha256 || "preview"}` : null;
+  const fileURL = hasFullData ? `${api.defaults.baseURL}/media/${id}/file?v=${media.content_hash || media.sha256 || "preview"}` : null;
   const previewURL = hasFullData && media.preview_path
     ? `${api.defaults.baseURL}/media/${id}/preview?v=${media.sha256 || "preview"}`
     : undefined;